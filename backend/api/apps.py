@@ -3,4 +3,24 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'api'
\ No newline at end of file
+    name = 'api'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_save, post_delete, m2m_changed
+        from .models import Category, Event
+        from .utils.change_log import bump_events_version
+        from .utils.event_categories import event_categories_changed, category_deleted
+        from .utils.instrumentation import install_sql_execute_wrapper
+
+        # Counts SQL queries and time per request for ServerTimingMiddleware
+        connection_created.connect(install_sql_execute_wrapper, dispatch_uid="api_sql_timer")
+
+        # Per-process copies of the events (event catalog) refresh when they change
+        post_save.connect(bump_events_version, sender=Event, dispatch_uid="api_events_saved")
+        post_delete.connect(bump_events_version, sender=Event, dispatch_uid="api_events_deleted")
+        m2m_changed.connect(bump_events_version, sender=Event.category.through, dispatch_uid="api_event_categories_changed")
+
+        # Event.category_ids follows the category M2M
+        m2m_changed.connect(event_categories_changed, sender=Event.category.through, dispatch_uid="api_event_category_ids")
+        post_delete.connect(category_deleted, sender=Category, dispatch_uid="api_category_deleted")
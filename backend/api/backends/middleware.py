@@ -0,0 +1,145 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import FileResponse
+from ..utils.instrumentation import (
+    start_request_timings, resume_request_timings, stop_request_timings, current_request_timings,
+)
+from ..utils.metrics import observe_request
+from ..utils.llm_gateway import (
+    set_request_deadline, current_request_deadline, resume_request_deadline, reset_request_deadline,
+)
+
+logger = logging.getLogger("api.performance")
+
+
+class ServerTimingMiddleware:
+    """
+    Measures every request (SQL queries and time, LLM time and tokens, serialization and rendering time)
+    and emits the numbers as a `Server-Timing` header plus one structured log line.
+    Latency and query counts per route are also recorded in the metrics served on /api/metrics.
+    It also starts the request time budget (REQUEST_TIME_BUDGET) that LLM calls have to fit in.
+
+    Works for both sync and async views, so it doesn't force async views back into a thread.
+    A streamed body is produced after the view returned: the budget and the timings are put back while it is,
+    and the request is logged and recorded once the stream ends. Its `Server-Timing` header, sent first,
+    only covers the view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings, token = start_request_timings()
+        deadline_token = set_request_deadline(settings.REQUEST_TIME_BUDGET)
+        deadline = current_request_deadline()
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_request_deadline(deadline_token)
+            stop_request_timings(token)
+
+        return self._finish(request, response, timings, deadline)
+
+    async def __acall__(self, request):
+        timings, token = start_request_timings()
+        deadline_token = set_request_deadline(settings.REQUEST_TIME_BUDGET)
+        deadline = current_request_deadline()
+        try:
+            response = await self.get_response(request)
+        finally:
+            reset_request_deadline(deadline_token)
+            stop_request_timings(token)
+
+        return self._finish(request, response, timings, deadline)
+
+    def process_template_response(self, request, response):
+        """
+        DRF responses are rendered to JSON after the view returns, time it as the `render` span.
+        """
+        timings = current_request_timings()
+        if timings is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(lambda r: timings.add_span("render", time.perf_counter() - start))
+        return response
+
+    def _finish(self, request, response, timings, deadline):
+        response["Server-Timing"] = timings.server_timing_header(timings.elapsed())
+
+        # Files are sent as they are (sendfile), nothing is computed while they stream
+        if not response.streaming or isinstance(response, FileResponse):
+            self._record(request, response, timings)
+        elif response.is_async:
+            response.streaming_content = self._astream(request, response, response.streaming_content, timings, deadline)
+        else:
+            response.streaming_content = self._stream(request, response, response.streaming_content, timings, deadline)
+        return response
+
+    def _stream(self, request, response, content, timings, deadline):
+        try:
+            while True:
+                with _resumed(timings, deadline):
+                    part = next(content, None)
+                if part is None:
+                    return
+                yield part
+        finally:
+            with _resumed(timings, deadline):
+                getattr(content, "close", lambda: None)()
+            self._record(request, response, timings)
+
+    async def _astream(self, request, response, content, timings, deadline):
+        try:
+            while True:
+                # Set and reset around each step: the context must not leak past a `yield`
+                with _resumed(timings, deadline):
+                    try:
+                        part = await anext(content)
+                    except StopAsyncIteration:
+                        return
+                yield part
+        finally:
+            # Client gone mid-stream: the producer (and its LLM call) is closed in the request context too
+            with _resumed(timings, deadline):
+                if hasattr(content, "aclose"):
+                    await content.aclose()
+            self._record(request, response, timings)
+
+    def _record(self, request, response, timings):
+        total = timings.elapsed()
+
+        match = getattr(request, "resolver_match", None)
+        entry = {
+            "method": request.method,
+            "path": request.path,
+            "route": match.url_name if match else None,
+            "status": response.status_code,
+        }
+        entry.update(timings.to_dict(total))
+        logger.info(json.dumps(entry))
+
+        observe_request(entry["route"], request.method, response.status_code, total, timings)
+
+
+@contextmanager
+def _resumed(timings, deadline):
+    """
+    Puts back the timings and the budget of a request while its streamed body is produced.
+    """
+    token = resume_request_timings(timings)
+    deadline_token = resume_request_deadline(deadline)
+    try:
+        yield
+    finally:
+        reset_request_deadline(deadline_token)
+        stop_request_timings(token)
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+CAS_NAME = re.compile(r"^[^/]+/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w{1,10})?$")
+
+
+def hashed_name(name, digest):
+    """
+    Content-addressed name of a file saved as `name`: its top directory, then two levels of fan-out from the hash
+    (256 x 256 directories), e.g. images/9f/86/9f86d08...15a08.jpg.
+    """
+    top = name.split("/", 1)[0] if "/" in name else "files"
+    ext = os.path.splitext(name)[1].lower()
+    return f"{top}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+# Under MEDIA_ROOT: uploads are written there while they're hashed, then renamed to their CAS name
+STAGING_DIR = "tmp"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage naming files by the SHA-256 of their content: identical uploads are stored once, with a
+    MediaBlob row counting the references, and a name never changes content so files can be served as immutable.
+    The content is hashed while it's streamed to a temporary file, never held in memory as a whole.
+    Files saved before this storage (any name not matching CAS_NAME) are deleted as usual.
+    """
+    def _save(self, name, content):
+        from ..models import MediaBlob
+
+        tmp_dir = self.path(STAGING_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, "wb") as tmp:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+
+            final = hashed_name(name, digest.hexdigest())
+            path = self.path(final)
+            # The blob row is locked while the file is placed, a concurrent delete of the same content waits
+            with transaction.atomic():
+                blob, _ = MediaBlob.objects.select_for_update().get_or_create(name=final, defaults={"size": size})
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+                    os.replace(tmp_path, path)
+                else:
+                    os.utime(path)  # a new reference: the orphan collector (`collect_orphan_media`) skips recent files
+                MediaBlob.objects.filter(pk=blob.pk).update(references=F("references") + 1)
+            return final
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_available_name(self, name, max_length=None):
+        # The final name depends on the content only, it's chosen in `_save`
+        return name
+
+    def delete(self, name):
+        from ..models import MediaBlob
+
+        if not name:
+            return
+        if not CAS_NAME.match(name):
+            super().delete(name)
+            return
+
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is not None and blob.references > 1:
+                MediaBlob.objects.filter(pk=blob.pk).update(references=F("references") - 1)
+                return
+            if blob is not None:
+                blob.delete()
+            super().delete(name)
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Uploaded file is too large."
+    default_code = "upload_too_large"
+
+
+class BoundedUploadHandler(TemporaryFileUploadHandler):
+    """
+    Writes every uploaded file to a temporary file on disk chunk by chunk (64 KiB), whatever its size: no upload is
+    ever held in memory. The upload is stopped as soon as a file goes past UPLOAD_MAX_BYTES, without reading the rest.
+    """
+    def new_file(self, *args, **kwargs):
+        self.received = 0
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.UPLOAD_MAX_BYTES:
+            self.file.close()
+            raise UploadTooLarge(f"Uploaded file is larger than {settings.UPLOAD_MAX_BYTES // 2**20} MiB.")
+        return super().receive_data_chunk(raw_data, start)
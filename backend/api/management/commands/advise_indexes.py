@@ -0,0 +1,179 @@
+import json
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from api.models import ArchivedEvent, Event, Organizer, Participant, Swipe, User
+
+# Estimated vs actual rows off by this factor (either way) means the planner is working from bad statistics
+ESTIMATE_ERROR_FACTOR = 10
+# Seq scans keeping fewer than this share of the rows they read would be served better by an index
+SELECTIVE_FILTER_RATIO = 0.1
+
+# Operator right after a column in a plan's Filter, past the closing parenthesis and cast: `(email)::text = ...`
+_OPERATOR = r"\b{column}\b\)?(?:::[\w ]+?)?\s*(=|<>|!=|>=|<=|>|<|&&|@>|<@|~~\*?)"
+_EQUALITY = {"=", None}  # None: a boolean column on its own, `WHERE approved`
+_ARRAY = {"&&", "@>", "<@"}
+
+
+def _hot_queries(participant, organizer, email, category_ids):
+    """
+    The queries behind the endpoints, as (name, queryset, table, index that serves them). None when the index
+    comes with a constraint (unique_together) rather than from Meta.indexes.
+    """
+    now = timezone.now()
+    return [
+        ("public listing", Event.objects.filter(approved=True, date__gte=now).order_by("date"),
+         "api_event", "event_approved_date"),
+        ("public listing by category", Event.objects.filter(approved=True, date__gte=now, category_ids__overlap=category_ids),
+         "api_event", "event_category_ids_gin"),
+        ("event catalog load", Event.objects.filter(approved=True, date__gte=now).values_list("id", "price", "date", "category_ids"),
+         "api_event", "event_approved_date"),
+        ("organizer events", Event.objects.filter(organizer_id=organizer).order_by("-created_at"),
+         "api_event", "event_organizer_created"),
+        ("organizer archive", ArchivedEvent.objects.filter(organizer_id=organizer).order_by("-created_at"),
+         "api_archivedevent", "archive_organizer_created"),
+        ("liked events", Swipe.objects.filter(participant_id=participant, liked=True).values_list("event_id", flat=True),
+         "api_swipe", "swipe_participant_liked"),
+        ("swiped events", Swipe.objects.filter(participant_id=participant).values_list("event_id", flat=True),
+         "api_swipe", None),
+        ("email lookup", User.objects.filter(email=email),
+         "api_user", "user_email"),
+    ]
+
+
+def _walk(plan, sort_key=()):
+    """
+    Every node of `plan` with the Sort Key of the closest Sort above it, which an index could serve instead.
+    """
+    sort_key = plan.get("Sort Key", sort_key)
+    yield plan, sort_key
+    for child in plan.get("Plans", ()):
+        yield from _walk(child, sort_key)
+
+
+def suggest_index(node, sort_key, columns):
+    """
+    Index that would serve the Seq Scan `node` (EXPLAIN JSON) of a table with `columns`, as a CREATE INDEX statement:
+    the columns its Filter compares for equality first, then its Sort Key or else a range-filtered column, or a GIN
+    index for an array overlap. None when its Filter uses none of the table's columns.
+    """
+    table = node["Relation Name"]
+    condition = node.get("Filter", "")
+    operators = {}
+    for column in columns:
+        if re.search(rf"\b{column}\b", condition):
+            match = re.search(_OPERATOR.format(column=column), condition)
+            operators[column] = match.group(1) if match else None
+
+    array_columns = [c for c, op in operators.items() if op in _ARRAY]
+    if array_columns:
+        return f"CREATE INDEX CONCURRENTLY ON {table} USING gin ({array_columns[0]});"
+
+    equality = [c for c, op in operators.items() if op in _EQUALITY]
+    ranges = [c for c, op in operators.items() if op not in _EQUALITY]
+    order = []
+    for key in sort_key:
+        column, _, direction = key.split(".")[-1].partition(" ")
+        if column in columns and column not in equality:
+            order.append(f"{column} {direction}".strip())
+    indexed = equality + (order or ranges[:1])
+    if not indexed:
+        return None
+    return f"CREATE INDEX CONCURRENTLY ON {table} ({', '.join(indexed)});"
+
+
+def _covered(statement, table_indexes):
+    # An index of the table already starts with the suggested columns
+    wanted = [c.split()[0] for c in statement[statement.index("(") + 1:statement.rindex(")")].split(", ")]
+    return any(
+        (info.get("columns") or [])[:len(wanted)] == wanted
+        for info in table_indexes.values()
+        if info.get("index")
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs EXPLAIN (ANALYZE, BUFFERS) on the hot queries of the endpoints against the current database, reports "
+        "sequential scans and row estimates far from the actual rows, and proposes the index that serves each query "
+        "when it's missing: the one the query is known to need, and one derived from the Filter and Sort Key of "
+        "each selective seq scan. PostgreSQL only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--participant", default=None, help="Username of the participant the queries run for.")
+        parser.add_argument("--organizer", default=None, help="Username of the organizer the queries run for.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("EXPLAIN (ANALYZE, BUFFERS) needs PostgreSQL.")
+
+        participant = self._user(Participant, options["participant"])
+        organizer = self._user(Organizer, options["organizer"])
+        category_ids = list(participant.categories.values_list("id", flat=True)) if participant else [1]
+        queries = _hot_queries(
+            participant.id if participant else 0,
+            organizer.id if organizer else 0,
+            participant.email if participant else "nobody@example.com",
+            category_ids,
+        )
+
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+            indexes = {table: connection.introspection.get_constraints(cursor, table) for table in tables}
+            columns = {
+                table: [column.name for column in connection.introspection.get_table_description(cursor, table)]
+                for table in tables
+            }
+
+        missing = []
+        suggested = set()
+        for name, queryset, table, index in queries:
+            plan = json.loads(queryset.explain(format="json", analyze=True, buffers=True))[0]
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({plan['Execution Time']:.2f}ms)"))
+
+            for node, sort_key in _walk(plan["Plan"]):
+                if node["Node Type"] == "Seq Scan":
+                    kept, removed = node["Actual Rows"] * node["Actual Loops"], node.get("Rows Removed by Filter", 0)
+                    self.stdout.write(
+                        f"  seq scan on {node['Relation Name']}: {kept} rows kept, {removed} removed by filter, "
+                        f"{node.get('Shared Hit Blocks', 0) + node.get('Shared Read Blocks', 0)} blocks"
+                    )
+                    relation = node["Relation Name"]
+                    statement = suggest_index(node, sort_key, columns.get(relation, []))
+                    if statement and kept < SELECTIVE_FILTER_RATIO * (kept + removed):
+                        if not _covered(statement, indexes.get(relation, {})):
+                            suggested.add(statement)
+                            self.stdout.write(self.style.WARNING(f"  suggested: {statement}"))
+                estimated, actual = node["Plan Rows"], node["Actual Rows"]
+                if max(estimated, actual) > ESTIMATE_ERROR_FACTOR * max(min(estimated, actual), 1):
+                    self.stdout.write(
+                        f"  {node['Node Type']}: estimated {estimated} rows, got {actual} (run ANALYZE {node.get('Relation Name', table)}?)"
+                    )
+
+            if index is not None and index not in indexes.get(table, {}):
+                missing.append(index)
+                self.stdout.write(self.style.WARNING(f"  missing index {index} on {table}"))
+
+        if missing:
+            self.stdout.write(self.style.WARNING(f"Missing indexes: {', '.join(missing)}, run `migrate`."))
+        if suggested:
+            self.stdout.write(self.style.WARNING(
+                "Indexes derived from the selective seq scans, to add to Meta.indexes if the queries are hot:\n  "
+                + "\n  ".join(sorted(suggested))
+            ))
+        if not missing and not suggested:
+            self.stdout.write(self.style.SUCCESS(
+                "Every hot query has its index. Seq scans left are the planner's choice on small tables."
+            ))
+
+    def _user(self, model, username):
+        if username is None:
+            return model.objects.order_by("id").first()
+        try:
+            return model.objects.get(username=username)
+        except model.DoesNotExist:
+            raise CommandError(f"{model.__name__} '{username}' does not exist.")
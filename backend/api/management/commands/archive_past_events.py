@@ -0,0 +1,41 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.utils import archive_events_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves the events whose date has passed, and their swipes, out of the Event and Swipe tables into the archive, "
+        "in batches of one transaction each. Organizers keep seeing them. Meant to run periodically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-hours", type=int, default=24, help="Hours after its date an event is archived.")
+        parser.add_argument("--batch-size", type=int, default=500, help="Events archived per transaction.")
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["grace_hours"])
+        start = time.perf_counter()
+
+        batches = events = swipes = 0
+        while options["max_batches"] is None or batches < options["max_batches"]:
+            archived, swiped = archive_events_batch(cutoff, options["batch_size"])
+            if not archived:
+                break
+            batches += 1
+            events += archived
+            swipes += swiped
+
+        if events:
+            from api.utils.event_neighbors import refresh_event_neighbors
+
+            refresh_event_neighbors()  # refill the similar events lists the archived events were in
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {events} events and {swipes} swipes in {batches} batches ({time.perf_counter() - start:.2f}s)."
+        ))
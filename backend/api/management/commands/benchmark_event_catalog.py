@@ -0,0 +1,102 @@
+import random
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.models import Event, Participant, Swipe
+from api.utils import RecommendationMixin
+from api.utils.event_catalog import CATALOG_DTYPE, EventCatalog, category_mask, get_event_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Reports the memory of the in-memory event catalog and the time of its candidate filtering on a synthetic "
+        "catalog, and optionally compares the feed candidate query against the catalog for a real participant."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=100_000, help="Events in the synthetic catalog.")
+        parser.add_argument("--swiped", type=int, default=200, help="Swiped events excluded per lookup.")
+        parser.add_argument("--repeat", type=int, default=200, help="Lookups timed.")
+        parser.add_argument("--participant", default=None, help="Username of a participant to time both candidate paths for.")
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        catalog = self._synthetic_catalog(options["events"])
+        self.stdout.write(
+            f"Synthetic catalog: {len(catalog.events)} events, {catalog.nbytes / 2**20:.2f} MiB "
+            f"({CATALOG_DTYPE.itemsize} bytes per event, {CATALOG_DTYPE.itemsize * 100_000 / 2**20:.2f} MiB per 100k)"
+        )
+
+        ids = catalog.events["id"]
+        now = timezone.now()
+        latencies, found = [], []
+        for _ in range(options["repeat"]):
+            category_ids = random.sample(range(1, 13), 3)
+            # Swipes also include events the catalog doesn't have (past, deleted)
+            swiped = np.append(ids[random.sample(range(len(ids)), min(options["swiped"], len(ids)))], [0, len(ids) + 1])
+            start = time.perf_counter()
+            result = catalog.candidate_ids(random.choice([10, 30, 100]), category_ids, swiped, now=now)
+            latencies.append(time.perf_counter() - start)
+            found.append(len(result))
+        self._report("Catalog mask", latencies, f"{statistics.mean(found):.0f} candidates")
+
+        if options["participant"]:
+            self._compare(options["participant"], options["repeat"])
+
+    def _synthetic_catalog(self, count):
+        rng = np.random.default_rng(0)
+        events = np.zeros(count, dtype=CATALOG_DTYPE)
+        events["id"] = np.arange(1, count + 1)
+        events["price"] = rng.integers(0, 120, count)
+        events["date"] = timezone.now().timestamp() + rng.integers(-30, 180, count) * 86400
+        events["categories"] = [category_mask(rng.choice(np.arange(1, 13), 2, replace=False)) for _ in range(count)]
+        events["organizer"] = rng.integers(1, 500, count)
+
+        catalog = EventCatalog()
+        catalog.events = events
+        return catalog
+
+    def _compare(self, username, repeat):
+        try:
+            participant = Participant.objects.get(username=username)
+        except Participant.DoesNotExist:
+            raise CommandError(f"Participant '{username}' does not exist.")
+
+        mixin = RecommendationMixin()
+        get_event_catalog()  # loaded once per process, not per request
+
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            legacy = list(self._legacy_candidates(participant))
+            latencies.append(time.perf_counter() - start)
+        self._report("Join query", latencies, f"{len(legacy)} candidates")
+
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            candidates = mixin._get_candidate_events(participant)
+            latencies.append(time.perf_counter() - start)
+        self._report("Catalog", latencies, f"{len(candidates)} candidates")
+
+    def _legacy_candidates(self, participant):
+        # The candidate query as it was before the catalog (plus the upcoming filter the catalog applies)
+        swiped_ids = Swipe.objects.filter(participant=participant).values_list("event_id", flat=True)
+        return (
+            Event.objects.filter(approved=True, date__gte=timezone.now())
+            .exclude(id__in=swiped_ids)
+            .filter(price__lte=participant.budget)
+            .filter(category__in=participant.categories.all())
+            .distinct()
+            .prefetch_related("category")
+        )
+
+    def _report(self, name, latencies, extra):
+        self.stdout.write(
+            f"{name + ':':<14}mean {statistics.mean(latencies) * 1e6:.0f}µs, "
+            f"max {max(latencies) * 1e6:.0f}µs ({extra})"
+        )
@@ -0,0 +1,120 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import Event, Organizer
+from api.utils import GetEventsMixin, event_embedding
+from api.utils.event_neighbors import load_neighbor_catalog, rebuild_event_neighbors, update_event_neighbors
+from api.utils.vector_search import cosine_top_k
+
+TOPICS = [
+    "jazz", "rock", "teatro", "cucina", "vino", "calcio", "yoga", "python", "arte", "cinema", "fotografia",
+    "birra", "danza", "poesia", "startup", "trekking", "ceramica", "scacchi", "opera", "street food",
+]
+WORDS = [
+    "serata", "centro", "storico", "musica", "dal", "vivo", "laboratorio", "degustazione", "ospiti", "locali",
+    "ingresso", "gratuito", "posti", "limitati", "piazza", "festival", "incontro", "corso", "torneo", "mostra",
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the similar events table on a synthetic catalog: full build, incremental updates and endpoint "
+        "lookups, against computing the neighbors live. Runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=2000, help="Synthetic approved upcoming events.")
+        parser.add_argument("--updates", type=int, default=20, help="Incremental updates timed.")
+        parser.add_argument("--lookups", type=int, default=200, help="Lookups timed.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        random.seed(0)
+        event_ids = self._synthetic_catalog(options["events"])
+        self.stdout.write(f"Catalog: {len(event_ids)} events, {settings.SIMILAR_EVENTS_COUNT} neighbors each")
+
+        start = time.perf_counter()
+        _, rows = rebuild_event_neighbors()
+        self.stdout.write(f"Full build:   {time.perf_counter() - start:.2f}s ({rows} rows)")
+
+        latencies = []
+        for event_id in random.sample(event_ids, min(options["updates"], len(event_ids))):
+            title, description = self._text()
+            Event.objects.filter(pk=event_id).update(title=title, embedding=event_embedding(title, description))
+            start = time.perf_counter()
+            update_event_neighbors(event_id)
+            latencies.append(time.perf_counter() - start)
+        self._report("Update", latencies)
+
+        mixin = GetEventsMixin()
+        latencies = []
+        for event_id in random.choices(event_ids, k=options["lookups"]):
+            start = time.perf_counter()
+            mixin.get_similar_events(event_id, settings.SIMILAR_EVENTS_COUNT)
+            latencies.append(time.perf_counter() - start)
+        self._report("Lookup", latencies)
+
+        latencies = []
+        for event_id in random.choices(event_ids, k=min(options["lookups"], 20)):
+            start = time.perf_counter()
+            self._live_similar_events(mixin, event_id)
+            latencies.append(time.perf_counter() - start)
+        self._report("Live", latencies)
+
+    def _synthetic_catalog(self, count):
+        suffix = uuid.uuid4().hex[:8]
+        organizer = Organizer.objects.create(
+            username=f"bench{suffix}", email=f"bench{suffix}@example.com", name="Bench", surname="Mark"
+        )
+        now = timezone.now()
+        events = []
+        for i in range(count):
+            title, description = self._text()
+            events.append(Event(
+                organizer=organizer, title=title, description=description, price=Decimal(i % 60),
+                date=now + timedelta(days=1 + i % 90), approved=True, embedding=event_embedding(title, description),
+            ))
+        Event.objects.bulk_create(events, batch_size=1000)
+        return list(Event.objects.filter(organizer=organizer).values_list("id", flat=True))
+
+    def _text(self):
+        topics = random.sample(TOPICS, 2)
+        title = f"{topics[0].capitalize()} e {topics[1]} in {random.choice(WORDS)}"
+        description = " ".join(random.choices(WORDS + topics * 3, k=40))
+        return title, description
+
+    def _live_similar_events(self, mixin, event_id):
+        # What the endpoint would do without the table: scan every eligible event
+        ids, matrix = load_neighbor_catalog()
+        row = int((ids == event_id).nonzero()[0][0])
+        best, _ = cosine_top_k(matrix[row], matrix, settings.SIMILAR_EVENTS_COUNT, exclude=row)
+        events = Event.objects.filter(id__in=ids[best].tolist())
+        return [mixin._event_to_dict(e) for e in events]
+
+    def _report(self, name, latencies):
+        latencies = sorted(latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f"{name + ':':<14}mean {statistics.mean(latencies) * 1000:.2f}ms, p95 {p95 * 1000:.2f}ms "
+            f"({len(latencies)} runs)"
+        )
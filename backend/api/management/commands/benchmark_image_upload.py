@@ -0,0 +1,177 @@
+import io
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.http.multipartparser import MultiPartParser
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+from rest_framework.exceptions import APIException, ValidationError
+
+from api.backends.uploads import BoundedUploadHandler
+from api.utils import BoundedImageField, delete_image_variants, render_image
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def _rss():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * _PAGE_SIZE
+
+
+class _PeakMemory:
+    """
+    Peak resident memory of this process above its level on entry, sampled every millisecond (Pillow allocates
+    outside of Python's allocator, tracemalloc doesn't see the pixels).
+    """
+    def __enter__(self):
+        self.start = self.peak = _rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(0.001):
+            self.peak = max(self.peak, _rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss())
+
+    @property
+    def mib(self):
+        return (self.peak - self.start) / 2**20
+
+
+class _SubprocessPeak(logging.Handler):
+    """
+    Peak memory of the decoding subprocesses, from the line `render_image` logs for each.
+    """
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.kib = None
+
+    def emit(self, record):
+        if "subprocess" in record.msg:
+            self.kib = record.args[1]
+
+
+def _gradient(width, height, mode, noise=0):
+    """
+    Synthetic image: a smooth gradient, small once compressed, with some noise to make the file heavier.
+    """
+    rng = np.random.default_rng(0)
+    row = np.linspace(0, 255, width, dtype=np.float32)
+    column = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    bands = [(row + column) / 2, np.broadcast_to(row, (height, width)), np.broadcast_to(column, (height, width))]
+    pixels = np.stack(bands[: len(mode)] + [np.full((height, width), 200.0)] * (len(mode) - 3), axis=-1)
+    if noise:
+        pixels += rng.normal(0, noise, pixels.shape).astype(np.float32)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), mode)
+
+
+def _encode(image, image_format, **params):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **params)
+    return buffer.getvalue()
+
+
+def _bomb(width, height):
+    # A single-color PNG: a few KiB on the wire, width x height x 4 bytes once decoded
+    return _encode(Image.new("1", (width, height)), "PNG", optimize=True)
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends large synthetic images (photos, big PNGs, a decompression bomb, an oversized file) through the upload "
+        "path: multipart parsing (BoundedUploadHandler), header validation (BoundedImageField), storage and the "
+        "variants rendering, and reports the peak memory of the worker and of the decoding subprocess for each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--budget", type=float, default=settings.IMAGE_DECODE_MEMORY_MB,
+            help="Memory (MiB) a case may add to the worker, or take in the subprocess, at its peak.",
+        )
+
+    def handle(self, *args, **options):
+        cases = [
+            ("JPEG photo 6000x4000", "jpg", lambda: _encode(_gradient(6000, 4000, "RGB", noise=4), "JPEG", quality=85)),
+            ("JPEG phone 4032x3024", "jpg", lambda: _encode(_gradient(4032, 3024, "RGB", noise=4), "JPEG", quality=85)),
+            ("JPEG 1600x1200", "jpg", lambda: _encode(_gradient(1600, 1200, "RGB", noise=4), "JPEG", quality=85)),
+            ("PNG RGBA 3400x2300", "png", lambda: _encode(_gradient(3400, 2300, "RGBA"), "PNG")),
+            ("PNG RGB 1900x1200", "png", lambda: _encode(_gradient(1900, 1200, "RGB"), "PNG")),
+            ("PNG RGB 3000x2000", "png", lambda: _encode(_gradient(3000, 2000, "RGB"), "PNG")),
+            ("PNG RGB 5000x4000", "png", lambda: _encode(_gradient(5000, 4000, "RGB"), "PNG")),
+            ("PNG bomb 40000x40000", "png", lambda: _bomb(40000, 40000)),
+            (f"file over {settings.UPLOAD_MAX_BYTES // 2**20} MiB", "jpg", lambda: os.urandom(settings.UPLOAD_MAX_BYTES + 2**20)),
+        ]
+
+        subprocess_peak = _SubprocessPeak()
+        variants_logger = logging.getLogger("api.utils.image_variants")
+        variants_logger.addHandler(subprocess_peak)
+        variants_logger.setLevel(logging.DEBUG)
+
+        over_budget = 0
+        for name, extension, build in cases:
+            data = build()
+            body = encode_multipart(BOUNDARY, {"image": _NamedBytes(data, f"upload.{extension}")})
+            subprocess_peak.kib = None
+
+            start = time.perf_counter()
+            with _PeakMemory() as upload:
+                outcome, stored = self._upload(body)
+            with _PeakMemory() as render:
+                variants = render_image(stored).get("variants", {}) if stored else {}
+            elapsed = time.perf_counter() - start
+
+            child = f"{subprocess_peak.kib / 1024:.0f} MiB" if subprocess_peak.kib else "-"
+            if variants:
+                outcome += f", {len(variants)} variants"
+            self.stdout.write(
+                f"{name + ':':<26}{len(data) / 2**20:6.2f} MiB sent, worker +{upload.mib:.1f} MiB upload "
+                f"+{render.mib:.1f} MiB render, subprocess {child}, {elapsed:.2f}s ({outcome})"
+            )
+            if max(upload.mib, render.mib, (subprocess_peak.kib or 0) / 1024) > options["budget"]:
+                over_budget += 1
+                self.stdout.write(self.style.WARNING(f"  over the {options['budget']:.0f} MiB budget"))
+
+            delete_image_variants(variants)
+            if stored:
+                default_storage.delete(stored)
+
+        if over_budget:
+            self.stdout.write(self.style.WARNING(f"{over_budget} cases went over the memory budget."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Every case stayed within the memory budget."))
+
+    def _upload(self, body):
+        """
+        Parses the multipart body as a request would be, validates and stores the image: (outcome, stored name).
+        """
+        meta = {"CONTENT_TYPE": MULTIPART_CONTENT, "CONTENT_LENGTH": str(len(body))}
+        handler = BoundedUploadHandler()
+        try:
+            _, files = MultiPartParser(meta, io.BytesIO(body), [handler], "utf-8").parse()
+            image = BoundedImageField().run_validation(files["image"])
+            return "stored", default_storage.save(f"images/{image.name}", image)
+        except ValidationError as exc:
+            return f"rejected: {exc.detail[0]}", None
+        except DjangoValidationError as exc:
+            return f"rejected: {exc.messages[0]}", None
+        except APIException as exc:
+            return f"rejected: {exc.detail}", None
+
+
+class _NamedBytes(io.BytesIO):
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
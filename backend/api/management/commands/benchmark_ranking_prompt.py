@@ -0,0 +1,170 @@
+import json
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.models import Category, Event, Participant
+from api.utils import (
+    build_ranking_messages, estimate_tokens, get_llm_gateway, LLMUnavailable,
+    describe_preferences, load_preference_vector,
+)
+from api.utils.openai_utils import RANKING_MODEL
+
+
+def _legacy_ranking_messages(profile, events):
+    """
+    The ranking prompt as it was built before the prompt builder: verbose profile and the events as JSON.
+    """
+    user_profile = (
+        f"User prefers categories: {', '.join(profile['categories']) or 'none specified'}.\n"
+        f"Budget available: {profile['budget']}.\n"
+        f"Previously liked events: {', '.join(profile['liked']) or 'none yet'}."
+    )
+    payload = [
+        {
+            "id": e["id"],
+            "title": e["title"],
+            "description": e["description"][:300],
+            "price": float(e["price"]),
+            "categories": e["categories"],
+        }
+        for e in events
+    ]
+    system_prompt = (
+        "You are a recommendation engine for events. "
+        "Given a user profile and a list of events, you must return ONLY JSON with "
+        "a single key 'ranked_event_ids', an array of event IDs ordered from most "
+        "to least relevant for this user."
+    )
+    user_prompt = (
+        "USER PROFILE:\n"
+        f"{user_profile}\n\n"
+        "EVENTS (as JSON list):\n"
+        f"{json.dumps(payload, ensure_ascii=False)}\n\n"
+        "Return JSON like:\n"
+        "{\"ranked_event_ids\": [1, 5, 2, ...]}\n"
+    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the size (and optionally the LLM latency) of the ranking prompt built by the prompt builder "
+        "against the previous JSON prompt, on real events or generated ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=50, help="Number of candidate events.")
+        parser.add_argument("--participant", default=None, help="Username of the participant whose profile is used.")
+        parser.add_argument("--budget", type=int, default=settings.LLM_RANKING_TOKEN_BUDGET, help="Token budget of the builder.")
+        parser.add_argument("--generated", action="store_true", help="Use generated events instead of the database ones.")
+        parser.add_argument("--llm", action="store_true", help="Also send both prompts to the configured LLM and time them.")
+        parser.add_argument("--repeat", type=int, default=5, help="LLM calls per prompt with --llm.")
+
+    def handle(self, *args, **options):
+        profile = self._profile(options["participant"])
+        events = self._generated_events(options["events"]) if options["generated"] else self._db_events(options["events"])
+        if not events:
+            raise CommandError("No approved events found, use --generated.")
+
+        legacy = _legacy_ranking_messages(profile, events)
+        compact, stats = build_ranking_messages(profile, events, options["budget"])
+        if not compact:
+            raise CommandError(f"Not even one event fits the {options['budget']} tokens budget.")
+
+        legacy_tokens = sum(estimate_tokens(m["content"]) for m in legacy)
+        self.stdout.write(f"Events:  {len(events)} ({stats['events_included']} fit the {options['budget']} tokens budget)")
+        self.stdout.write(f"Legacy:  {sum(len(m['content']) for m in legacy)} chars, ~{legacy_tokens} tokens")
+        self.stdout.write(f"Compact: {sum(len(m['content']) for m in compact)} chars, ~{stats['prompt_tokens']} tokens")
+        self.stdout.write(f"Saved:   {100 * (1 - stats['prompt_tokens'] / legacy_tokens):.0f}% of the prompt tokens")
+
+        if options["llm"]:
+            # Untimed call first, so building the client and connecting isn't billed to the first prompt
+            self._time_llm(compact, 1)
+            for name, messages in (("Legacy", legacy), ("Compact", compact)):
+                latencies, prompt_tokens = self._time_llm(messages, options["repeat"])
+                self.stdout.write(
+                    f"{name + ' LLM:':<13}mean {statistics.mean(latencies) * 1000:.0f}ms, "
+                    f"max {max(latencies) * 1000:.0f}ms, {prompt_tokens} prompt tokens reported"
+                )
+
+    def _profile(self, username):
+        if username is None:
+            return {
+                "categories": ["Music", "Tech"],
+                "budget": Decimal("50"),
+                "liked": ["Jazz al tramonto", "Python Meetup"],
+                "leaning": {"categories": ["Music", "Tech"], "price": "10-25"},
+            }
+
+        try:
+            participant = Participant.objects.get(username=username)
+        except Participant.DoesNotExist:
+            raise CommandError(f"Participant '{username}' does not exist.")
+
+        return {
+            "categories": list(participant.categories.values_list("name", flat=True)),
+            "budget": participant.budget,
+            "liked": list(participant.swipes.filter(liked=True).values_list("event__title", flat=True)[:10]),
+            "leaning": describe_preferences(
+                load_preference_vector(participant.preference_vector), Category.objects.values_list("id", "name")
+            ),
+        }
+
+    def _db_events(self, count):
+        events = Event.objects.filter(approved=True).prefetch_related("category").order_by("date")[:count]
+        return [
+            {
+                "id": e.id,
+                "title": e.title,
+                "description": e.description,
+                "price": e.price,
+                "date": e.date,
+                "categories": [c.name for c in e.category.all()],
+            }
+            for e in events
+        ]
+
+    def _generated_events(self, count):
+        categories = ["Music", "Tech", "Food & Drinks", "Sports", "Art", "Theatre", "Workshops"]
+        sentence = (
+            "Una serata nel centro storico di Macerata con ospiti locali e tanta musica dal vivo. "
+            "Ingresso con consumazione inclusa, posti limitati. "
+            "Porta i tuoi amici e scopri le novità della stagione. "
+        )
+        now = timezone.now()
+        return [
+            {
+                "id": 1000 + i,
+                "title": f"Evento numero {i} in Piazza della Libertà",
+                "description": sentence * 2,
+                "price": Decimal(5 + i % 40),
+                "date": now + timedelta(days=i % 30),
+                "categories": [categories[i % len(categories)], categories[(i * 3 + 1) % len(categories)]],
+            }
+            for i in range(count)
+        ]
+
+    def _time_llm(self, messages, repeat):
+        latencies = []
+        prompt_tokens = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                response = get_llm_gateway().complete(
+                    "benchmark", model=RANKING_MODEL, temperature=0,
+                    response_format={"type": "json_object"}, messages=messages,
+                )
+            except LLMUnavailable as e:
+                raise CommandError(str(e))
+            latencies.append(time.perf_counter() - start)
+            prompt_tokens = response.usage.prompt_tokens if response.usage else 0
+        return latencies, prompt_tokens
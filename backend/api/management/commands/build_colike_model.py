@@ -0,0 +1,82 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone as django_timezone
+
+from api.models import Swipe
+from api.utils.colike import CoLikeModel, colike_model_path
+
+
+def _to_micros(moment):
+    return int(moment.timestamp()) * 10**6 + moment.microsecond
+
+
+def _from_micros(micros):
+    return datetime.fromtimestamp(micros // 10**6, tz=timezone.utc).replace(microsecond=micros % 10**6)
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds or updates the item-to-item co-like model used to score feed candidates without the LLM. "
+        "Only the swipes changed since the last run are read (new likes folded in, likes turned into dislikes "
+        "taken out), unless --full is given. Swipes deleted with their event or account stay counted until a --full run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rebuild from scratch, e.g. to drop the deleted swipes.")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Swipe changes folded in per step, bounds the memory used.")
+        parser.add_argument(
+            "--settle", type=float, default=60,
+            help="Seconds a change must be old before it's read: a swipe saved earlier but committed after a run "
+                 "would otherwise fall behind the watermark and never be read.",
+        )
+
+    def handle(self, *args, **options):
+        path = colike_model_path()
+        start = time.perf_counter()
+
+        model = None
+        if not options["full"] and os.path.exists(path):
+            try:
+                model = CoLikeModel.load(path, with_folded=True)
+            except KeyError:
+                self.stdout.write("The model predates the swipe changes tracking, rebuilding it.")
+        if model is None:
+            model = CoLikeModel()
+
+        until = django_timezone.now() - timedelta(seconds=options["settle"])
+        added = removed = changed = 0
+        while True:
+            after = _from_micros(model.watermark)
+            changes = list(
+                Swipe.objects.filter(
+                    Q(updated_at__gt=after) | Q(updated_at=after, id__gt=model.watermark_id), updated_at__lte=until
+                )
+                .order_by("updated_at", "id")
+                .values_list("id", "participant_id", "event_id", "liked", "updated_at")[:options["batch_size"]]
+            )
+            if not changes:
+                break
+
+            participant_swipes = list(
+                Swipe.objects.filter(participant_id__in={change[1] for change in changes})
+                .values_list("id", "participant_id", "event_id")
+                .iterator()
+            )
+            batch_added, batch_removed = model.apply_changes([change[:4] for change in changes], participant_swipes)
+            model.watermark, model.watermark_id = _to_micros(changes[-1][4]), changes[-1][0]
+            added += batch_added
+            removed += batch_removed
+            changed += len(changes)
+
+        if changed or not os.path.exists(path):
+            model.save(path)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {changed} swipe changes in {time.perf_counter() - start:.2f}s: {added} likes folded in, "
+            f"{removed} taken out. {model.size} rows, {model.nnz} non-zero pairs, "
+            f"{os.path.getsize(path) / 1024:.1f} KiB on disk."
+        ))
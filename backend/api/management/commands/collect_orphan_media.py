@@ -0,0 +1,182 @@
+import hashlib
+import os
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.backends.storage import CAS_NAME, STAGING_DIR
+from api.models import ArchivedEvent, Event, MediaBlob, User
+
+# Read in this order: an event archived while the references load is then found in the archive
+REFERENCES = [
+    (Event, "picture", "picture_variants"),
+    (ArchivedEvent, "picture", "picture_variants"),
+    (User, "profile_image", "profile_image_variants"),
+]
+QUARANTINE_DIR = "quarantine"
+RUN_FORMAT = "%Y%m%d-%H%M%S"
+
+
+def _key(name):
+    # 8 bytes per referenced path: millions of them fit in a few MiB. A collision only keeps an orphan
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little")
+
+
+def _referenced_keys(batch_size):
+    """
+    Sorted keys of every path the database references (images and their variants), loaded in streamed batches.
+    """
+    chunks, batch = [], []
+    for model, field, variants_field in REFERENCES:
+        rows = model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True}).values_list(field, variants_field)
+        for name, variants in rows.iterator(chunk_size=batch_size):
+            batch.append(_key(name))
+            batch.extend(_key(v) for v in (variants or {}).values())
+            if len(batch) >= batch_size:
+                chunks.append(np.array(batch, dtype=np.uint64))
+                batch = []
+    chunks.append(np.array(batch, dtype=np.uint64))
+    return np.sort(np.concatenate(chunks))
+
+
+def _walk(root, skip):
+    """
+    Every file under `root` as (path relative to it, os.DirEntry), one directory listing open at a time:
+    os.scandir streams the entries, nothing is collected. The directories in `skip` aren't entered.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in skip:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield os.path.relpath(entry.path, root).replace(os.sep, "/"), entry
+
+
+class Command(BaseCommand):
+    help = (
+        "Finds the media files no row references (left by deleted accounts and events, failed transactions, "
+        "interrupted saves) and deletes them, or moves them to MEDIA_ROOT/quarantine/<run>/ with --quarantine. "
+        "The tree is walked with os.scandir and checked in batches against the referenced paths, kept as 8-byte "
+        "hashes: memory stays flat whatever the number of files. Files modified in the last --min-age hours are "
+        "left alone (uploads in flight, new references to a deduplicated file)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report the orphans.")
+        parser.add_argument("--quarantine", action="store_true", help="Move the orphans to the quarantine instead of deleting them.")
+        parser.add_argument("--min-age", type=float, default=24, help="Hours since a file's last modification before it can go.")
+        parser.add_argument("--purge-quarantine", type=float, default=None, help="Also delete the quarantine runs older than this many days.")
+        parser.add_argument("--batch-size", type=int, default=10_000, help="Rows loaded and files checked per batch.")
+        parser.add_argument("--progress", type=int, default=100_000, help="Report the throughput every this many files.")
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.root = os.path.abspath(settings.MEDIA_ROOT)
+        self.quarantine = os.path.join(self.root, QUARANTINE_DIR, timezone.now().strftime(RUN_FORMAT))
+        self.cutoff = time.time() - options["min_age"] * 3600
+        self.scanned = self.orphans = self.orphan_bytes = 0
+        start = time.perf_counter()
+
+        referenced = _referenced_keys(options["batch_size"])
+        self.stdout.write(f"{len(referenced)} referenced paths loaded in {time.perf_counter() - start:.2f}s ({referenced.nbytes / 2**20:.1f} MiB).")
+
+        walk_start = time.perf_counter()
+        next_report = options["progress"]
+        batch = []
+        # Neither the quarantine nor the uploads being stored, about to be renamed
+        skip = {os.path.join(self.root, QUARANTINE_DIR), os.path.join(self.root, STAGING_DIR)}
+        for name, entry in _walk(self.root, skip):
+            batch.append((name, entry))
+            if len(batch) >= options["batch_size"]:
+                self._check(batch, referenced)
+                batch = []
+                if self.scanned >= next_report:
+                    self._report_progress(walk_start)
+                    next_report += options["progress"]
+        self._check(batch, referenced)
+
+        elapsed = time.perf_counter() - walk_start
+        verb = "Found" if options["dry_run"] else "Quarantined" if options["quarantine"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {self.scanned} files in {elapsed:.2f}s ({self.scanned / max(elapsed, 1e-9):.0f} files/s). "
+            f"{verb} {self.orphans} orphans ({self.orphan_bytes / 2**20:.1f} MiB)."
+        ))
+        if options["purge_quarantine"] is not None:
+            self._purge_quarantine(options["purge_quarantine"])
+
+    def _check(self, batch, referenced):
+        if not batch:
+            return
+        self.scanned += len(batch)
+        keys = np.array([_key(name) for name, _ in batch], dtype=np.uint64)
+        positions = np.minimum(np.searchsorted(referenced, keys), max(len(referenced) - 1, 0))
+        found = referenced[positions] == keys if len(referenced) else np.zeros(len(keys), dtype=bool)
+
+        for (name, entry), is_referenced in zip(batch, found):
+            if is_referenced:
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime > self.cutoff:
+                continue
+            if self.options["dry_run"]:
+                if self.options["verbosity"] > 1:
+                    self.stdout.write(f"  orphan: {name} ({stat.st_size} bytes)")
+            elif not self._remove(name, entry.path):
+                continue
+            self.orphans += 1
+            self.orphan_bytes += stat.st_size
+
+    def _remove(self, name, path):
+        # Under the blob row's lock, as the storage saves: a new reference in the meantime touched the file
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first() if CAS_NAME.match(name) else None
+            try:
+                if os.stat(path).st_mtime > self.cutoff:
+                    return False
+                if self.options["quarantine"]:
+                    target = os.path.join(self.quarantine, name)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(path, target)
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                return False
+            if blob is not None:
+                blob.delete()
+        return True
+
+    def _report_progress(self, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"  {self.scanned} files scanned ({self.scanned / max(elapsed, 1e-9):.0f} files/s), "
+            f"{self.orphans} orphans ({self.orphan_bytes / 2**20:.1f} MiB)"
+        )
+
+    def _purge_quarantine(self, days):
+        quarantine_root = os.path.join(self.root, QUARANTINE_DIR)
+        if not os.path.isdir(quarantine_root):
+            return
+        cutoff = (timezone.now() - timedelta(days=days)).strftime(RUN_FORMAT)
+        purged = 0
+        with os.scandir(quarantine_root) as runs:
+            for run in runs:
+                # Run directories are named after their start time, they sort as they were made
+                if run.is_dir(follow_symlinks=False) and run.name < cutoff:
+                    if self.options["dry_run"]:
+                        self.stdout.write(f"  would purge quarantine run {run.name}")
+                        continue
+                    for directory, _, files in os.walk(run.path, topdown=False):
+                        for file_name in files:
+                            os.remove(os.path.join(directory, file_name))
+                        os.rmdir(directory)
+                    purged += 1
+        self.stdout.write(f"Purged {purged} quarantine runs older than {days:g} days.")
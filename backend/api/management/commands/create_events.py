@@ -8,7 +8,8 @@ from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 
 from api.models import Event, Organizer, Category  # <-- adjust if needed
-from api.utils import moderate_event_content       # <-- adjust if needed
+from api.utils import moderate_event_content, event_embedding, store_image_variants, PRIORITY_BATCH       # <-- adjust if needed
+from api.utils.event_neighbors import refresh_event_neighbors
 
 
 class Command(BaseCommand):
@@ -262,8 +263,8 @@ class Command(BaseCommand):
             image_url = data["image_url"]
             image_name = data["image_name"]
 
-            moderation_result = moderate_event_content(title=title, description=description)
-            if not moderation_result["approved"]:
+            moderation_result = moderate_event_content(title=title, description=description, priority=PRIORITY_BATCH)
+            if not moderation_result["approved"] and not moderation_result.get("pending"):
                 self.stdout.write(
                     self.style.WARNING(
                         f"Skipped '{title}' — rejected by moderation: {moderation_result['reason']}"
@@ -277,7 +278,9 @@ class Command(BaseCommand):
                 description=description,
                 price=price,
                 date=date,
-                approved=True,
+                embedding=event_embedding(title, description),
+                approved=moderation_result["approved"],
+                moderation_pending=moderation_result.get("pending", False),
                 moderation_notes=moderation_result["reason"],
             )
 
@@ -295,10 +298,13 @@ class Command(BaseCommand):
                     ContentFile(image_data),
                     save=True,
                 )
+                store_image_variants(Event, event.id, "picture", event.picture.name)
 
             # Associa le prime due categorie disponibili
             event.category.set(categories[:2])
             created_count += 1
             self.stdout.write(self.style.SUCCESS(f"Created event: {event.title} (id={event.id})"))
 
+        # Place the new events in the similar events table, one pass for all of them
+        refresh_event_neighbors()
         self.stdout.write(self.style.SUCCESS(f"Done. Created {created_count} events for organizer666."))
\ No newline at end of file
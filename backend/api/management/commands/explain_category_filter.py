@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from api.models import Event, Participant
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints EXPLAIN ANALYZE of the category filter of the feed candidates and the public listing, through the "
+        "category M2M join (with DISTINCT) as before and through the `category_ids` overlap (GIN index). PostgreSQL only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--participant", default=None, help="Username of a participant whose categories are used.")
+        parser.add_argument("--categories", default="1,2,3", help="Comma separated category ids, without --participant.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("EXPLAIN ANALYZE of `&&` needs PostgreSQL.")
+
+        if options["participant"]:
+            try:
+                participant = Participant.objects.get(username=options["participant"])
+            except Participant.DoesNotExist:
+                raise CommandError(f"Participant '{options['participant']}' does not exist.")
+            category_ids = list(participant.categories.values_list("id", flat=True))
+            budget = participant.budget
+        else:
+            category_ids = [int(c) for c in options["categories"].split(",") if c.strip()]
+            budget = None
+
+        upcoming = Event.objects.filter(approved=True, date__gte=timezone.now())
+        if budget is not None:
+            upcoming = upcoming.filter(price__lte=budget)
+
+        self._explain("Feed candidates, M2M join", upcoming.filter(category__in=category_ids).distinct())
+        self._explain("Feed candidates, overlap", upcoming.filter(category_ids__overlap=category_ids))
+
+        public = Event.objects.filter(approved=True).order_by("date")
+        self._explain("Public listing, M2M join", public.filter(category__in=category_ids).distinct())
+        self._explain("Public listing, overlap", public.filter(category_ids__overlap=category_ids))
+
+    def _explain(self, name, queryset):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        self.stdout.write(queryset.explain(analyze=True, buffers=True))
+        self.stdout.write("")
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Fires concurrent authenticated requests at an endpoint and reports throughput and latency. "
+        "Run it against /api/participants/feed/ and /api/participants/feed/async/ with the fake LLM server "
+        "to compare the sync and async views."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="Full URL to hit, e.g. http://localhost:8000/api/participants/feed/async/")
+        parser.add_argument("--token", required=True, help="JWT access token sent as Bearer authorization.")
+        parser.add_argument("--method", default="GET")
+        parser.add_argument("--json", default=None, help="Optional JSON body for POST requests.")
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--concurrency", type=int, default=10)
+        parser.add_argument("--timeout", type=float, default=120.0)
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+
+        latencies, errors, elapsed = asyncio.run(self._run(options))
+
+        if not latencies:
+            raise CommandError(f"All {errors} requests failed.")
+
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+        self.stdout.write(f"Requests:    {options['requests']} ({errors} failed)")
+        self.stdout.write(f"Concurrency: {options['concurrency']}")
+        self.stdout.write(f"Total time:  {elapsed:.2f}s")
+        self.stdout.write(f"Throughput:  {len(latencies) / elapsed:.2f} req/s")
+        self.stdout.write(f"Latency:     p50 {p50 * 1000:.0f}ms, p95 {p95 * 1000:.0f}ms, max {latencies[-1] * 1000:.0f}ms")
+
+    async def _run(self, options):
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        headers = {"Authorization": f"Bearer {options['token']}"}
+        if options["json"]:
+            headers["Content-Type"] = "application/json"
+
+        latencies = []
+        errors = 0
+
+        async with httpx.AsyncClient(timeout=options["timeout"], headers=headers) as client:
+
+            async def one_request():
+                nonlocal errors
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.request(options["method"], options["url"], content=options["json"])
+                        response.raise_for_status()
+                    except httpx.HTTPError as e:
+                        errors += 1
+                        self.stderr.write(f"Request failed: {e}")
+                        return
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one_request() for _ in range(options["requests"])))
+            elapsed = time.perf_counter() - start
+
+        return latencies, errors, elapsed
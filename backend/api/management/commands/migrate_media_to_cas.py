@@ -0,0 +1,88 @@
+import time
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management.base import BaseCommand
+
+from api.backends.storage import CAS_NAME
+from api.models import ArchivedEvent, Event, User
+
+# (model, image field, variants field)
+IMAGE_FIELDS = [
+    (Event, "picture", "picture_variants"),
+    (ArchivedEvent, "picture", "picture_variants"),
+    (User, "profile_image", "profile_image_variants"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves the media files saved before the content-addressed storage (images/<folder>/<uuid>.<ext>) to their "
+        "content-addressed names, deduplicating identical files, and rewrites the paths in the database. Files are "
+        "streamed and hashed in chunks. Safe to interrupt and run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only count the files that would move.")
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows read per query.")
+
+    def handle(self, *args, **options):
+        self.legacy = FileSystemStorage(location=settings.MEDIA_ROOT)
+        self.dry_run = options["dry_run"]
+        self.moved = self.missing = 0
+        self.moved_bytes = 0
+        start = time.perf_counter()
+
+        for model, field, variants_field in IMAGE_FIELDS:
+            rows = (
+                model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+                .order_by("pk").values_list("pk", field, variants_field)
+            )
+            for pk, name, variants in rows.iterator(chunk_size=options["batch_size"]):
+                self._migrate_row(model, field, variants_field, pk, name, variants or {})
+
+        verb = "Would move" if self.dry_run else "Moved"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {self.moved} files ({self.moved_bytes / 2**20:.1f} MiB) in {time.perf_counter() - start:.2f}s."
+        ))
+        if self.missing:
+            self.stdout.write(self.style.WARNING(f"{self.missing} files referenced in the database don't exist, left as they are."))
+
+    def _migrate_row(self, model, field, variants_field, pk, name, variants):
+        old = [n for n in [name, *variants.values()] if not CAS_NAME.match(n)]
+        if not old:
+            return
+
+        if self.dry_run:
+            for n in old:
+                if self.legacy.exists(n):
+                    self.moved += 1
+                    self.moved_bytes += self.legacy.size(n)
+                else:
+                    self.missing += 1
+            return
+
+        new = {n: self._copy(n) for n in old}
+        updates = {
+            field: new.get(name, name),
+            variants_field: {width: new.get(n, n) for width, n in variants.items()},
+        }
+        # Only if the row still points to the old files, otherwise it changed meanwhile and the copies go
+        if model.objects.filter(pk=pk, **{field: name}).update(**updates):
+            for old_name, new_name in new.items():
+                if new_name != old_name:
+                    self.legacy.delete(old_name)
+        else:
+            for old_name, new_name in new.items():
+                if new_name != old_name:
+                    default_storage.delete(new_name)
+
+    def _copy(self, name):
+        if not self.legacy.exists(name):
+            self.missing += 1
+            return name
+        with self.legacy.open(name, "rb") as file:
+            new_name = default_storage.save(name, file)
+        self.moved += 1
+        self.moved_bytes += self.legacy.size(name)
+        return new_name
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Event
+from api.utils import moderate_event_content, PRIORITY_BATCH
+from api.utils.event_neighbors import update_event_neighbors
+
+
+class Command(BaseCommand):
+    help = "Run the LLM moderation on events created while it was unavailable (moderation_pending=True)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=100, help="Maximum number of events to moderate.")
+
+    def handle(self, *args, **options):
+        events = Event.objects.filter(moderation_pending=True).order_by("created_at")[:options["limit"]]
+
+        approved = rejected = still_pending = 0
+        for event in events:
+            result = moderate_event_content(title=event.title, description=event.description, priority=PRIORITY_BATCH)
+
+            if result.get("pending"):
+                # LLM still down, no point trying the next ones
+                still_pending += 1
+                break
+
+            event.approved = result["approved"]
+            event.moderation_pending = False
+            event.moderation_notes = result["reason"]
+            event.save(update_fields=["approved", "moderation_pending", "moderation_notes", "updated_at"])
+
+            if event.approved:
+                update_event_neighbors(event.id)
+                approved += 1
+            else:
+                rejected += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Approved {approved}, rejected {rejected} events."))
+        if still_pending:
+            self.stdout.write(self.style.WARNING("Moderation is still unavailable, remaining events are left pending."))
@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Profiles the import time of the server entrypoint with `python -X importtime` "
+        "and reports the slowest modules, i.e. what every (re)started worker pays before serving."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--module", default="config.asgi", help="Module to import, e.g. config.asgi or config.wsgi.")
+        parser.add_argument("--top", type=int, default=20, help="How many modules to list.")
+        parser.add_argument("--self-time", action="store_true", help="Sort by self time instead of cumulative time.")
+
+    def handle(self, *args, **options):
+        module = options["module"]
+
+        # A fresh interpreter, otherwise every module would already be imported by manage.py.
+        # The URLconf (views, serializers, DRF...) is only imported on the first request, so load it too
+        code = f"import {module}; from django.urls import get_resolver; get_resolver().url_patterns"
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True,
+            text=True,
+            env=os.environ.copy(),
+        )
+
+        if result.returncode != 0:
+            raise CommandError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+        rows = self._parse(result.stderr)
+        if not rows:
+            raise CommandError("No import timings found in the interpreter output.")
+
+        # Top level modules are the ones with the least indentation, their cumulative time is the total
+        min_depth = min(depth for _, _, depth, _ in rows)
+        total_us = sum(cumulative for _, cumulative, depth, _ in rows if depth == min_depth)
+
+        key = 0 if options["self_time"] else 1
+        rows.sort(key=lambda row: row[key], reverse=True)
+
+        self.stdout.write(f"Importing {module}: {len(rows)} modules, {total_us / 1000:.1f}ms total")
+        self.stdout.write(f"{'self [ms]':>10} {'cumul [ms]':>11}  module")
+        for self_us, cumulative_us, _, name in rows[:options["top"]]:
+            self.stdout.write(f"{self_us / 1000:>10.1f} {cumulative_us / 1000:>11.1f}  {name}")
+
+        heavy = [name for name in ("openai", "httpx", "PIL", "numpy") if any(row[3] == name for row in rows)]
+        if heavy:
+            self.stdout.write(self.style.WARNING(f"Heavy packages imported at startup: {', '.join(heavy)}"))
+
+    def _parse(self, stderr):
+        """
+        Parses lines like `import time:       773 |     399258 |   openai` into (self, cumulative, depth, name).
+        """
+        rows = []
+        for line in stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+
+            parts = line[len("import time:"):].split("|")
+            if len(parts) != 3 or not parts[0].strip().isdigit():
+                continue  # header line
+
+            name = parts[2].rstrip()
+            depth = len(name) - len(name.lstrip())
+            rows.append((int(parts[0]), int(parts[1]), depth, name.strip()))
+
+        return rows
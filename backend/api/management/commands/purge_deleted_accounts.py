@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.models import User
+from api.utils import purge_account
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the accounts that asked to be deleted (deletion_requested_at set) with their events, swipes and media "
+        "files, in batches of raw deletes. Meant to run periodically, an interrupted run resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows deleted per statement.")
+        parser.add_argument("--limit", type=int, default=20, help="Maximum number of accounts to delete.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        users = User.objects.filter(deletion_requested_at__isnull=False).order_by("deletion_requested_at")[:options["limit"]]
+
+        accounts = rows = 0
+        for user in users:
+            rows += purge_account(user, options["batch_size"])
+            accounts += 1
+
+        if accounts:
+            from api.utils.event_neighbors import refresh_event_neighbors
+
+            refresh_event_neighbors()  # refill the similar events lists the deleted events were in
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {accounts} accounts ({rows} rows) in {time.perf_counter() - start:.2f}s."
+        ))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.utils.event_neighbors import rebuild_event_neighbors, refresh_event_neighbors
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintains the similar events table: drops the events that expired or were unapproved and refills the lists "
+        "they were in. Meant to run periodically, creations and updates are already applied in the background as they "
+        "happen (--full also catches up the ones a restart lost)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rebuild the whole table instead.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+
+        if options["full"]:
+            events, rows = rebuild_event_neighbors()
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt the neighbors of {events} events ({rows} rows) in {time.perf_counter() - start:.2f}s."
+            ))
+            return
+
+        recomputed = refresh_event_neighbors()
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {recomputed} neighbor lists in {time.perf_counter() - start:.2f}s."
+        ))
@@ -0,0 +1,66 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from api.models import ArchivedEvent, Event, User
+from api.utils import store_image_variants
+
+logger = logging.getLogger(__name__)
+
+
+def _store(model, pk, field, name, replaces):
+    try:
+        return bool(store_image_variants(model, pk, field, name, replaces=replaces))
+    except Exception:
+        logger.exception("Image variants of %s failed.", name)
+        return False
+    finally:
+        connection.close()  # the thread's own connection
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders the WebP variants, size and BlurHash placeholder of the event pictures and profile images that "
+        "miss them: uploaded before they existed, or whose background rendering was lost to a restart. Images are "
+        "rendered in parallel threads with --workers (Pillow decodes and encodes without the GIL, big images in "
+        "subprocesses). Images whose rendering failed IMAGE_RENDER_MAX_FAILURES times are skipped, unless --retry-failed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=500, help="Maximum number of images to render.")
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Images rendered at the same time, each can take up to IMAGE_DECODE_MEMORY_MB.",
+        )
+        parser.add_argument("--retry-failed", action="store_true", help="Also retry the images that failed too often.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        limit = options["limit"]
+
+        pending = []
+        for model, field in [(Event, "picture"), (ArchivedEvent, "picture"), (User, "profile_image")]:
+            missing = Q(**{f"{field}_variants": {}}) | Q(**{f"{field}_placeholder": ""})
+            queryset = model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True}).filter(missing)
+            if not options["retry_failed"]:
+                queryset = queryset.filter(**{f"{field}_render_failures__lt": settings.IMAGE_RENDER_MAX_FAILURES})
+            rows = queryset.order_by("pk").values_list("pk", field, f"{field}_variants")[:limit - len(pending)]
+            pending += [(model, pk, field, name, variants) for pk, name, variants in rows]
+
+        with ThreadPoolExecutor(max_workers=options["workers"], thread_name_prefix="render-images") as executor:
+            results = list(executor.map(lambda args: _store(*args), pending))
+
+        rendered = sum(results)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {rendered} images with {options['workers']} workers in {time.perf_counter() - start:.2f}s."
+        ))
+        if rendered < len(results):
+            self.stdout.write(self.style.WARNING(
+                f"{len(results) - rendered} images couldn't be read or were replaced meanwhile, see the log. The failures "
+                f"are counted, an image is skipped after {settings.IMAGE_RENDER_MAX_FAILURES} of them."
+            ))
@@ -0,0 +1,120 @@
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """
+    Answers OpenAI-compatible `POST /chat/completions` requests after a fixed delay.
+    Ranking prompts get back the event ids in the order they were sent, moderation prompts are always approved.
+    """
+    delay = 1.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        messages = body.get("messages", [])
+        prompt = "\n".join(m.get("content", "") for m in messages)
+
+        if "ranked_event_ids" in prompt:
+            # Event table lines start with the id: "12|19.99|..."
+            ids = [int(i) for i in re.findall(r'^(\d+)\|', prompt, re.MULTILINE)]
+            content = json.dumps({"ranked_event_ids": ids})
+        else:
+            content = json.dumps({"approved": True, "reason": "Approved by the fake LLM server."})
+
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        }
+
+        if body.get("stream"):
+            self._stream(body, content, usage)
+            return
+
+        time.sleep(self.delay)
+
+        payload = {
+            "id": "fake-completion",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": usage,
+        }
+
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, body, content, usage):
+        """
+        Server-sent events like the OpenAI streaming API: the first chunk after a fifth of the delay,
+        the rest of the delay spread over the following chunks (one per ranked id).
+        """
+        pieces = re.findall(r'[^,]+,?', content) or [content]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        time.sleep(self.delay * 0.2)
+        for index, piece in enumerate(pieces):
+            if index:
+                time.sleep(self.delay * 0.8 / len(pieces))
+            self._send_chunk(body, {"choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+
+        self._send_chunk(body, {"choices": [], "usage": usage})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_chunk(self, body, fields):
+        chunk = {
+            "id": "fake-completion",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            **fields,
+        }
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a local OpenAI-compatible fake LLM server with a fixed latency, for load testing. "
+        "Point the backend to it with OPENROUTER_BASE_URL=http://<host>:<port>."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="0.0.0.0")
+        parser.add_argument("--port", type=int, default=8001)
+        parser.add_argument("--delay", type=float, default=1.0, help="Seconds to wait before answering each completion.")
+
+    def handle(self, *args, **options):
+        FakeLLMHandler.delay = options["delay"]
+        server = ThreadingHTTPServer((options["host"], options["port"]), FakeLLMHandler)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Fake LLM server listening on {options['host']}:{options['port']} (delay {options['delay']}s)"
+        ))
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_event_moderation_notes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='moderation_pending',
+            field=models.BooleanField(default=False),
+        ),
+    ]
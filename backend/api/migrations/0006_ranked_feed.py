@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_event_moderation_pending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.CreateModel(
+            name='RankedFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_ids', models.JSONField(default=list)),
+                ('built_at', models.DateTimeField()),
+                ('full_ranked_at', models.DateTimeField()),
+                ('participant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ranked_feed', to='api.participant')),
+            ],
+        ),
+    ]
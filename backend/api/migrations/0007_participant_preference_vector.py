@@ -0,0 +1,90 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:24
+
+import re
+import zlib
+from array import array
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of `api.utils.preferences` as of this migration: later changes there don't change what it does
+
+CATEGORY_SLOTS = 32
+TEXT_SLOTS = 64
+PRICE_BAND_LIMITS = (0, 10, 25, 50, 100)
+PRICE_OFFSET = CATEGORY_SLOTS
+TEXT_OFFSET = PRICE_OFFSET + len(PRICE_BAND_LIMITS) + 1
+PREFERENCE_VECTOR_SIZE = TEXT_OFFSET + TEXT_SLOTS
+
+WORD = re.compile(r"\w{3,}")
+
+
+def price_band(price):
+    for band, limit in enumerate(PRICE_BAND_LIMITS):
+        if price <= limit:
+            return band
+    return len(PRICE_BAND_LIMITS)
+
+
+def event_features(category_ids, price, title):
+    features = {}
+    for category_id in category_ids:
+        slot = category_id % CATEGORY_SLOTS
+        features[slot] = features.get(slot, 0.0) + 1.0 / len(category_ids)
+
+    features[PRICE_OFFSET + price_band(price)] = 1.0
+
+    words = WORD.findall(title.lower())
+    for word in words:
+        slot = TEXT_OFFSET + zlib.crc32(word.encode()) % TEXT_SLOTS
+        features[slot] = features.get(slot, 0.0) + 1.0 / len(words)
+    return features
+
+
+def update_preference_vector(blob, features, liked):
+    vector = array("f")
+    if blob and len(blob) == PREFERENCE_VECTOR_SIZE * vector.itemsize:
+        vector.frombytes(bytes(blob))
+    else:
+        vector = array("f", bytes(PREFERENCE_VECTOR_SIZE * vector.itemsize))
+
+    decay = getattr(settings, 'PREFERENCE_DECAY', 0.1)
+    target = 1.0 if liked else -getattr(settings, 'PREFERENCE_DISLIKE_WEIGHT', 0.5)
+    for i in range(len(vector)):
+        vector[i] *= 1.0 - decay
+    for slot, weight in features.items():
+        vector[slot] += decay * target * weight
+    return vector.tobytes()
+
+
+def build_preference_vectors(apps, schema_editor):
+    """
+    Replays the existing swipes, oldest first, into the new preference vectors.
+    """
+    Participant = apps.get_model('api', 'Participant')
+    Swipe = apps.get_model('api', 'Swipe')
+
+    for participant in Participant.objects.filter(swipes__isnull=False).distinct().iterator():
+        vector = None
+        swipes = Swipe.objects.filter(participant=participant).select_related('event').prefetch_related('event__category')
+        for swipe in swipes.order_by('created_at', 'id'):
+            event = swipe.event
+            features = event_features([c.id for c in event.category.all()], event.price, event.title)
+            vector = update_preference_vector(vector, features, swipe.liked)
+        Participant.objects.filter(pk=participant.pk).update(preference_vector=vector)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_ranked_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='preference_vector',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(build_preference_vectors, migrations.RunPython.noop),
+    ]
\ No newline at end of file
@@ -0,0 +1,113 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:27
+
+import math
+import re
+import zlib
+from array import array
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copies of `api.utils.embeddings` and `api.utils.preferences.update_taste_embedding` as of this migration:
+# later changes there don't change what it does
+
+EMBEDDING_SIZE = 128
+TITLE_WEIGHT = 2.0
+
+WORD = re.compile(r"\w+")
+
+
+def ngrams(text):
+    words = WORD.findall(text.lower())
+    grams = list(words)
+    grams += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    grams += [f"#{w[i:i + 3]}" for w in words if len(w) > 3 for i in range(len(w) - 2)]
+    return grams
+
+
+def event_embedding(title, description):
+    vector = [0.0] * EMBEDDING_SIZE
+    for text, weight in ((title, TITLE_WEIGHT), (description, 1.0)):
+        for gram, count in Counter(ngrams(text)).items():
+            h = zlib.crc32(gram.encode())
+            value = weight * (1.0 + math.log(count))
+            vector[h % EMBEDDING_SIZE] += value if h & 0x80000000 else -value
+
+    norm = math.sqrt(sum(x * x for x in vector))
+    return array("f", [x / norm for x in vector] if norm else vector).tobytes()
+
+
+def load_embedding(blob):
+    vector = array("f")
+    if not blob or len(blob) != EMBEDDING_SIZE * vector.itemsize:
+        return None
+    vector.frombytes(bytes(blob))
+    return vector
+
+
+def update_taste_embedding(blob, embedding, liked):
+    vector = load_embedding(blob) or array("f", bytes(EMBEDDING_SIZE * 4))
+    decay = getattr(settings, 'PREFERENCE_DECAY', 0.1)
+    target = 1.0 if liked else -getattr(settings, 'PREFERENCE_DISLIKE_WEIGHT', 0.5)
+    for i in range(len(vector)):
+        vector[i] *= 1.0 - decay
+    for i, weight in enumerate(embedding):
+        vector[i] += decay * target * weight
+    return vector.tobytes()
+
+
+BATCH_SIZE = 500
+
+
+def build_embeddings(apps, schema_editor):
+    """
+    Embeds the existing events, then replays the swipes, oldest first, into the participants' taste embeddings.
+    Both are read and written in batches, the memory used doesn't grow with the catalog.
+    """
+    Event = apps.get_model('api', 'Event')
+    Participant = apps.get_model('api', 'Participant')
+    Swipe = apps.get_model('api', 'Swipe')
+
+    batch = []
+    for event in Event.objects.only('id', 'title', 'description').iterator(chunk_size=BATCH_SIZE):
+        event.embedding = event_embedding(event.title, event.description)
+        batch.append(event)
+        if len(batch) == BATCH_SIZE:
+            Event.objects.bulk_update(batch, ['embedding'])
+            batch = []
+    Event.objects.bulk_update(batch, ['embedding'])
+
+    batch = []
+    for participant in Participant.objects.filter(swipes__isnull=False).distinct().only('pk').iterator(chunk_size=BATCH_SIZE):
+        taste = None
+        swipes = Swipe.objects.filter(participant=participant).order_by('created_at', 'id').values_list('event__embedding', 'liked')
+        for embedding, liked in swipes.iterator(chunk_size=BATCH_SIZE):
+            taste = update_taste_embedding(taste, load_embedding(embedding), liked)
+        participant.taste_embedding = taste
+        batch.append(participant)
+        if len(batch) == BATCH_SIZE:
+            Participant.objects.bulk_update(batch, ['taste_embedding'])
+            batch = []
+    Participant.objects.bulk_update(batch, ['taste_embedding'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_participant_preference_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='embedding',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='taste_embedding',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(build_embeddings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_event_embedding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='api.event')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.event')),
+            ],
+            options={
+                'unique_together': {('event', 'neighbor')},
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:33
+
+import math
+import time
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def decayed_popularity(popularity, popularity_at, now):
+    # Frozen copy of `api.utils.trending.decayed_popularity` as of this migration
+    rate = math.log(2) / getattr(settings, 'POPULARITY_HALF_LIFE', 259200)
+    return popularity * math.exp(max(rate * (popularity_at - now), -50.0))
+
+
+def build_popularity(apps, schema_editor):
+    """
+    Counts the existing likes, each decayed from the time of its swipe.
+    """
+    Event = apps.get_model('api', 'Event')
+    Swipe = apps.get_model('api', 'Swipe')
+
+    now = time.time()
+    popularity = {}
+    for event_id, created_at in Swipe.objects.filter(liked=True).values_list('event_id', 'created_at').iterator():
+        popularity[event_id] = popularity.get(event_id, 0.0) + decayed_popularity(1.0, created_at.timestamp(), now)
+
+    for event_id, value in popularity.items():
+        Event.objects.filter(pk=event_id).update(popularity=value, popularity_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_event_neighbor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='popularity',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='popularity_at',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(build_popularity, migrations.RunPython.noop),
+    ]
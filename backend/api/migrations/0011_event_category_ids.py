@@ -0,0 +1,50 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:39
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+# Frozen copy of `api.utils.event_categories.event_category_ids` as of this migration:
+# later changes there don't change what it does
+
+
+def event_category_ids(event_ids, through):
+    by_event = {event_id: [] for event_id in event_ids}
+    rows = through.objects.filter(event_id__in=by_event).order_by('category_id').values_list('event_id', 'category_id')
+    for event_id, category_id in rows:
+        by_event[event_id].append(category_id)
+    return by_event
+
+
+def copy_category_ids(apps, schema_editor):
+    """
+    Copies the category M2M of the existing events into `category_ids`.
+    """
+    Event = apps.get_model('api', 'Event')
+
+    event_ids = list(Event.objects.values_list('id', flat=True))
+    for start in range(0, len(event_ids), 1000):
+        by_event = event_category_ids(event_ids[start:start + 1000], Event.category.through)
+        for event_id, category_ids in by_event.items():
+            Event.objects.filter(pk=event_id).update(category_ids=category_ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_event_popularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='category_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None),
+        ),
+        # Before the index, so it's built once instead of updated per row
+        migrations.RunPython(copy_category_ids, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['category_ids'], name='event_category_ids_gin'),
+        ),
+    ]
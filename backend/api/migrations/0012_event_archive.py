@@ -0,0 +1,63 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:42
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_event_category_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEvent',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('picture', models.ImageField(blank=True, null=True, upload_to='')),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.TextField()),
+                ('category_ids', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('date', models.DateTimeField()),
+                ('approved', models.BooleanField(default=False)),
+                ('moderation_notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedSwipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('liked', models.BooleanField()),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('approved', True)), fields=['date'], name='event_approved_date'),
+        ),
+        migrations.AddField(
+            model_name='archivedevent',
+            name='organizer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_events', to='api.organizer'),
+        ),
+        migrations.AddField(
+            model_name='archivedswipe',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='swipes', to='api.archivedevent'),
+        ),
+        migrations.AddField(
+            model_name='archivedswipe',
+            name='participant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_swipes', to='api.participant'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='archivedswipe',
+            unique_together={('participant', 'event')},
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:43
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built without locking writes on the tables the endpoints use
+    atomic = False
+
+    dependencies = [
+        ('api', '0012_event_archive'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='archivedevent',
+            index=models.Index(fields=['organizer', '-created_at'], name='archive_organizer_created'),
+        ),
+        AddIndexConcurrently(
+            model_name='event',
+            index=models.Index(fields=['organizer', '-created_at'], name='event_organizer_created'),
+        ),
+        AddIndexConcurrently(
+            model_name='swipe',
+            index=models.Index(fields=['participant', 'liked', 'created_at'], name='swipe_participant_liked'),
+        ),
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(fields=['email'], name='user_email'),
+        ),
+    ]
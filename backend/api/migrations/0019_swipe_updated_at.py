@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-20 09:12
+
+import django.utils.timezone
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built without locking writes on the swipes
+    atomic = False
+
+    dependencies = [
+        ('api', '0018_image_render_failures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='swipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        AddIndexConcurrently(
+            model_name='swipe',
+            index=models.Index(fields=['updated_at', 'id'], name='swipe_updated'),
+        ),
+    ]
@@ -1,4 +1,8 @@
 from .user import *
 from .event import *   
 from .category import *
-from .swipe import *
\ No newline at end of file
+from .swipe import *
+from .ranked_feed import *
+from .event_neighbor import *
+from .event_archive import *
+from .media_blob import *
\ No newline at end of file
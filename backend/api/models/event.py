@@ -1,3 +1,5 @@
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from .user import Organizer
 from .category import Category
@@ -16,18 +18,42 @@ class Event(models.Model):
     organizer = models.ForeignKey(Organizer, on_delete=models.CASCADE, related_name="events")
 
     picture = models.ImageField(upload_to=_get_event_image_path, null=True, blank=True)
+    picture_variants = models.JSONField(default=dict, blank=True)  # width -> WebP rendition, see `api.utils.image_variants`
+    # Displayed size and BlurHash of the picture, the clients lay out and paint the card before it loads
+    picture_width = models.PositiveIntegerField(null=True, blank=True)
+    picture_height = models.PositiveIntegerField(null=True, blank=True)
+    picture_placeholder = models.CharField(max_length=32, blank=True, default="")
+    # Renderings of the picture that failed, `render_image_variants` gives up after IMAGE_RENDER_MAX_FAILURES
+    picture_render_failures = models.PositiveSmallIntegerField(default=0)
     title = models.CharField(max_length=100)
     description = models.TextField()
     category = models.ManyToManyField(Category, related_name="events")
+    # Copy of the category M2M ids, kept in sync by `api.utils.event_categories`: filters use `&&` without a join
+    category_ids = ArrayField(models.IntegerField(), default=list, blank=True)
 
     price = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateTimeField()
+    embedding = models.BinaryField(null=True, blank=True)  # float32 vector of title and description, see `api.utils.embeddings`
 
     # AI moderation: only approved events appear in feed
     approved = models.BooleanField(default=False)
     moderation_notes = models.TextField(blank=True, null=True)  # why approved/rejected
+    moderation_pending = models.BooleanField(default=False)  # moderation couldn't run, waiting for moderate_pending_events
+
+    # Likes decayed over time (POPULARITY_HALF_LIFE), as of popularity_at (unix time), see `api.utils.trending`
+    popularity = models.FloatField(default=0)
+    popularity_at = models.FloatField(default=0)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # ranked feeds built before this place the event again
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["category_ids"], name="event_category_ids_gin"),
+            # Every listing reads approved events by date from now on, past events are archived (`archive_past_events`)
+            models.Index(fields=["date"], condition=models.Q(approved=True), name="event_approved_date"),
+            models.Index(fields=["organizer", "-created_at"], name="event_organizer_created"),
+        ]
 
     def __str__(self):
         return self.title
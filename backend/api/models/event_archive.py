@@ -0,0 +1,56 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+from .user import Organizer, Participant
+
+class ArchivedEvent(models.Model):
+    """
+    Event past its date, moved out of the Event table by `archive_past_events` so the feed and listings
+    only go through upcoming rows. Keeps the id it had as an Event. Read-only history for its organizer.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    organizer = models.ForeignKey(Organizer, on_delete=models.CASCADE, related_name="archived_events")
+
+    picture = models.ImageField(null=True, blank=True)  # the file stays where the Event had it
+    picture_variants = models.JSONField(default=dict, blank=True)
+    picture_width = models.PositiveIntegerField(null=True, blank=True)
+    picture_height = models.PositiveIntegerField(null=True, blank=True)
+    picture_placeholder = models.CharField(max_length=32, blank=True, default="")
+    picture_render_failures = models.PositiveSmallIntegerField(default=0)
+    title = models.CharField(max_length=100)
+    description = models.TextField()
+    category_ids = ArrayField(models.IntegerField(), default=list, blank=True)
+
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    date = models.DateTimeField()
+
+    approved = models.BooleanField(default=False)
+    moderation_notes = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["organizer", "-created_at"], name="archive_organizer_created"),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedSwipe(models.Model):
+    """
+    Swipe on an archived event, moved out of the Swipe table along with it.
+    """
+    participant = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name="archived_swipes")
+    event = models.ForeignKey(ArchivedEvent, on_delete=models.CASCADE, related_name="swipes")
+
+    liked = models.BooleanField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("participant", "event")
+
+    def __str__(self):
+        return f"{self.participant.username} -> {self.event.title} ({'like' if self.liked else 'dislike'})"
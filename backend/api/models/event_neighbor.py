@@ -0,0 +1,18 @@
+from django.db import models
+from .event import Event
+
+class EventNeighbor(models.Model):
+    """
+    Precomputed "similar events" entry: `neighbor` is one of the approved upcoming events most similar to `event`.
+    Maintained incrementally by `api.utils.event_neighbors`.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="neighbors")
+    neighbor = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="+")
+
+    score = models.FloatField()  # cosine similarity of the embeddings
+
+    class Meta:
+        unique_together = ("event", "neighbor")
+
+    def __str__(self):
+        return f"{self.event_id} -> {self.neighbor_id} ({self.score:.2f})"
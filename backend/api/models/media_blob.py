@@ -0,0 +1,14 @@
+from django.db import models
+
+class MediaBlob(models.Model):
+    """
+    A file of the content-addressed media storage (`api.backends.storage`), stored once however many rows use it.
+    `references` counts the saves of that content not deleted yet, the file goes with the last one.
+    """
+    name = models.CharField(max_length=255, unique=True)  # images/ab/cd/<sha256>.<ext>
+    size = models.BigIntegerField()
+    references = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.references} references)"
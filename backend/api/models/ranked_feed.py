@@ -0,0 +1,15 @@
+from django.db import models
+from .user import Participant
+
+class RankedFeed(models.Model):
+    """
+    Last ranked order of a participant's feed, so a refresh only has to place the events that are new since then.
+    """
+    participant = models.OneToOneField(Participant, on_delete=models.CASCADE, related_name="ranked_feed")
+
+    event_ids = models.JSONField(default=list)  # most relevant first
+    built_at = models.DateTimeField()           # events changed after this are ranked again
+    full_ranked_at = models.DateTimeField()     # last time every candidate went through the LLM
+
+    def __str__(self):
+        return f"{self.participant.username} feed ({len(self.event_ids)} events)"
@@ -8,9 +8,17 @@ class Swipe(models.Model):
 
     liked = models.BooleanField()  # True = right swipe, False = left swipe
     created_at = models.DateTimeField(auto_now_add=True)
+    # Swipes are updated in place (same event swiped again), `build_colike_model` follows the changes with it
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("participant", "event")  # cannot swipe same event twice
+        indexes = [
+            # liked event ids of a participant (user profile, co-like scores)
+            models.Index(fields=["participant", "liked", "created_at"], name="swipe_participant_liked"),
+            # swipes changed since the last co-like model update
+            models.Index(fields=["updated_at", "id"], name="swipe_updated"),
+        ]
 
     def __str__(self):
         return f"{self.participant.username} -> {self.event.title} ({'like' if self.liked else 'dislike'})"
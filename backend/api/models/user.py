@@ -80,6 +80,15 @@ class User(AbstractUser):
     email = models.EmailField(null=True, blank=True)
     role = models.CharField(max_length=20, choices=Roles.choices(), default=Roles.PARTICIPANT.value)
     profile_image = models.ImageField(upload_to=_get_profile_image_path, null=True, blank=True)
+    profile_image_variants = models.JSONField(default=dict, blank=True)  # width -> WebP rendition, see `api.utils.image_variants`
+    # Displayed size and BlurHash of the profile image, painted while it loads
+    profile_image_width = models.PositiveIntegerField(null=True, blank=True)
+    profile_image_height = models.PositiveIntegerField(null=True, blank=True)
+    profile_image_placeholder = models.CharField(max_length=32, blank=True, default="")
+    # Renderings of the profile image that failed, `render_image_variants` gives up after IMAGE_RENDER_MAX_FAILURES
+    profile_image_render_failures = models.PositiveSmallIntegerField(default=0)
+    # Set when the account asked to be deleted, `purge_deleted_accounts` deletes it and everything it owns
+    deletion_requested_at = models.DateTimeField(null=True, blank=True)
     
 
     objects = UserManager()
@@ -95,8 +104,13 @@ class User(AbstractUser):
                 name='unique_email_non_admin'
             )
         ]
+        indexes = [
+            # the unique constraint is partial, a lookup by email alone (login, password reset) can't use it
+            models.Index(fields=['email'], name='user_email'),
+        ]
     
     def to_dict(self):
+        from ..utils import image_payload
         return {
             'id': self.id,
             'role': self.role,
@@ -104,7 +118,7 @@ class User(AbstractUser):
             'date_joined': self.date_joined.strftime('%Y-%m-%d') if self.date_joined else None,
             'username': self.username,
             'email': self.email,
-            'profile_image': self.profile_image.url if self.profile_image else None,
+            **image_payload(self, 'profile_image'),
         }
 
 
@@ -157,6 +171,10 @@ class Participant(User):
 
     categories = models.ManyToManyField("Category", related_name="participants", blank=True)
     budget = models.DecimalField(max_digits=10, decimal_places=2, default=999999)
+    # float32 preference vector learned from the swipes, see `api.utils.preferences`
+    preference_vector = models.BinaryField(null=True, blank=True)
+    # float32 running average of the swiped events' embeddings, see `api.utils.embeddings`
+    taste_embedding = models.BinaryField(null=True, blank=True)
 
     def save(self, *args, **kwargs):
         if not self.pk:
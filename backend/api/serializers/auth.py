@@ -127,6 +127,8 @@ class VerifyUserEmailSerializer(UIDTokenValidationSerializer):
 
         if attrs['user'].is_active:
             raise serializers.ValidationError('Account already verified.')
+        if attrs['user'].deletion_requested_at:
+            raise serializers.ValidationError('Account deleted.')
 
         return attrs
 
@@ -161,7 +163,7 @@ class LoginSerializer(serializers.Serializer):
 
         user = authenticate(username=identifier, password=password)
 
-        if not user:
+        if not user or user.deletion_requested_at:
             raise PermissionDenied('Invalid credentials.')
 
         if not user.is_active:
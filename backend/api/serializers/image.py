@@ -1,13 +1,16 @@
 from rest_framework import serializers
 from ..utils import(
     UserValidationMixin,
+    schedule_image_variants,
+    delete_image_variants,
+    BoundedImageField,
 )
 
 class UploadProfileImageSerializer(UserValidationMixin, serializers.Serializer):
     """
     Uploads a profile image to the profile of a given user
     """
-    profile_image = serializers.ImageField(required=True)
+    profile_image = BoundedImageField(required=True)
 
     def validate(self, attrs):
         attrs = self.validate_user(attrs)
@@ -15,8 +18,14 @@ class UploadProfileImageSerializer(UserValidationMixin, serializers.Serializer):
 
     def update(self, instance, validated_data):
         instance.profile_image.delete(save=False) # Delete previous image (if any) before updating
+        delete_image_variants(instance.profile_image_variants)
         instance.profile_image = validated_data['profile_image']
+        instance.profile_image_variants = {}
+        instance.profile_image_width = instance.profile_image_height = None
+        instance.profile_image_placeholder = ""
+        instance.profile_image_render_failures = 0
         instance.save()
+        schedule_image_variants(instance, 'profile_image')
         return instance
     
     def save(self, **kwargs):
@@ -34,5 +43,10 @@ class DeleteProfileImageSerializer(UserValidationMixin, serializers.Serializer):
     def delete(self):
         user = self.validated_data['user']
         user.profile_image.delete(save=False)
+        delete_image_variants(user.profile_image_variants)
         user.profile_image = None
+        user.profile_image_variants = {}
+        user.profile_image_width = user.profile_image_height = None
+        user.profile_image_placeholder = ""
+        user.profile_image_render_failures = 0
         user.save()
\ No newline at end of file
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from ..models import Event
+from ..models import ArchivedEvent, Event
 from ..utils import (
     GetOrganizersMixin,
     OrganizerValidationMixin,
@@ -7,6 +7,11 @@ from ..utils import (
     CategoryValidationMixin,
     GetEventsMixin,
     GetOrganizersMixin,
+    event_embedding,
+    request_account_deletion,
+    BoundedImageField,
+    schedule_image_variants,
+    delete_image_variants,
 )
 
 
@@ -26,13 +31,14 @@ class GetOrganizerProfileSerializer(OrganizerValidationMixin, GetOrganizersMixin
 class DeleteOrganizerProfileSerializer(OrganizerValidationMixin, serializers.Serializer):
     """
     Organizer only: Deletes a given existing organizer account.
+    The account is deactivated and its events hidden now, `purge_deleted_accounts` deletes the rows and files later.
     """
     def validate(self, attrs):
         attrs = self.validate_organizer(attrs)
         return attrs
 
     def delete(self):
-        self.validated_data['organizer'].delete()
+        request_account_deletion(self.validated_data['organizer'])
 
 
 class GetOrganizerEventsSerializer(OrganizerValidationMixin, GetEventsMixin, serializers.Serializer):
@@ -57,15 +63,27 @@ class CreateOrganizerEventSerializer(OrganizerValidationMixin, CategoryValidatio
     price = serializers.DecimalField(max_digits=10, decimal_places=2, required=True)
     date = serializers.DateTimeField(required=True)
     category_ids = serializers.ListField(child=serializers.IntegerField(), required=True)
-    picture = serializers.ImageField(required=False, allow_null=True)
+    picture = BoundedImageField(required=False, allow_null=True)
 
     def validate(self, attrs):
         attrs = self.validate_organizer(attrs)
         attrs = self.validate_categories(attrs, field_name="category_ids")
         return attrs
 
+    def _check_moderation(self, moderation_result):
+        # moderation couldn't run (LLM down): the event is kept, but hidden until reviewed
+        if moderation_result.get("pending"):
+            return
+
+        if not moderation_result["approved"]:
+            # surface this as a validation error (HTTP 400)
+            raise serializers.ValidationError({
+                "detail": f"Event rejected by moderation: {moderation_result['reason']}"
+            })
+
     def create(self, validated_data):
         from ..utils import moderate_event_content
+        from ..utils.event_neighbors import schedule_event_neighbors
 
         organizer = validated_data["organizer"]
         categories = validated_data["categories"]
@@ -75,14 +93,9 @@ class CreateOrganizerEventSerializer(OrganizerValidationMixin, CategoryValidatio
 
         # Run AI moderation BEFORE creating
         moderation_result = moderate_event_content(title=title, description=description)
+        self._check_moderation(moderation_result)
 
-        if not moderation_result["approved"]:
-            # surface this as a validation error (HTTP 400)
-            raise serializers.ValidationError({
-                "detail": f"Event rejected by moderation: {moderation_result['reason']}"
-            })
-
-        # Only create if approved
+        # Only create if approved, or pending review
         event = Event.objects.create(
             organizer=organizer,
             title=title,
@@ -90,24 +103,67 @@ class CreateOrganizerEventSerializer(OrganizerValidationMixin, CategoryValidatio
             price=validated_data["price"],
             date=validated_data["date"],
             picture=picture,
-            approved=True,  # already moderated
+            embedding=event_embedding(title, description),
+            approved=moderation_result["approved"],  # already moderated
+            moderation_pending=moderation_result.get("pending", False),
             moderation_notes=moderation_result["reason"],
         )
         event.category.set(categories)
+        schedule_image_variants(event, "picture")
+
+        if event.approved:
+            schedule_event_neighbors(event.id)
         return event
 
+    async def acreate(self, validated_data):
+        """
+        Async version of `create`, awaits the moderation LLM call and uses the async ORM.
+        """
+        from ..utils import amoderate_event_content
+        from ..utils.event_neighbors import schedule_event_neighbors
+
+        moderation_result = await amoderate_event_content(
+            title=validated_data["title"], description=validated_data["description"]
+        )
+        self._check_moderation(moderation_result)
+
+        event = await Event.objects.acreate(
+            organizer=validated_data["organizer"],
+            title=validated_data["title"],
+            description=validated_data["description"],
+            price=validated_data["price"],
+            date=validated_data["date"],
+            picture=validated_data.get("picture", None),
+            embedding=event_embedding(validated_data["title"], validated_data["description"]),
+            approved=moderation_result["approved"],  # already moderated
+            moderation_pending=moderation_result.get("pending", False),
+            moderation_notes=moderation_result["reason"],
+        )
+        await event.category.aset(validated_data["categories"])
+        schedule_image_variants(event, "picture")  # only queues, doesn't block the loop
+
+        if event.approved:
+            schedule_event_neighbors(event.id)  # only queues, doesn't block the loop
+        return event
+
+    async def asave(self):
+        self.instance = await self.acreate(self.validated_data)
+        return self.instance
+
 
 class GetOrganizerEventDetailSerializer(OrganizerValidationMixin, EventValidationMixin, GetEventsMixin, serializers.Serializer):
     """
-    Organizer only: Get details of a single event.
+    Organizer only: Get details of a single event, archived ones included.
     """
     def validate(self, attrs):
         attrs = self.validate_organizer(attrs)
-        attrs = self.validate_find_event(attrs)
+        attrs = self.validate_find_event(attrs, include_archived=True)
         return attrs
 
     def to_representation(self, validated_data):
         event = validated_data["event"]
+        if isinstance(event, ArchivedEvent):
+            return {"event": self._archived_event_to_dict(event)}
         return {"event": self._event_to_dict(event, include_moderation=True)}
 
 
@@ -120,7 +176,7 @@ class UpdateOrganizerEventSerializer(OrganizerValidationMixin, EventValidationMi
     price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
     date = serializers.DateTimeField(required=False)
     category_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
-    picture = serializers.ImageField(required=False, allow_null=True)
+    picture = BoundedImageField(required=False, allow_null=True)
 
     def validate(self, attrs):
         attrs = self.validate_organizer(attrs)
@@ -130,10 +186,12 @@ class UpdateOrganizerEventSerializer(OrganizerValidationMixin, EventValidationMi
             raise serializers.ValidationError("You must provide at least one field: title, description, price, date, category_ids.")
         
         if "category_ids" in attrs:
-            attrs = self.validate_category_ids(attrs, field_name="category_ids")
+            attrs = self.validate_categories(attrs, field_name="category_ids")
         return attrs
 
     def update(self, instance, validated_data):
+        from ..utils.event_neighbors import schedule_event_neighbors
+
         if "title" in validated_data:
             instance.title = validated_data["title"]
         if "description" in validated_data:
@@ -142,6 +200,8 @@ class UpdateOrganizerEventSerializer(OrganizerValidationMixin, EventValidationMi
             instance.price = validated_data["price"]
         if "date" in validated_data:
             instance.date = validated_data["date"]
+        if "title" in validated_data or "description" in validated_data:
+            instance.embedding = event_embedding(instance.title, instance.description)
         if "categories" in validated_data:
             instance.category.set(validated_data["categories"])
         
@@ -150,10 +210,19 @@ class UpdateOrganizerEventSerializer(OrganizerValidationMixin, EventValidationMi
             
             if instance.picture:
                 instance.picture.delete(save=False) # remove previous file from storage
+            delete_image_variants(instance.picture_variants)
 
             instance.picture = validated_data["picture"] # if new file is provided -> set it; if None -> clear field
+            instance.picture_variants = {}
+            instance.picture_width = instance.picture_height = None
+            instance.picture_placeholder = ""
+            instance.picture_render_failures = 0
 
         instance.save()
+        if "picture" in validated_data:
+            schedule_image_variants(instance, "picture")
+        # Text or date changed: its similar events and its place in the others' change too
+        schedule_event_neighbors(instance.id)
         return instance
 
     def save(self, **kwargs):
@@ -170,4 +239,11 @@ class DeleteOrganizerEventSerializer(OrganizerValidationMixin, EventValidationMi
         return attrs
 
     def delete(self):
-        self.validated_data["event"].delete()
\ No newline at end of file
+        from ..utils.event_neighbors import lists_containing, schedule_event_neighbors
+
+        event = self.validated_data["event"]
+        event_id = event.id
+        # The lists it was in lose an entry, refill them
+        affected = lists_containing(event_id)
+        event.delete()
+        schedule_event_neighbors(event_id, affected)
\ No newline at end of file
@@ -1,5 +1,6 @@
+from django.db import transaction
 from rest_framework import serializers
-from ..models import Swipe
+from ..models import ArchivedSwipe, Swipe, RankedFeed
 from ..utils import (
     GetParticipantsMixin,
     ParticipantValidationMixin,
@@ -7,7 +8,10 @@ from ..utils import (
     ParticipantValidationMixin, 
     SwipeValidationMixin, 
     GetEventsMixin,
-    RecommendationMixin
+    RecommendationMixin,
+    record_swipe_preference,
+    record_like_popularity,
+    request_account_deletion,
 )
 
 class GetParticipantProfileSerializer(ParticipantValidationMixin, GetParticipantsMixin, serializers.Serializer):
@@ -26,13 +30,14 @@ class GetParticipantProfileSerializer(ParticipantValidationMixin, GetParticipant
 class DeleteParticipantProfileSerializer(ParticipantValidationMixin, serializers.Serializer):
     """
     Participant only: Deletes a given existing participant account.
+    The account is deactivated now, `purge_deleted_accounts` deletes its swipes and the rest later.
     """
     def validate(self, attrs):
         attrs = self.validate_participant(attrs)
         return attrs
 
     def delete(self):
-        self.validated_data['organizer'].delete()
+        request_account_deletion(self.validated_data['participant'])
 
 
 class GetParticipantPreferencesSerializer(ParticipantValidationMixin, serializers.Serializer):
@@ -77,6 +82,8 @@ class UpdateParticipantPreferencesSerializer(ParticipantValidationMixin, Categor
             instance.budget = validated_data["budget"]
 
         instance.save()
+        # candidates changed, the stored feed order is of no use anymore
+        RankedFeed.objects.filter(participant=instance).delete()
         return instance
 
     def save(self, **kwargs):
@@ -100,11 +107,18 @@ class CreateSwipeSerializer(ParticipantValidationMixin, SwipeValidationMixin, Ge
         event = validated_data["event"]
         liked = validated_data["liked"]
 
-        swipe, _ = Swipe.objects.update_or_create(
-            participant=participant,
-            event=event,
-            defaults={"liked": liked},
-        )
+        with transaction.atomic():
+            previous = Swipe.objects.filter(participant=participant, event=event).values_list("liked", flat=True).first()
+            swipe, _ = Swipe.objects.update_or_create(
+                participant=participant,
+                event=event,
+                defaults={"liked": liked},
+            )
+            # Swiping the same way again says nothing new
+            if previous != liked:
+                record_swipe_preference(participant.id, event, liked)
+                if liked:
+                    record_like_popularity(event.id)
         return swipe
 
 
@@ -118,7 +132,8 @@ class GetSwipeHistorySerializer(ParticipantValidationMixin, serializers.Serializ
 
     def to_representation(self, validated_data):
         participant = validated_data["participant"]
-        swipes = Swipe.objects.filter(participant=participant).select_related("event")
+        swipes = Swipe.objects.filter(participant=participant)
+        archived = ArchivedSwipe.objects.filter(participant=participant)  # swipes on past events
         return {
             "swipes": [
                 {
@@ -126,7 +141,7 @@ class GetSwipeHistorySerializer(ParticipantValidationMixin, serializers.Serializ
                     "liked": s.liked,
                     "created_at": s.created_at,
                 }
-                for s in swipes
+                for s in [*swipes, *archived]
             ]
         }
     
@@ -143,4 +158,15 @@ class GetRecommendationFeedSerializer(ParticipantValidationMixin, Recommendation
         participant = validated_data["participant"]
         events = self.get_recommendations(participant)
         return {"events": events}
+
+    async def ato_representation(self, validated_data):
+        participant = validated_data["participant"]
+        events = await self.aget_recommendations(participant)
+        return {"events": events}
+
+    def stream_events(self):
+        """
+        Async iterator over the feed events, sent as soon as the LLM ranked them.
+        """
+        return self.astream_recommendations(self.validated_data["participant"])
     
@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from ..models import Event
 from ..utils import(
@@ -18,10 +19,12 @@ class GetCategoriesSerializer(GetCategoriesMixin, serializers.Serializer):
 
 class GetEventsSerializer(GetEventsMixin, serializers.Serializer):
     """
-    Public: List all approved events.
+    Public: List all approved events, optionally only those in any of `category_ids`.
     """
+    category_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+
     def to_representation(self, validated_data):
-        return {"events": self.get_public_events()}
+        return {"events": self.get_public_events(validated_data.get("category_ids"))}
 
 
 class GetEventSerializer(GetEventsMixin, serializers.Serializer):
@@ -40,3 +43,17 @@ class GetEventSerializer(GetEventsMixin, serializers.Serializer):
     def to_representation(self, validated_data):
         return {"event": self._event_to_dict(validated_data["event"])}
 
+
+class GetSimilarEventsSerializer(GetEventsMixin, serializers.Serializer):
+    """
+    Public: Events similar to an approved event, from the precomputed neighbor table.
+    """
+    def validate(self, attrs):
+        event_id = self.context.get("event_id")
+        if not Event.objects.filter(id=event_id, approved=True).exists():
+            raise serializers.ValidationError("Event not found.")
+        attrs["event_id"] = event_id
+        return attrs
+
+    def to_representation(self, validated_data):
+        return {"events": self.get_similar_events(validated_data["event_id"], settings.SIMILAR_EVENTS_COUNT)}
\ No newline at end of file
@@ -0,0 +1,46 @@
+from django.test import SimpleTestCase
+
+from api.management.commands.advise_indexes import _covered, _walk, suggest_index
+
+EVENT_COLUMNS = ["id", "organizer_id", "title", "price", "date", "approved", "category_ids", "created_at"]
+
+
+def _seq_scan(relation, condition):
+    return {"Node Type": "Seq Scan", "Relation Name": relation, "Filter": condition}
+
+
+class SuggestIndexTests(SimpleTestCase):
+    def test_equality_then_sort_key(self):
+        plan = {
+            "Node Type": "Sort", "Sort Key": ["api_event.created_at DESC"],
+            "Plans": [_seq_scan("api_event", "(organizer_id = 3)")],
+        }
+        (_, _), (node, sort_key) = list(_walk(plan))
+        self.assertEqual(
+            suggest_index(node, sort_key, EVENT_COLUMNS),
+            "CREATE INDEX CONCURRENTLY ON api_event (organizer_id, created_at DESC);",
+        )
+
+    def test_boolean_and_range_without_sort(self):
+        node = _seq_scan("api_event", "(approved AND (date >= '2026-10-19 20:00:00+00'::timestamp with time zone))")
+        self.assertEqual(suggest_index(node, (), EVENT_COLUMNS), "CREATE INDEX CONCURRENTLY ON api_event (approved, date);")
+
+    def test_cast_column(self):
+        node = _seq_scan("api_user", "((email)::text = 'someone@example.com'::text)")
+        self.assertEqual(suggest_index(node, (), ["id", "email"]), "CREATE INDEX CONCURRENTLY ON api_user (email);")
+
+    def test_array_overlap_gets_a_gin_index(self):
+        node = _seq_scan("api_event", "(approved AND (category_ids && '{1,2}'::integer[]))")
+        self.assertEqual(suggest_index(node, (), EVENT_COLUMNS), "CREATE INDEX CONCURRENTLY ON api_event USING gin (category_ids);")
+
+    def test_no_filter(self):
+        self.assertIsNone(suggest_index({"Node Type": "Seq Scan", "Relation Name": "api_event"}, (), EVENT_COLUMNS))
+
+    def test_covered_by_an_index_starting_with_the_columns(self):
+        indexes = {
+            "event_organizer_created": {"columns": ["organizer_id", "created_at"], "index": True},
+            "api_event_pkey": {"columns": ["id"], "index": True, "primary_key": True},
+        }
+        self.assertTrue(_covered("CREATE INDEX CONCURRENTLY ON api_event (organizer_id, created_at DESC);", indexes))
+        self.assertTrue(_covered("CREATE INDEX CONCURRENTLY ON api_event (organizer_id);", indexes))
+        self.assertFalse(_covered("CREATE INDEX CONCURRENTLY ON api_event (approved, date);", indexes))
@@ -0,0 +1,125 @@
+import os
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from api.utils.colike import CoLikeModel, colike_pairs
+
+
+def _model(likes_by_participant):
+    model = CoLikeModel()
+    rows, cols = colike_pairs(likes_by_participant, {})
+    model.add_pairs(rows, cols, [e for events in likes_by_participant.values() for e in events])
+    return model
+
+
+def _pairs(model):
+    rows = np.repeat(np.arange(model.size), np.diff(model.indptr))
+    return dict(zip(zip(rows.tolist(), model.indices.tolist()), model.counts.tolist()))
+
+
+class CoLikePairsTests(SimpleTestCase):
+    def test_new_with_previous_and_new_with_new(self):
+        rows, cols = colike_pairs({1: [5, 6]}, {1: [2]})
+        pairs = sorted(zip(rows.tolist(), cols.tolist()))
+        self.assertEqual(pairs, [(2, 5), (2, 6), (5, 2), (5, 6), (6, 2), (6, 5)])
+
+    def test_single_like_makes_no_pair(self):
+        rows, cols = colike_pairs({1: [5]}, {})
+        self.assertEqual((len(rows), len(cols)), (0, 0))
+
+
+class CoLikeModelTests(SimpleTestCase):
+    def test_counts_and_likes(self):
+        model = _model({1: [1, 2], 2: [1, 2, 3]})
+        self.assertEqual(model.size, 4)
+        self.assertEqual(model.likes.tolist(), [0, 2, 2, 1])
+        row = slice(model.indptr[1], model.indptr[2])
+        self.assertEqual(dict(zip(model.indices[row].tolist(), model.counts[row].tolist())), {2: 2, 3: 1})
+
+    def test_add_pairs_accumulates(self):
+        model = _model({1: [1, 2]})
+        rows, cols = colike_pairs({2: [2]}, {2: [1]})
+        model.add_pairs(rows, cols, [2])
+        row = slice(model.indptr[1], model.indptr[2])
+        self.assertEqual(model.counts[row].tolist(), [2])
+
+    def test_pairs_taken_out_down_to_zero_are_dropped(self):
+        model = _model({1: [1, 2], 2: [1, 3]})
+        rows, cols = colike_pairs({1: [2]}, {1: [1]})
+        model.add_pairs(rows, cols, [2], weight=-1)
+        self.assertEqual(_pairs(model), {(1, 3): 1, (3, 1): 1})
+        self.assertEqual(model.likes.tolist(), [0, 2, 0, 1])
+
+    def test_scores_are_cosine_similarities_summed(self):
+        model = _model({1: [1, 2], 2: [1, 2, 3], 3: [4]})
+        scores = model.scores([1], [2, 3, 4, 99])
+        np.testing.assert_allclose(scores, [2 / np.sqrt(2 * 2), 1 / np.sqrt(2 * 1), 0, 0], rtol=1e-6)
+
+    def test_scores_without_likes_or_model(self):
+        self.assertEqual(CoLikeModel().scores([1], [1, 2]).tolist(), [0, 0])
+        self.assertEqual(_model({1: [1, 2]}).scores([], [1, 2]).tolist(), [0, 0])
+
+    def test_save_and_load(self):
+        model = _model({1: [1, 2], 2: [2, 3]})
+        model.watermark, model.watermark_id, model.folded = 10, 4, np.array([1, 2, 3, 4])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "colike.npz")
+            model.save(path)
+            loaded = CoLikeModel.load(path)
+            with_folded = CoLikeModel.load(path, with_folded=True)
+        self.assertEqual((loaded.watermark, loaded.watermark_id), (10, 4))
+        self.assertEqual(loaded.folded.tolist(), [])
+        self.assertEqual(with_folded.folded.tolist(), [1, 2, 3, 4])
+        np.testing.assert_array_equal(loaded.scores([2], [1, 3]), model.scores([2], [1, 3]))
+
+
+class ApplyChangesTests(SimpleTestCase):
+    """
+    Swipes as (id, participant id, event id, liked), changes applied on top of the first ones.
+    """
+    swipes = [(1, 1, 10, True), (2, 1, 11, True), (3, 1, 12, False), (4, 2, 10, True), (5, 2, 12, True)]
+
+    def apply(self, model, changes, swipes):
+        concerned = {change[1] for change in changes}
+        return model.apply_changes(changes, [swipe[:3] for swipe in swipes if swipe[1] in concerned])
+
+    def rebuilt(self, swipes):
+        model = CoLikeModel()
+        self.apply(model, swipes, swipes)
+        return model
+
+    def updated(self, changes):
+        current = {swipe[0]: swipe for swipe in self.swipes}
+        current.update({change[0]: change for change in changes})
+        model = self.rebuilt(self.swipes)
+        counts = self.apply(model, changes, list(current.values()))
+        return model, counts, self.rebuilt(list(current.values()))
+
+    def assertSameModel(self, model, expected):
+        self.assertEqual(_pairs(model), _pairs(expected))
+        self.assertEqual(model.likes[:expected.size].tolist(), expected.likes.tolist())
+        self.assertEqual(model.folded.tolist(), expected.folded.tolist())
+
+    def test_like_turned_into_a_dislike_is_taken_out(self):
+        model, counts, expected = self.updated([(2, 1, 11, False)])
+        self.assertEqual(counts, (0, 1))
+        self.assertSameModel(model, expected)
+        self.assertNotIn((10, 11), _pairs(model))
+
+    def test_dislike_turned_into_a_like_is_folded_in(self):
+        model, counts, expected = self.updated([(3, 1, 12, True)])
+        self.assertEqual(counts, (1, 0))
+        self.assertSameModel(model, expected)
+        self.assertEqual(_pairs(model)[(10, 12)], 2)
+
+    def test_flips_both_ways_with_new_swipes(self):
+        model, counts, expected = self.updated([(1, 1, 10, False), (3, 1, 12, True), (6, 1, 13, True), (7, 2, 11, False)])
+        self.assertEqual(counts, (2, 1))
+        self.assertSameModel(model, expected)
+
+    def test_same_swipe_again_changes_nothing(self):
+        model, counts, expected = self.updated([(1, 1, 10, True), (3, 1, 12, False)])
+        self.assertEqual(counts, (0, 0))
+        self.assertSameModel(model, expected)
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from api.utils.event_catalog import CATALOG_DTYPE, EventCatalog, category_mask
+
+NOW = datetime(2026, 11, 1, tzinfo=timezone.utc)
+
+
+def _catalog(rows):
+    # (id, price, days from NOW, category ids), stored sorted by id as `EventCatalog._apply` leaves them
+    catalog = EventCatalog()
+    catalog.events = np.array(
+        sorted(
+            (event_id, price, (NOW + timedelta(days=days)).timestamp(), category_mask(categories), 1)
+            for event_id, price, days, categories in rows
+        ),
+        dtype=CATALOG_DTYPE,
+    )
+    return catalog
+
+
+class CandidateIdsTests(SimpleTestCase):
+    def setUp(self):
+        self.catalog = _catalog([
+            (1, 10, 1, [1]),
+            (2, 60, 1, [1]),      # over budget
+            (3, 10, -1, [1]),     # past
+            (4, 10, 2, [2]),      # other category
+            (5, 0, 3, [2, 1]),
+            (7, 50, 1, [3, 65]),  # 65 shares the bit of 1
+        ])
+
+    def candidates(self, budget=50, category_ids=(1,), exclude_ids=()):
+        return self.catalog.candidate_ids(budget, category_ids, exclude_ids, now=NOW).tolist()
+
+    def test_filters_budget_date_and_categories(self):
+        self.assertEqual(self.candidates(), [1, 5, 7])
+
+    def test_any_of_the_categories(self):
+        self.assertEqual(self.candidates(category_ids=(2, 3)), [4, 5, 7])
+
+    def test_excluded_ids(self):
+        self.assertEqual(self.candidates(exclude_ids=[5, 6, 100, 0]), [1, 7])
+
+    def test_empty_catalog(self):
+        self.assertEqual(EventCatalog().candidate_ids(50, [1], [1, 2], now=NOW).tolist(), [])
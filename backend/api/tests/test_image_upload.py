@@ -0,0 +1,145 @@
+import io
+import json
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import zlib
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http.multipartparser import MultiPartParser
+from django.test import SimpleTestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from api.backends.uploads import BoundedUploadHandler, UploadTooLarge
+from api.utils import BoundedImageField, fitting_widths
+from api.utils import image_decode
+
+
+def _encoded(image, image_format, **params):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **params)
+    return buffer.getvalue()
+
+
+def _gradient(width, height, mode="RGB"):
+    # Something to compress, as a photo would be: a uniform image makes every codec look cheap
+    image = Image.linear_gradient("L").resize((width, height))
+    return Image.merge(mode, [image] * len(mode))
+
+
+def _png_header(width, height):
+    # Signature and IHDR chunk of an 8-bit RGB PNG, no pixel data: what Pillow reads when it opens the file
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)) + chunk(b"IEND", b"")
+
+
+def _upload(data, name):
+    return SimpleUploadedFile(name, data, content_type="application/octet-stream")
+
+
+class BoundedImageFieldTests(SimpleTestCase):
+    def assertRejected(self, upload, code):
+        with self.assertRaises(ValidationError) as raised:
+            BoundedImageField().run_validation(upload)
+        self.assertEqual(raised.exception.detail[0].code, code)
+
+    def test_accepts_a_photo(self):
+        upload = _upload(_encoded(_gradient(1600, 1200), "JPEG"), "photo.jpg")
+        self.assertEqual(BoundedImageField().run_validation(upload).name, "photo.jpg")
+
+    def test_rejects_a_decompression_bomb_from_its_headers(self):
+        # A few bytes on the wire, 1.6 billion pixels declared
+        self.assertRejected(_upload(_png_header(40000, 40000), "bomb.png"), "decompression_bomb")
+
+    def test_rejects_too_many_pixels_from_its_headers(self):
+        self.assertRejected(_upload(_png_header(10000, 8000), "image.png"), "too_many_pixels")
+
+    @override_settings(UPLOAD_MAX_BYTES=1024)
+    def test_rejects_an_oversized_file(self):
+        upload = _upload(_encoded(_gradient(320, 240), "JPEG") + os.urandom(2048), "photo.jpg")
+        self.assertRejected(upload, "too_large")
+
+    def test_rejects_an_unsupported_format(self):
+        self.assertRejected(_upload(_encoded(_gradient(64, 64), "GIF"), "image.gif"), "format")
+
+    @override_settings(IMAGE_DECODE_MEMORY_MB=36)
+    def test_rejects_a_png_whose_decoding_does_not_fit(self):
+        self.assertRejected(_upload(_encoded(_gradient(3000, 2000, "RGBA"), "PNG"), "image.png"), "too_big_to_decode")
+
+    @override_settings(IMAGE_DECODE_MEMORY_MB=36)
+    def test_accepts_a_big_jpeg_decoded_reduced(self):
+        upload = _upload(_encoded(_gradient(6000, 4000), "JPEG"), "photo.jpg")
+        self.assertEqual(BoundedImageField().run_validation(upload).name, "photo.jpg")
+
+
+@override_settings(IMAGE_VARIANT_WIDTHS=[320, 640, 1280], IMAGE_DECODE_MEMORY_MB=36, IMAGE_DECODE_INPROCESS_PIXELS=2 * 10**6)
+class FittingWidthsTests(SimpleTestCase):
+    def fitting(self, data):
+        with Image.open(io.BytesIO(data)) as image:
+            return fitting_widths(image, [1280, 640, 320])
+
+    def test_small_image_in_process(self):
+        self.assertEqual(self.fitting(_encoded(_gradient(1600, 1200), "PNG")), ([1280, 640, 320], False))
+
+    def test_png_over_the_in_process_pixels_in_a_subprocess(self):
+        self.assertEqual(self.fitting(_encoded(_gradient(1900, 1200), "PNG")), ([1280, 640, 320], True))
+
+    def test_jpeg_skips_the_variants_that_do_not_fit(self):
+        # Decoded at half its size for the 1280px variant (3 megapixels, too much), at a quarter for 640px
+        self.assertEqual(self.fitting(_encoded(_gradient(4032, 3024), "JPEG")), ([640, 320], False))
+
+    def test_nothing_fits(self):
+        self.assertEqual(self.fitting(_encoded(_gradient(3000, 2000, "RGBA"), "PNG")), ([], False))
+
+
+class BoundedUploadHandlerTests(SimpleTestCase):
+    def parse(self, data):
+        body = encode_multipart(BOUNDARY, {"image": SimpleUploadedFile("photo.jpg", data)})
+        meta = {"CONTENT_TYPE": MULTIPART_CONTENT, "CONTENT_LENGTH": str(len(body))}
+        return MultiPartParser(meta, io.BytesIO(body), [BoundedUploadHandler()], "utf-8").parse()
+
+    @override_settings(UPLOAD_MAX_BYTES=64 * 1024)
+    def test_stops_past_the_limit(self):
+        with self.assertRaises(UploadTooLarge):
+            self.parse(os.urandom(200 * 1024))
+
+    @override_settings(UPLOAD_MAX_BYTES=64 * 1024)
+    def test_writes_the_upload_to_disk(self):
+        _, files = self.parse(os.urandom(32 * 1024))
+        self.assertTrue(os.path.exists(files["image"].temporary_file_path()))
+        self.assertEqual(files["image"].size, 32 * 1024)
+
+
+class DecodingSubprocessTests(SimpleTestCase):
+    budget_mb = 36
+
+    def render(self, image, image_format):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"image.{image_format.lower()}")
+            image.save(path, image_format)
+            command = [sys.executable, "-I", image_decode.__file__, path, directory, str(self.budget_mb), "75", "1280", "640", "320"]
+            result = subprocess.run(command, capture_output=True, timeout=60)
+            return result, sorted(name for name in os.listdir(directory) if name.endswith(".webp"))
+
+    def test_peak_memory_within_the_budget(self):
+        # The largest PNG the budget fits, by the estimate `fitting_widths` refuses the uploads with
+        image = _gradient(1900, 1200)
+        with Image.open(io.BytesIO(_encoded(image, "PNG"))) as opened:
+            estimate = image_decode.SUBPROCESS_BASELINE + image_decode.decode_cost(opened, 1280)
+        self.assertLessEqual(estimate, self.budget_mb * 2**20)
+
+        result, variants = self.render(image, "PNG")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(variants, ["1280.webp", "320.webp", "640.webp"])
+        self.assertLessEqual(json.loads(result.stdout)["peak_kib"] * 1024, estimate)
+
+    def test_fails_past_the_budget(self):
+        result, variants = self.render(_gradient(3000, 3000, "RGBA"), "PNG")
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn(b"MemoryError", result.stderr)
+        self.assertEqual(variants, [])
@@ -0,0 +1,120 @@
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from api.utils import PRIORITY_INTERACTIVE, CircuitBreaker, LLMGateway, get_llm_limiter
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        for patcher in (
+            mock.patch("api.utils.llm_gateway.time.monotonic", side_effect=lambda: self.now),
+            mock.patch("api.utils.llm_gateway.logger"),  # the transitions are logged as warnings
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+    def open_breaker(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_success_resets_the_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_single_probe_once_the_timeout_passed(self):
+        self.open_breaker()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_probe_success_closes(self):
+        self.open_breaker()
+        self.now += 30
+        self.breaker.allow()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_probe_failure_opens_again(self):
+        self.open_breaker()
+        self.now += 30
+        self.breaker.allow()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.now += 29
+        self.assertFalse(self.breaker.allow())
+
+    def test_released_probe_lets_another_through(self):
+        self.open_breaker()
+        self.now += 30
+        self.breaker.allow()
+        self.breaker.release_probe()
+        self.assertTrue(self.breaker.allow())
+
+
+@override_settings(LLM_HEDGE_AFTER=0.05, LLM_MAX_CONCURRENCY=2)
+class HedgingTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        get_llm_limiter.cache_clear()
+        self.addCleanup(get_llm_limiter.cache_clear)
+        with override_settings(LLM_LIMITER_DIR=directory.name):
+            self.limiter = get_llm_limiter()
+        self.gateway = LLMGateway()
+        self.addCleanup(self.gateway._executor.shutdown)
+
+    def test_the_losing_request_keeps_its_slot_until_it_ends(self):
+        first_answers = threading.Event()
+        calls = iter(["slow", "fast"])
+
+        def call():
+            answer = next(calls)
+            if answer == "slow":
+                first_answers.wait(5)
+            return answer
+
+        with self.limiter.slot():
+            self.assertEqual(self.gateway._hedged(call, "test", PRIORITY_INTERACTIVE, timeout=5), "fast")
+        # The slow request is still running: the caller's slot is back, the hedge's one isn't
+        release = self.limiter.try_slot()
+        self.assertIsNotNone(release)
+        self.assertIsNone(self.limiter.try_slot())
+        release()
+
+        first_answers.set()
+        self.gateway._executor.shutdown(wait=True)
+        releases = [self.limiter.try_slot() for _ in range(2)]
+        self.assertNotIn(None, releases)
+        for release in releases:
+            release()
+
+    def test_no_hedging_without_a_free_slot(self):
+        calls = []
+
+        def call():
+            calls.append(None)
+            time.sleep(0.2)
+            return "answer"
+
+        with self.limiter.slot(), self.limiter.slot():
+            self.assertEqual(self.gateway._hedged(call, "test", PRIORITY_INTERACTIVE, timeout=5), "answer")
+        self.assertEqual(len(calls), 1)
@@ -0,0 +1,63 @@
+import time
+from unittest import mock
+
+from asgiref.sync import markcoroutinefunction
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api.backends.middleware import ServerTimingMiddleware
+from api.utils import current_request_deadline, current_request_timings, record_llm_call
+
+
+@override_settings(REQUEST_TIME_BUDGET=20)
+class StreamedResponseTests(SimpleTestCase):
+    def setUp(self):
+        for patcher in (
+            mock.patch("api.backends.middleware.logger"),
+            mock.patch("api.backends.middleware.observe_request"),
+            mock.patch("api.utils.instrumentation.observe_llm_call"),
+        ):
+            self.addCleanup(patcher.stop)
+            setattr(self, patcher.attribute, patcher.start())
+        self.seen = []
+
+    def see(self):
+        deadline = current_request_deadline()
+        self.seen.append(None if deadline is None else deadline - time.monotonic())
+        record_llm_call("rank", 0.5)
+
+    async def test_budget_and_timings_inside_an_async_stream(self):
+        async def lines():
+            for line in (b"1\n", b"2\n"):
+                self.see()
+                yield line
+
+        async def view(request):
+            return StreamingHttpResponse(lines())
+
+        markcoroutinefunction(view)
+        response = await ServerTimingMiddleware(view)(RequestFactory().get("/feed"))
+        self.assertIsNone(current_request_deadline())
+        self.observe_request.assert_not_called()
+
+        body = [part async for part in response.streaming_content]
+        self.assertEqual(body, [b"1\n", b"2\n"])
+        self.assertEqual(len(self.seen), 2)
+        for remaining in self.seen:
+            self.assertTrue(19 < remaining <= 20, remaining)
+        self.assertIsNone(current_request_deadline())
+        self.assertIsNone(current_request_timings())
+
+        self.observe_request.assert_called_once()
+        timings = self.observe_request.call_args.args[4]
+        self.assertEqual(timings.llm_count, 2)
+
+    def test_budget_inside_a_sync_stream(self):
+        def lines():
+            self.see()
+            yield b"1\n"
+
+        response = ServerTimingMiddleware(lambda request: StreamingHttpResponse(lines()))(RequestFactory().get("/feed"))
+        self.assertEqual(list(response.streaming_content), [b"1\n"])
+        self.assertTrue(19 < self.seen[0] <= 20)
+        self.assertEqual(self.observe_request.call_args.args[4].llm_count, 1)
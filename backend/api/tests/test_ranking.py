@@ -0,0 +1,131 @@
+from datetime import datetime
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from api.utils import (
+    RankedIdsStreamParser, build_ranking_messages, estimate_tokens, merge_ranked_ids, pick_anchors, rank_events_with_llm,
+)
+
+
+class PickAnchorsTests(SimpleTestCase):
+    def test_short_list_is_all_anchors(self):
+        self.assertEqual(pick_anchors([5, 3, 9], 8), [5, 3, 9])
+
+    def test_evenly_spaced_first_and_last_included(self):
+        self.assertEqual(pick_anchors(list(range(10)), 4), [0, 3, 6, 9])
+
+    def test_single_anchor(self):
+        self.assertEqual(pick_anchors([7, 8, 9], 1), [7])
+
+    def test_no_anchor(self):
+        self.assertEqual(pick_anchors([7, 8, 9], 0), [])
+
+
+class MergeRankedIdsTests(SimpleTestCase):
+    def test_new_ids_go_before_the_anchor_that_follows_them(self):
+        merged = merge_ranked_ids([1, 2, 3, 4], [10, 11], mini_ranking=[1, 10, 3, 11, 4])
+        self.assertEqual(merged, [1, 2, 10, 3, 11, 4])
+
+    def test_stored_order_is_kept(self):
+        merged = merge_ranked_ids([4, 3, 2, 1], [10], mini_ranking=[1, 10, 4])
+        self.assertEqual([eid for eid in merged if eid != 10], [4, 3, 2, 1])
+
+    def test_new_ids_after_the_last_anchor_go_at_the_end(self):
+        self.assertEqual(merge_ranked_ids([1, 2], [10], mini_ranking=[1, 2, 10]), [1, 2, 10])
+
+    def test_new_ids_missing_from_the_mini_ranking_go_at_the_end(self):
+        self.assertEqual(merge_ranked_ids([1, 2], [10, 11], mini_ranking=[10, 1]), [10, 1, 2, 11])
+
+    def test_made_up_anchor_does_not_lose_its_new_ids(self):
+        self.assertEqual(merge_ranked_ids([1, 2], [10], mini_ranking=[10, 99, 1]), [1, 2, 10])
+
+    def test_duplicates_in_the_mini_ranking(self):
+        self.assertEqual(merge_ranked_ids([1, 2], [10], mini_ranking=[10, 10, 2]), [1, 10, 2])
+
+
+class RankedIdsStreamParserTests(SimpleTestCase):
+    def feed_all(self, chunks):
+        parser = RankedIdsStreamParser()
+        return [parser.feed(chunk) for chunk in chunks], parser
+
+    def test_ids_come_out_as_they_complete(self):
+        batches, parser = self.feed_all(['{"ranked_', 'event_ids": [12, 3', '4, "7"', ",", " 8]}"])
+        self.assertEqual(batches, [[], [12], [34], [7], [8]])
+        self.assertTrue(parser.done)
+
+    def test_truncated_number_is_not_returned(self):
+        batches, parser = self.feed_all(['{"ranked_event_ids": [123'])
+        self.assertEqual(batches, [[]])
+        self.assertFalse(parser.done)
+
+    def test_nothing_after_the_closing_bracket(self):
+        batches, _ = self.feed_all(['{"ranked_event_ids": [1]}', ' {"ranked_event_ids": [2]}'])
+        self.assertEqual(batches, [[1], []])
+
+    def test_empty_list(self):
+        batches, _ = self.feed_all(['{"ranked_event_ids": []}'])
+        self.assertEqual(batches, [[]])
+
+
+class BuildRankingMessagesTests(SimpleTestCase):
+    profile = {"categories": ["Music"], "budget": 50, "leaning": {"categories": ["Art"], "price": None}}
+
+    def events(self, count, description="A long evening of live music. " * 20):
+        return [
+            {
+                "id": i, "title": f"Event {i}", "description": description, "price": 10,
+                "date": datetime(2026, 11, 1), "categories": ["Music", "Art"],
+            }
+            for i in range(1, count + 1)
+        ]
+
+    def test_stays_within_the_budget(self):
+        for budget in (200, 500, 2000):
+            messages, stats = build_ranking_messages(self.profile, self.events(50), budget)
+            used = sum(estimate_tokens(m["content"]) for m in messages)
+            self.assertLessEqual(used, budget)
+            self.assertEqual(stats["prompt_tokens"], used)
+            self.assertEqual(stats["events_included"] + stats["events_dropped"], 50)
+
+    def test_the_last_events_are_left_out_first(self):
+        messages, stats = build_ranking_messages(self.profile, self.events(50), 300)
+        rows = messages[1]["content"].splitlines()[3:]
+        self.assertGreater(stats["events_dropped"], 0)
+        self.assertEqual([int(row.split("|")[0]) for row in rows], list(range(1, stats["events_included"] + 1)))
+
+    def test_summaries_only_when_the_budget_allows(self):
+        tight, stats = build_ranking_messages(self.profile, self.events(10), 150)
+        loose, _ = build_ranking_messages(self.profile, self.events(10), 2000)
+        self.assertEqual(stats["events_included"], 10)
+        self.assertTrue(all(row.endswith("|") for row in tight[1]["content"].splitlines()[3:]))
+        self.assertTrue(all(row.split("|")[-1] for row in loose[1]["content"].splitlines()[3:]))
+
+    def test_categories_sent_as_codes(self):
+        messages, _ = build_ranking_messages(self.profile, self.events(1), 2000)
+        lines = messages[1]["content"].splitlines()
+        self.assertEqual(lines[0], "Categories: A=Music, B=Art")
+        self.assertIn("|A,B|", lines[3])
+
+    def test_legend_only_has_the_categories_of_the_events_that_fit(self):
+        events = self.events(30)
+        for i, event in enumerate(events):
+            event["categories"] = [f"Category {i}"]
+        messages, stats = build_ranking_messages(self.profile, events, 300)
+        legend = messages[1]["content"].splitlines()[0]
+        self.assertGreater(stats["events_dropped"], 0)
+        self.assertEqual(legend.count("="), 2 + stats["events_included"])
+        self.assertLessEqual(sum(estimate_tokens(m["content"]) for m in messages), 300)
+
+    def test_nothing_to_send_when_no_event_fits(self):
+        messages, stats = build_ranking_messages(self.profile, self.events(5), 30)
+        self.assertEqual(messages, [])
+        self.assertEqual(stats["events_included"], 0)
+        self.assertEqual(stats["events_dropped"], 5)
+
+    @override_settings(LLM_RANKING_TOKEN_BUDGET=30)
+    def test_no_llm_call_when_no_event_fits(self):
+        with mock.patch("api.utils.openai_utils._create_completion") as create_completion, \
+                mock.patch("api.utils.openai_utils.logger"):
+            self.assertEqual(rank_events_with_llm(self.profile, self.events(3)), [1, 2, 3])
+        create_completion.assert_not_called()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from api.utils import SingleFlight
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = override_settings(
+            SINGLE_FLIGHT_LOCK_DIR=os.path.join(directory.name, "locks"),
+            CACHES={"single_flight": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+        )
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.addCleanup(caches["single_flight"].clear)
+        self.flight = SingleFlight("test")
+
+    def test_concurrent_callers_share_one_computation(self):
+        started, release = threading.Event(), threading.Event()
+        computed = []
+
+        def compute():
+            computed.append(None)
+            started.set()
+            release.wait(5)
+            return "value"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(self.flight.do("key", compute)))
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=lambda: results.append(self.flight.do("key", compute)))
+        follower.start()
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(results, ["value", "value"])
+        self.assertEqual(len(computed), 1)
+
+    def test_lock_files_are_removed(self):
+        self.flight.do("a", lambda: 1)
+        self.flight.do("b", lambda: 2)
+        self.assertEqual(os.listdir(settings.SINGLE_FLIGHT_LOCK_DIR), [])
@@ -1,4 +1,5 @@
 from django.urls import path, include
+from ..views import get_metrics
 
 urlpatterns = [
     path('auth/', include('api.urls.auth_urls')),
@@ -6,4 +7,5 @@ urlpatterns = [
     path('participants/', include('api.urls.participant_urls')),
     path('organizers/', include('api.urls.organizer_urls')),
     path('public/', include('api.urls.public_urls')),
+    path('metrics/', get_metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -3,6 +3,7 @@ from ..views import (
     manage_organizer_profile,
     manage_organizer_events,
     manage_organizer_event,
+    create_organizer_event_async,
 )
 
 urlpatterns = [
@@ -12,4 +13,5 @@ urlpatterns = [
     # Organizer events management
     path( "events/", manage_organizer_events, name="manage_organizer_events"),
     path( "events/<int:event_id>/", manage_organizer_event, name="manage_organizer_event"),
+    path( "events/async/", create_organizer_event_async, name="create_organizer_event_async"),
 ]
\ No newline at end of file
@@ -4,7 +4,8 @@ from ..views import (
     manage_participant_preferences,
     create_swipe,
     get_swipe_history,
-    get_recommendation_feed
+    get_recommendation_feed,
+    get_recommendation_feed_async,
 )
 
 
@@ -17,4 +18,5 @@ urlpatterns = [
     path('swipes/', create_swipe, name='create_swipe'),
     path('swipes/history', get_swipe_history, name='get_swipe_history'),
     path("feed/", get_recommendation_feed, name="recommendation-feed"),
+    path("feed/async/", get_recommendation_feed_async, name="recommendation-feed-async"),
 ]
\ No newline at end of file
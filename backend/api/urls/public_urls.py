@@ -2,11 +2,13 @@ from django.urls import path
 from ..views import (
     get_events,
     get_event_detail,
+    get_similar_events,
     get_categories,
 )
 
 urlpatterns = [
     path("events/", get_events, name="list_events"),
     path("events/<int:event_id>/", get_event_detail, name="get_event_detail"),
+    path("events/<int:event_id>/similar/", get_similar_events, name="get_similar_events"),
     path("categories/", get_categories, name="get_categories"),
 ]
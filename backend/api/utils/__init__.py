@@ -3,4 +3,21 @@ from .validators import *
 from .mixins import *
 from .permissions import *
 from .emails import *
-from .openai_utils import * 
\ No newline at end of file
+from .metrics import *
+from .instrumentation import *
+from .llm_limiter import *
+from .llm_gateway import *
+from .ranking import *
+from .embeddings import *
+from .preferences import *
+from .prompt_builder import *
+from .single_flight import *
+from .trending import *
+from .change_log import *
+from .event_categories import *
+from .event_archive import *
+from .account_deletion import *
+from .image_variants import *
+from .image_upload import *
+from .openai_utils import *
+from .async_views import *
\ No newline at end of file
@@ -0,0 +1,118 @@
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from .change_log import bump_events_version
+from .image_variants import delete_image_variants
+
+
+def request_account_deletion(user):
+    """
+    First step of an account deletion, done in the request: the account is deactivated, its refresh tokens
+    blacklisted and, for an organizer, its events hidden from every listing right away.
+    The rows and files are deleted later by `purge_account` (`purge_deleted_accounts` command), in bounded batches.
+    """
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+    from ..models import Event
+
+    now = timezone.now()
+    with transaction.atomic():
+        user.is_active = False
+        user.deletion_requested_at = now
+        user.save(update_fields=["is_active", "deletion_requested_at"])
+
+        tokens = OutstandingToken.objects.filter(user=user, blacklistedtoken__isnull=True)
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token) for token in tokens], ignore_conflicts=True)
+
+        if Event.objects.filter(organizer_id=user.pk).update(approved=False, updated_at=now):
+            bump_events_version()
+
+
+def _delete_rows(model, batch_size, **filters):
+    """
+    Deletes the rows of `model` matching `filters` with raw `DELETE ... WHERE id IN (...)` of at most `batch_size`
+    ids each, every statement its own transaction: no Python objects, no cascade collection, short locks.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    deleted = 0
+    while True:
+        ids = list(model.objects.filter(**filters).order_by("id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+        deleted += len(ids)
+
+
+def _delete_files(names):
+    for name in names:
+        if name:
+            default_storage.delete(name)
+
+
+def _delete_pictures(events):
+    for _, picture, variants in events:
+        _delete_files([picture])
+        delete_image_variants(variants)
+
+
+def _purge_organizer_rows(organizer_id, batch_size):
+    from ..models import ArchivedEvent, ArchivedSwipe, Event, EventNeighbor, Swipe
+
+    deleted = 0
+    # Children before parents, one chunk of events at a time: stopping anywhere leaves valid rows to resume from
+    while True:
+        events = list(Event.objects.filter(organizer_id=organizer_id).order_by("id").values_list("id", "picture", "picture_variants")[:batch_size])
+        if not events:
+            break
+        event_ids = [event_id for event_id, _, _ in events]
+        deleted += _delete_rows(Swipe, batch_size, event_id__in=event_ids)
+        deleted += _delete_rows(Event.category.through, batch_size, event_id__in=event_ids)
+        deleted += _delete_rows(EventNeighbor, batch_size, event_id__in=event_ids)
+        deleted += _delete_rows(EventNeighbor, batch_size, neighbor_id__in=event_ids)
+        deleted += _delete_rows(Event, batch_size, id__in=event_ids)
+        _delete_pictures(events)
+
+    while True:
+        events = list(ArchivedEvent.objects.filter(organizer_id=organizer_id).order_by("id").values_list("id", "picture", "picture_variants")[:batch_size])
+        if not events:
+            break
+        event_ids = [event_id for event_id, _, _ in events]
+        deleted += _delete_rows(ArchivedSwipe, batch_size, event_id__in=event_ids)
+        deleted += _delete_rows(ArchivedEvent, batch_size, id__in=event_ids)
+        _delete_pictures(events)
+
+    bump_events_version()
+    return deleted
+
+
+def _purge_participant_rows(participant_id, batch_size):
+    from ..models import ArchivedSwipe, Participant, RankedFeed, Swipe
+
+    deleted = _delete_rows(Swipe, batch_size, participant_id=participant_id)
+    deleted += _delete_rows(ArchivedSwipe, batch_size, participant_id=participant_id)
+    deleted += _delete_rows(Participant.categories.through, batch_size, participant_id=participant_id)
+    deleted += _delete_rows(RankedFeed, batch_size, participant_id=participant_id)
+    return deleted
+
+
+def purge_account(user, batch_size=1000):
+    """
+    Second step of an account deletion, in the background: deletes the dependent rows in batches (see `_delete_rows`),
+    the media files, then the account itself, which has nothing left to cascade to. Returns the rows deleted.
+    """
+    from ..models import Organizer, Participant, Roles
+
+    if user.role == Roles.ORGANIZER.value:
+        deleted = _purge_organizer_rows(user.pk, batch_size)
+        model = Organizer
+    elif user.role == Roles.PARTICIPANT.value:
+        deleted = _purge_participant_rows(user.pk, batch_size)
+        model = Participant
+    else:
+        raise ValueError(f"Accounts with role {user.role} aren't deleted through the API.")
+
+    profile_image, variants = user.profile_image.name, user.profile_image_variants
+    model.objects.filter(pk=user.pk).delete()
+    _delete_files([profile_image])
+    delete_image_variants(variants)
+    return deleted + 1
@@ -0,0 +1,92 @@
+import json
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, MethodNotAllowed, NotAuthenticated, PermissionDenied
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from .instrumentation import timed_span
+
+
+def async_api_view(http_method_names, permission_classes=(), parser_classes=(JSONParser,)):
+    """
+    Decorator turning an `async def view(request)` into a Django async view with the same
+    JWT authentication, permission checks and error format used by the DRF `@api_view` endpoints.
+
+    DRF views are sync only, so under ASGI they run in a worker thread and block it until the LLM answers.
+    Views wrapped with this decorator await the LLM instead, so many requests can be in flight at once.
+    """
+    def decorator(view):
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            drf_request = Request(
+                request,
+                parsers=[parser() for parser in parser_classes],
+                authenticators=[JWTAuthentication()],
+            )
+
+            try:
+                if request.method not in http_method_names:
+                    raise MethodNotAllowed(request.method)
+
+                # Authentication and body parsing both touch the DB / disk, so they run in a thread
+                await sync_to_async(_authenticate_and_parse)(drf_request, permission_classes)
+                return await view(drf_request, *args, **kwargs)
+
+            except APIException as exc:
+                return _exception_response(exc)
+
+        return csrf_exempt(wrapper)
+
+    return decorator
+
+
+def json_response(data, status):
+    """
+    Returns a JSON response for async views (DRF's Response needs the sync APIView machinery).
+    """
+    return JsonResponse(data, status=status, encoder=DjangoJSONEncoder)
+
+
+def ndjson_response(items):
+    """
+    Streams an async iterable of dicts as newline delimited JSON, one line per item as soon as it's produced.
+    Needs an ASGI server, under WSGI Django would collect the whole stream first.
+    """
+    async def lines():
+        async for item in items:
+            with timed_span("serialize"):
+                line = json.dumps(item, cls=DjangoJSONEncoder) + "\n"
+            yield line
+
+    response = StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+    # Don't let a proxy buffer the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _authenticate_and_parse(request, permission_classes):
+    """
+    Mirrors `APIView.check_permissions`, then forces the request body to be parsed.
+    """
+    for permission in permission_classes:
+        if not permission().has_permission(request, None):
+            if request.authenticators and not request.successful_authenticator:
+                raise NotAuthenticated()
+            raise PermissionDenied()
+
+    request.data
+
+
+def _exception_response(exc):
+    """
+    Formats an API exception with the project's custom exception handler.
+    """
+    from ..backends.exceptions import customExceptionHandler
+
+    response = customExceptionHandler(exc, {})
+    return json_response(response.data, response.status_code)
@@ -0,0 +1,20 @@
+import time
+from django.core.cache import caches
+
+_EVENTS_VERSION_KEY = "change-log:events"
+
+
+def bump_events_version(**kwargs):
+    """
+    `post_save` / `post_delete` / `m2m_changed` receiver: the events changed, per-process copies (the event catalog)
+    have to look for what changed. The version is a fresh token rather than a counter, so concurrent bumps don't race.
+    """
+    caches["shared"].set(_EVENTS_VERSION_KEY, time.time_ns(), None)
+
+
+def events_version():
+    return caches["shared"].get(_EVENTS_VERSION_KEY, 0)
+
+
+async def aevents_version():
+    return await caches["shared"].aget(_EVENTS_VERSION_KEY, 0)
\ No newline at end of file
@@ -0,0 +1,241 @@
+import logging
+import os
+import threading
+from collections import defaultdict
+# Not re-exported by `api.utils`: numpy is only loaded by the processes that actually score a feed
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CoLikeModel:
+    """
+    Item-to-item co-like counts from the liked swipes: how many participants liked both event i and event j.
+
+    Stored as a symmetric CSR matrix indexed directly by event id (`indptr`, `indices`, `counts`) plus the
+    number of likes per event, so the similarity of two events is `co(i, j) / sqrt(likes(i) * likes(j))`.
+
+    Swipes are updated in place (a like can become a dislike and back), so updates follow `Swipe.updated_at`:
+    `watermark` / `watermark_id` are the (updated_at in microseconds, id) of the last swipe change folded in,
+    and `folded` the sorted ids of the liked swipes counted, telling a flip to fold in from one to take out.
+    `folded` is only needed to update the model, it's not loaded to score feeds.
+    """
+    def __init__(self, indptr=None, indices=None, counts=None, likes=None, watermark=0, watermark_id=0, folded=None):
+        self.indptr = indptr if indptr is not None else np.zeros(1, dtype=np.int64)
+        self.indices = indices if indices is not None else np.zeros(0, dtype=np.int32)
+        self.counts = counts if counts is not None else np.zeros(0, dtype=np.float32)
+        self.likes = likes if likes is not None else np.zeros(0, dtype=np.float32)
+        self.watermark = watermark
+        self.watermark_id = watermark_id
+        self.folded = folded if folded is not None else np.zeros(0, dtype=np.int64)
+
+    @property
+    def size(self):
+        """
+        Rows in the matrix, i.e. the highest event id seen plus one.
+        """
+        return len(self.indptr) - 1
+
+    @property
+    def nnz(self):
+        return len(self.indices)
+
+    def add_pairs(self, rows, cols, liked_events, weight=1):
+        """
+        Folds new co-likes into the matrix, or takes them out with `weight=-1`.
+        :param rows, cols: event id pairs liked by a same participant, both directions, duplicates allowed
+        :param liked_events: event ids of the new likes (one entry per like)
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        liked_events = np.asarray(liked_events, dtype=np.int64)
+
+        size = max(self.size, int(rows.max(initial=-1)) + 1, int(liked_events.max(initial=-1)) + 1)
+
+        # Existing entries back to COO, then everything summed per (row, col) in one pass
+        old_rows = np.repeat(np.arange(self.size, dtype=np.int64), np.diff(self.indptr))
+        all_rows = np.concatenate([old_rows, rows])
+        all_cols = np.concatenate([self.indices.astype(np.int64), cols])
+        all_counts = np.concatenate([self.counts, np.full(len(rows), weight, dtype=np.float32)])
+
+        keys = all_rows * size + all_cols
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        summed = np.zeros(len(unique_keys), dtype=np.float32)
+        np.add.at(summed, inverse, all_counts)
+        # Pairs taken out down to 0 aren't kept
+        non_zero = summed != 0
+        unique_keys, summed = unique_keys[non_zero], summed[non_zero]
+
+        new_rows = unique_keys // size
+        self.indices = (unique_keys % size).astype(np.int32)
+        self.counts = summed
+        self.indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(new_rows, minlength=size), out=self.indptr[1:])
+
+        likes = np.zeros(size, dtype=np.float32)
+        likes[:len(self.likes)] = self.likes
+        np.add.at(likes, liked_events, weight)
+        self.likes = likes
+
+    def apply_changes(self, changes, participant_swipes):
+        """
+        Folds in swipe changes: likes not counted yet are added, counted likes that became dislikes taken out.
+        :param changes: (swipe id, participant id, event id, liked) of the swipes changed since the watermark
+        :param participant_swipes: (swipe id, participant id, event id) of every swipe of the participants concerned
+        :return: (likes added, likes taken out)
+        """
+        ids = np.asarray([change[0] for change in changes], dtype=np.int64)
+        liked = np.asarray([change[3] for change in changes], dtype=bool)
+        counted = np.isin(ids, self.folded, assume_unique=True)
+        added, removed = liked & ~counted, ~liked & counted
+
+        new_likes, old_likes = defaultdict(list), defaultdict(list)
+        for change, is_added, is_removed in zip(changes, added, removed):
+            if is_added:
+                new_likes[change[1]].append(change[2])
+            elif is_removed:
+                old_likes[change[1]].append(change[2])
+
+        # The likes of these participants counted before and still counted after, the pairs are made with them
+        removed_ids = ids[removed]
+        kept = defaultdict(list)
+        if participant_swipes:
+            swipe_ids = np.asarray([swipe[0] for swipe in participant_swipes], dtype=np.int64)
+            still_counted = np.isin(swipe_ids, self.folded, assume_unique=True) & ~np.isin(swipe_ids, removed_ids)
+            for (_, participant_id, event_id), is_kept in zip(participant_swipes, still_counted):
+                if is_kept:
+                    kept[participant_id].append(event_id)
+
+        if len(removed_ids):
+            rows, cols = colike_pairs(old_likes, kept)
+            self.add_pairs(rows, cols, [event_id for events in old_likes.values() for event_id in events], weight=-1)
+        if added.any():
+            rows, cols = colike_pairs(new_likes, kept)
+            self.add_pairs(rows, cols, [event_id for events in new_likes.values() for event_id in events])
+
+        self.folded = np.union1d(np.setdiff1d(self.folded, removed_ids, assume_unique=True), ids[added])
+        return int(added.sum()), int(removed.sum())
+
+    def scores(self, liked_ids, candidate_ids):
+        """
+        Co-like score of each candidate: the sum of its cosine similarities with the liked events.
+        Vectorized: the liked rows are gathered once and accumulated with a bincount.
+        """
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        liked = np.asarray([i for i in liked_ids if 0 <= i < self.size], dtype=np.int64)
+        if not len(liked) or not self.nnz:
+            return np.zeros(len(candidate_ids), dtype=np.float32)
+
+        starts, ends = self.indptr[liked], self.indptr[liked + 1]
+        lengths = ends - starts
+        # Positions of every entry of the liked rows in `indices` / `counts`
+        positions = np.repeat(starts - np.cumsum(np.concatenate([[0], lengths[:-1]])), lengths) + np.arange(lengths.sum())
+        row_of_entry = np.repeat(liked, lengths)
+        cols = self.indices[positions]
+
+        norms = np.sqrt(self.likes[row_of_entry] * self.likes[cols])
+        similarity = self.counts[positions] / np.maximum(norms, 1.0)
+        totals = np.bincount(cols, weights=similarity, minlength=self.size)
+
+        in_range = (candidate_ids >= 0) & (candidate_ids < self.size)
+        result = np.zeros(len(candidate_ids), dtype=np.float32)
+        result[in_range] = totals[candidate_ids[in_range]]
+        return result
+
+    def save(self, path):
+        """
+        Writes the model atomically, readers never see a half written file.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f, indptr=self.indptr, indices=self.indices, counts=self.counts,
+                likes=self.likes, watermark=np.array(self.watermark, dtype=np.int64),
+                watermark_id=np.array(self.watermark_id, dtype=np.int64), folded=self.folded,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, with_folded=False):
+        """
+        Reads a saved model, `folded` (one id per like) only if `with_folded`: the arrays of an npz are read lazily.
+        Raises KeyError if the file predates the swipe ids being saved, it has to be rebuilt.
+        """
+        with np.load(path) as data:
+            return cls(
+                indptr=data["indptr"], indices=data["indices"], counts=data["counts"],
+                likes=data["likes"], watermark=int(data["watermark"]), watermark_id=int(data["watermark_id"]),
+                folded=data["folded"] if with_folded else None,
+            )
+
+
+def colike_pairs(new_likes, previous_likes):
+    """
+    Co-like pairs brought by new likes.
+    :param new_likes: participant id -> event ids newly liked
+    :param previous_likes: participant id -> event ids liked before
+    :return: (rows, cols) with both directions of every pair: new x previous, and new x new
+    """
+    rows, cols = [], []
+    for participant_id, new in new_likes.items():
+        new = np.asarray(new, dtype=np.int64)
+        previous = np.asarray(previous_likes.get(participant_id, []), dtype=np.int64)
+
+        if len(previous):
+            a, b = np.repeat(new, len(previous)), np.tile(previous, len(new))
+            rows += [a, b]
+            cols += [b, a]
+
+        if len(new) > 1:
+            a, b = np.repeat(new, len(new)), np.tile(new, len(new))
+            different = a != b
+            rows.append(a[different])
+            cols.append(b[different])
+
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(rows), np.concatenate(cols)
+
+
+_model_lock = threading.Lock()
+_loaded = {"mtime": None, "model": None}
+
+
+def colike_model_path():
+    return os.path.join(settings.DATA_ROOT, "colike.npz")
+
+
+def get_colike_model():
+    """
+    Returns the co-like model built by `build_colike_model`, reloaded when the file changes, or None if not built yet.
+    """
+    path = colike_model_path()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _model_lock:
+        if _loaded["mtime"] != mtime:
+            try:
+                _loaded["model"] = CoLikeModel.load(path)
+                _loaded["mtime"] = mtime
+            except (OSError, ValueError, KeyError):
+                logger.warning("Could not load the co-like model from %s.", path, exc_info=True)
+                return _loaded["model"]
+        return _loaded["model"]
+
+
+def colike_scores(liked_ids, candidate_ids):
+    """
+    Co-like scores of the candidates for a participant who liked `liked_ids`, as a dict event id -> score.
+    Empty when the model isn't built yet or the participant liked nothing.
+    """
+    model = get_colike_model()
+    if model is None or not liked_ids:
+        return {}
+
+    scores = model.scores(liked_ids, candidate_ids)
+    return {event_id: float(score) for event_id, score in zip(candidate_ids, scores) if score > 0}
@@ -0,0 +1,57 @@
+import math
+import re
+import zlib
+from array import array
+from collections import Counter
+
+EMBEDDING_SIZE = 128
+# Title n-grams count more than the description ones
+TITLE_WEIGHT = 2.0
+
+_WORD = re.compile(r"\w+")
+
+
+def _ngrams(text):
+    """
+    Word unigrams and bigrams, plus the character trigrams of the longer words (so "concerto" and "concerti" are close).
+    """
+    words = _WORD.findall(text.lower())
+    grams = list(words)
+    grams += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    grams += [f"#{w[i:i + 3]}" for w in words if len(w) > 3 for i in range(len(w) - 2)]
+    return grams
+
+
+def embed_event_text(title, description):
+    """
+    Fixed size vector of an event's text: its n-grams hashed (with a sign, so collisions cancel out on average)
+    into EMBEDDING_SIZE dimensions, log-scaled counts, L2-normalized so a dot product is the cosine similarity.
+    Needs no model, the same text gives the same vector in every process.
+    """
+    vector = [0.0] * EMBEDDING_SIZE
+    for text, weight in ((title, TITLE_WEIGHT), (description, 1.0)):
+        for gram, count in Counter(_ngrams(text)).items():
+            h = zlib.crc32(gram.encode())
+            value = weight * (1.0 + math.log(count))
+            vector[h % EMBEDDING_SIZE] += value if h & 0x80000000 else -value
+
+    norm = math.sqrt(sum(x * x for x in vector))
+    return array("f", [x / norm for x in vector] if norm else vector)
+
+
+def event_embedding(title, description):
+    """
+    `embed_event_text` as the float32 blob stored in `Event.embedding`.
+    """
+    return embed_event_text(title, description).tobytes()
+
+
+def load_embedding(blob):
+    """
+    The float32 vector stored in `blob`, None if there's none (or it has another size).
+    """
+    vector = array("f")
+    if not blob or len(blob) != EMBEDDING_SIZE * vector.itemsize:
+        return None
+    vector.frombytes(bytes(blob))
+    return vector
@@ -0,0 +1,44 @@
+from django.db import transaction
+
+
+def archive_events_batch(cutoff, batch_size):
+    """
+    Moves up to `batch_size` events dated before `cutoff`, and their swipes, into ArchivedEvent / ArchivedSwipe.
+    Their neighbor entries and category rows are deleted with them. Returns (events, swipes) archived.
+    """
+    from ..models import ArchivedEvent, ArchivedSwipe, Event, Swipe
+
+    with transaction.atomic():
+        events = list(Event.objects.filter(date__lt=cutoff).order_by("id").select_for_update(skip_locked=True)[:batch_size])
+        if not events:
+            return 0, 0
+        event_ids = [e.id for e in events]
+
+        ArchivedEvent.objects.bulk_create(
+            [
+                ArchivedEvent(
+                    id=e.id, organizer_id=e.organizer_id, picture=e.picture.name or None,
+                    picture_variants=e.picture_variants, picture_width=e.picture_width,
+                    picture_height=e.picture_height, picture_placeholder=e.picture_placeholder,
+                    picture_render_failures=e.picture_render_failures, title=e.title, description=e.description, category_ids=e.category_ids, price=e.price, date=e.date,
+                    approved=e.approved, moderation_notes=e.moderation_notes,
+                    created_at=e.created_at, updated_at=e.updated_at,
+                )
+                for e in events
+            ]
+        )
+
+        swipes = Swipe.objects.filter(event_id__in=event_ids)
+        ArchivedSwipe.objects.bulk_create(
+            [
+                ArchivedSwipe(participant_id=participant_id, event_id=event_id, liked=liked, created_at=created_at)
+                for participant_id, event_id, liked, created_at
+                in swipes.values_list("participant_id", "event_id", "liked", "created_at")
+            ],
+            batch_size=1000,
+        )
+        swiped, _ = swipes.delete()
+
+        Event.objects.filter(id__in=event_ids).delete()
+    return len(event_ids), swiped
+
@@ -0,0 +1,144 @@
+# Not re-exported by `api.utils` (numpy), the feed imports it when it needs it
+import threading
+import time
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from .change_log import events_version, aevents_version
+
+CATALOG_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("price", np.float64),
+    ("date", np.float64),          # unix time
+    ("categories", np.uint64),     # bit (category id % 64) set for each category
+    ("organizer", np.int64),
+])
+CATEGORY_BITS = 64
+
+# Events changed this long before the last sync are read again: transactions commit after their `updated_at`
+# is set, and the categories (`category_ids`) are only set after the event row is saved
+_RESYNC_MARGIN = timedelta(seconds=60)
+
+
+def category_mask(category_ids):
+    mask = 0
+    for category_id in category_ids:
+        mask |= 1 << (category_id % CATEGORY_BITS)
+    return np.uint64(mask)
+
+
+class EventCatalog:
+    """
+    Per-process copy of the approved upcoming events as a numpy structured array (CATALOG_DTYPE), so the feed
+    filters them with vectorized masks instead of joining Event, the category M2M and Swipe on every request.
+
+    When the events version (`api.utils.change_log`) changes, only the events updated since the last sync are
+    read again. Deleted events are only dropped by the full reload every EVENT_CATALOG_RELOAD seconds: until then
+    their ids may come out of `candidate_ids`, the events fetched by id just won't include them.
+    """
+    def __init__(self):
+        self.events = np.zeros(0, dtype=CATALOG_DTYPE)
+        self.version = None
+        self.synced_at = None
+        self.loaded_at = None
+        # False when a category id doesn't fit the bitmask, category matches then need checking
+        self.exact_categories = True
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self.events.nbytes
+
+    def _needs_full_load(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > settings.EVENT_CATALOG_RELOAD
+
+    def _rows(self, full, started_at):
+        from ..models import Event
+
+        if full:
+            events = Event.objects.filter(approved=True, date__gte=started_at)
+        else:
+            events = Event.objects.filter(updated_at__gt=self.synced_at - _RESYNC_MARGIN)
+        return events.values_list("id", "approved", "price", "date", "organizer_id", "category_ids")
+
+    def refresh(self):
+        """
+        Brings the catalog up to date if the events changed (one cache read when they didn't).
+        """
+        version = events_version()
+        full = self._needs_full_load()
+        if not full and version == self.version:
+            return
+
+        started_at = timezone.now()
+        self._apply(list(self._rows(full, started_at)), full, version, started_at)
+
+    async def arefresh(self):
+        """
+        Async version of `refresh`.
+        """
+        version = await aevents_version()
+        full = self._needs_full_load()
+        if not full and version == self.version:
+            return
+
+        started_at = timezone.now()
+        self._apply([row async for row in self._rows(full, started_at)], full, version, started_at)
+
+    def _apply(self, rows, full, version, started_at):
+        fresh = np.array(
+            [
+                (event_id, float(price), date.timestamp(), category_mask(category_ids), organizer_id)
+                for event_id, approved, price, date, organizer_id, category_ids in rows
+                if approved and date >= started_at
+            ],
+            dtype=CATALOG_DTYPE,
+        )
+        exact = all(category_id < CATEGORY_BITS for row in rows for category_id in row[5])
+
+        with self._lock:
+            if full:
+                self.events = fresh
+                self.exact_categories = exact
+                self.loaded_at = time.monotonic()
+            else:
+                # Changed events are replaced, the ones no longer approved (or past) just drop out
+                changed = np.array([row[0] for row in rows], dtype=np.int64)
+                kept = self.events[~np.isin(self.events["id"], changed)]
+                self.events = np.concatenate([kept, fresh])
+                self.exact_categories = self.exact_categories and exact
+            # Sorted by id, so excluding ids is a binary search
+            self.events = self.events[np.argsort(self.events["id"], kind="stable")]
+            self.version = version
+            self.synced_at = started_at
+
+    def candidate_ids(self, budget, category_ids, exclude_ids=(), now=None):
+        """
+        Ids of the upcoming events within `budget`, in at least one of `category_ids`, not in `exclude_ids`.
+        """
+        events = self.events
+        now = now or timezone.now()
+
+        mask = (events["price"] <= float(budget)) & (events["date"] >= now.timestamp())
+        mask &= (events["categories"] & category_mask(category_ids)) != 0
+
+        exclude = np.fromiter(exclude_ids, dtype=np.int64)
+        positions = np.searchsorted(events["id"], exclude)
+        found = positions < len(events)
+        found[found] = events["id"][positions[found]] == exclude[found]
+        mask[positions[found]] = False
+        return events["id"][mask]
+
+
+_catalog = EventCatalog()
+
+
+def get_event_catalog():
+    _catalog.refresh()
+    return _catalog
+
+
+async def aget_event_catalog():
+    await _catalog.arefresh()
+    return _catalog
@@ -0,0 +1,54 @@
+from .change_log import bump_events_version
+
+
+def event_category_ids(event_ids, through):
+    """
+    Category ids of each of `event_ids` according to the M2M table `through`, sorted.
+    """
+    by_event = {event_id: [] for event_id in event_ids}
+    rows = through.objects.filter(event_id__in=by_event).order_by("category_id").values_list("event_id", "category_id")
+    for event_id, category_id in rows:
+        by_event[event_id].append(category_id)
+    return by_event
+
+
+def sync_event_category_ids(event_ids):
+    """
+    Copies the category M2M of `event_ids` into their `Event.category_ids`. Returns the ids per event.
+    """
+    from ..models import Event
+
+    by_event = event_category_ids(list(event_ids), Event.category.through)
+    for event_id, category_ids in by_event.items():
+        Event.objects.filter(pk=event_id).update(category_ids=category_ids)
+    return by_event
+
+
+def event_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    `m2m_changed` receiver of `Event.category`: keeps `category_ids` in sync on both sides of the relation
+    (`event.category.set(...)`, `category.events.add(...)`).
+    """
+    from ..models import Event
+
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        instance.category_ids = sync_event_category_ids([instance.pk])[instance.pk]
+    elif action == "post_clear":
+        sync_event_category_ids(Event.objects.filter(category_ids__contains=[instance.pk]).values_list("id", flat=True))
+    else:
+        sync_event_category_ids(pk_set)
+
+
+def category_deleted(sender, instance, **kwargs):
+    """
+    `post_delete` receiver of Category: its M2M rows were deleted without `m2m_changed`, the events drop it here.
+    """
+    from ..models import Event
+
+    event_ids = list(Event.objects.filter(category_ids__contains=[instance.pk]).values_list("id", flat=True))
+    if event_ids:
+        sync_event_category_ids(event_ids)
+        bump_events_version()
@@ -0,0 +1,178 @@
+# Not re-exported by `api.utils` (numpy), callers import it where they need it
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+from .vector_search import embedding_matrix, top_k
+
+logger = logging.getLogger(__name__)
+
+# Events whose neighbors are computed in one matrix product, bounds the memory used by a rebuild
+_BATCH_SIZE = 256
+
+# One worker: the updates run one after the other, in the order the events were written. Threads only start on
+# the first submit, none is forked from the preloading master
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="event-neighbors")
+
+
+def _eligible_events(now):
+    from ..models import Event
+
+    return Event.objects.filter(approved=True, date__gte=now)
+
+
+def load_neighbor_catalog(now=None):
+    """
+    Ids and embedding matrix of the events that can be neighbors: approved and upcoming.
+    """
+    rows = list(_eligible_events(now or timezone.now()).order_by("id").values_list("id", "embedding"))
+    ids = np.array([event_id for event_id, _ in rows], dtype=np.int64)
+    return ids, embedding_matrix(embedding for _, embedding in rows)
+
+
+def compute_neighbors(event_ids, ids, matrix, count):
+    """
+    The `count` most similar events of each of `event_ids` within the catalog (`ids`, `matrix`),
+    as unsaved EventNeighbor rows. Events outside the catalog get none, neither do unrelated events (score <= 0).
+    """
+    from ..models import EventNeighbor
+
+    position = {event_id: i for i, event_id in enumerate(ids.tolist())}
+    targets = [event_id for event_id in event_ids if event_id in position]
+
+    rows = []
+    for start in range(0, len(targets), _BATCH_SIZE):
+        chunk = targets[start:start + _BATCH_SIZE]
+        chunk_positions = np.array([position[event_id] for event_id in chunk], dtype=np.int64)
+        similarities = matrix[chunk_positions] @ matrix.T
+        similarities[np.arange(len(chunk)), chunk_positions] = -np.inf  # not its own neighbor
+
+        for row, event_id in enumerate(chunk):
+            for j in top_k(similarities[row], count):
+                if similarities[row, j] > 0:
+                    rows.append(EventNeighbor(event_id=event_id, neighbor_id=int(ids[j]), score=float(similarities[row, j])))
+    return rows
+
+
+def rebuild_event_neighbors(count=None):
+    """
+    Recomputes the whole neighbor table. Returns (events, rows).
+    """
+    from ..models import EventNeighbor
+
+    count = count or settings.SIMILAR_EVENTS_COUNT
+    ids, matrix = load_neighbor_catalog()
+    rows = compute_neighbors(ids.tolist(), ids, matrix, count)
+
+    with transaction.atomic():
+        EventNeighbor.objects.all().delete()
+        EventNeighbor.objects.bulk_create(rows, batch_size=1000)
+    return len(ids), len(rows)
+
+
+def lists_containing(event_id):
+    """
+    Events that have `event_id` among their neighbors.
+    """
+    from ..models import EventNeighbor
+
+    return set(EventNeighbor.objects.filter(neighbor_id=event_id).values_list("event_id", flat=True))
+
+
+def update_event_neighbors(event_id, affected=None):
+    """
+    Brings the neighbor table up to date after `event_id` was created, updated, approved or deleted:
+    its own neighbors are recomputed, it enters the lists it now belongs to (pushing out their weakest entry),
+    and the lists it was in before are recomputed since its score there changed or it's gone.
+    One pass over the catalog embeddings, however many events there are.
+    :param affected: for a deleted event, `lists_containing` taken before the deletion (the rows cascade with it)
+    """
+    from ..models import EventNeighbor
+
+    count = settings.SIMILAR_EVENTS_COUNT
+    ids, matrix = load_neighbor_catalog()
+    position = {eid: i for i, eid in enumerate(ids.tolist())}
+
+    with transaction.atomic():
+        affected = lists_containing(event_id) | set(affected or ())
+        EventNeighbor.objects.filter(Q(event_id=event_id) | Q(neighbor_id=event_id) | Q(event_id__in=affected)).delete()
+
+        rows = compute_neighbors([event_id], ids, matrix, count)
+        rows += compute_neighbors(sorted(affected), ids, matrix, count)
+
+        if event_id in position:
+            similarities = matrix @ matrix[position[event_id]]
+            lists = {
+                eid: (lowest, size)
+                for eid, lowest, size in EventNeighbor.objects.values("event_id")
+                .annotate(lowest=Min("score"), size=Count("id"))
+                .values_list("event_id", "lowest", "size")
+            }
+
+            full_lists = []
+            for j in np.flatnonzero(similarities > 0):
+                eid = int(ids[j])
+                if eid == event_id or eid in affected:
+                    continue
+                lowest, size = lists.get(eid, (None, 0))
+                if size < count or similarities[j] > lowest:
+                    rows.append(EventNeighbor(event_id=eid, neighbor_id=event_id, score=float(similarities[j])))
+                    if size >= count:
+                        full_lists.append(eid)
+
+            # Lists that were full drop their weakest entry to make room
+            weakest = {}
+            for pk, eid, score in EventNeighbor.objects.filter(event_id__in=full_lists).values_list("pk", "event_id", "score"):
+                if eid not in weakest or score < weakest[eid][1]:
+                    weakest[eid] = (pk, score)
+            EventNeighbor.objects.filter(pk__in=[pk for pk, _ in weakest.values()]).delete()
+
+        EventNeighbor.objects.bulk_create(rows, batch_size=1000)
+
+
+def _update_in_background(event_id, affected):
+    try:
+        update_event_neighbors(event_id, affected)
+    except Exception:
+        logger.exception("Neighbors of event %s failed.", event_id)
+    finally:
+        connection.close()  # the worker thread's own connection
+
+
+def schedule_event_neighbors(event_id, affected=None):
+    """
+    Queues `update_event_neighbors`, off the request path: it goes over the whole catalog. An update lost to a
+    restart is caught up by `refresh_event_neighbors --full`.
+    """
+    _executor.submit(_update_in_background, event_id, affected)
+
+
+def refresh_event_neighbors():
+    """
+    Periodic maintenance: drops the entries of events that expired (or were unapproved) and recomputes the lists
+    that lost one, or are short for any other reason (new events not placed yet). Returns the number of lists recomputed.
+    """
+    from ..models import Event, EventNeighbor
+
+    now = timezone.now()
+    count = settings.SIMILAR_EVENTS_COUNT
+    gone = Event.objects.filter(Q(date__lt=now) | Q(approved=False)).values("id")
+
+    ids, matrix = load_neighbor_catalog(now)
+    with transaction.atomic():
+        affected = set(EventNeighbor.objects.filter(neighbor_id__in=gone).values_list("event_id", flat=True))
+        EventNeighbor.objects.filter(Q(event_id__in=gone) | Q(neighbor_id__in=gone)).delete()
+
+        sizes = dict(EventNeighbor.objects.values("event_id").annotate(size=Count("id")).values_list("event_id", "size"))
+        expected = min(count, len(ids) - 1)
+        short = {event_id for event_id in ids.tolist() if sizes.get(event_id, 0) < expected}
+
+        to_compute = sorted((affected | short) & set(ids.tolist()))
+        EventNeighbor.objects.filter(event_id__in=to_compute).delete()
+        EventNeighbor.objects.bulk_create(compute_neighbors(to_compute, ids, matrix, count), batch_size=1000)
+    return len(to_compute)
+
@@ -0,0 +1,197 @@
+"""
+Decoding and encoding of the image variants, with Pillow only: this module imports nothing from Django or the app,
+so it also runs as a script, in a subprocess with a memory limit (see `image_variants.render_image`):
+
+    python image_decode.py <image path> <output dir> <memory limit MiB> <quality> <width> [<width> ...]
+
+which writes <output dir>/<width>.webp for every variant, prints {"placeholder": <BlurHash>, "peak_kib": <peak
+memory>} and exits with 0.
+"""
+import io
+import json
+import math
+import os
+import sys
+
+from PIL import Image, ImageOps
+
+_EXIF_ORIENTATION = 0x0112
+_ROTATED = (5, 6, 7, 8)  # orientations with a 90° turn
+
+# Memory (bytes) each decoded pixel takes through the decoder, the box reduction and the first resize, measured
+# with Pillow 11: (3 channels, 4 channels). WebP goes through a buffer of libwebp's own before the image
+_BYTES_PER_PIXEL = {"WEBP": (18, 24)}
+_DEFAULT_BYTES_PER_PIXEL = (9, 12)
+# Memory the subprocess takes before decoding anything: the interpreter, Pillow and its codecs
+SUBPROCESS_BASELINE = 14 * 2**20
+
+_BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+_SRGB_TO_LINEAR = [v / 255 / 12.92 if v / 255 <= 0.04045 else ((v / 255 + 0.055) / 1.055) ** 2.4 for v in range(256)]
+
+
+def _is_rotated(image):
+    # Only JPEGs: reading the EXIF of the other formats can mean decoding them
+    return image.format == "JPEG" and image.getexif().get(_EXIF_ORIENTATION, 1) in _ROTATED
+
+
+def upright_size(image):
+    """
+    (width, height) of the opened `image` as displayed, with its EXIF orientation applied. From the headers only,
+    call it before `draft_for_width`.
+    """
+    return (image.height, image.width) if _is_rotated(image) else image.size
+
+
+def _needed_size(image, width):
+    # Size of the largest variant, as stored in the file (before the EXIF orientation is applied)
+    image_width, image_height = upright_size(image)
+    needed = (width, -(-width * image_height // image_width))
+    return needed[::-1] if _is_rotated(image) else needed
+
+
+def draft_for_width(image, width):
+    """
+    Sets the opened `image` to be decoded for variants up to `width`: JPEGs are decoded directly at 1/2 to 1/8 of
+    their size when that's still wide enough, the full resolution of a big photo is never held in memory.
+    `image.size` is then the size that will actually be decoded. Nothing is decoded here.
+    """
+    if image.format == "JPEG":  # the other formats are decoded at full size
+        image.draft("RGB", _needed_size(image, width))
+
+
+def decoded_size(image, width):
+    """
+    Size `draft_for_width(image, width)` would have the opened `image` decoded at, without setting it.
+    """
+    if image.format != "JPEG":
+        return image.size
+    # As JpegImageFile.draft picks it: the smallest scale still covering the largest variant
+    needed_width, needed_height = _needed_size(image, width)
+    ratio = min(image.width // needed_width, image.height // needed_height)
+    scale = next((s for s in (8, 4, 2) if ratio >= s), 1)
+    return -(-image.width // scale), -(-image.height // scale)
+
+
+def decode_cost(image, width):
+    """
+    Memory (bytes) rendering the variants of the opened `image` up to `width` takes, from its headers: the pixels
+    decoded, times what each of them costs in Pillow (`_BYTES_PER_PIXEL`).
+    """
+    four_channels = "A" in image.mode or image.mode == "CMYK" or "transparency" in image.info
+    per_pixel = _BYTES_PER_PIXEL.get(image.format, _DEFAULT_BYTES_PER_PIXEL)[four_channels]
+    decoded_width, decoded_height = decoded_size(image, width)
+    return decoded_width * decoded_height * per_pixel
+
+
+def open_for_width(file, width):
+    image = Image.open(file)
+    draft_for_width(image, width)
+    return image
+
+
+def encode_variants(image, widths, quality):
+    """
+    Decodes `image` and encodes its WebP variants, one per width narrower than it (only one, at its own width,
+    when it's narrower than all of them), largest first, and the BlurHash placeholder: ({width: bytes}, placeholder).
+    The variants carry no EXIF: the orientation is applied to the pixels, the rest is dropped.
+    """
+    # In place: no copy of the full image when there's nothing to turn
+    ImageOps.exif_transpose(image, in_place=True)
+    current = image
+    if current.mode not in ("RGB", "RGBA"):
+        current = current.convert("RGBA" if "transparency" in current.info or "A" in current.mode else "RGB")
+
+    targets = [w for w in sorted(widths, reverse=True) if w < current.width] or [current.width]
+    # Box-reduced to at least the largest variant's width first, the resizes below (which copy RGBA images
+    # once more to premultiply the alpha) only work on that smaller copy
+    factor = current.width // targets[0]
+    if factor >= 2:
+        current = current.reduce(factor)
+
+    variants = {}
+    # Each variant resized from the previous one
+    for target in targets:
+        if target != current.width:
+            size = (target, max(1, round(current.height * target / current.width)))
+            current = current.resize(size, Image.LANCZOS, reducing_gap=2.0)
+        buffer = io.BytesIO()
+        current.save(buffer, "WEBP", quality=quality, method=4)
+        variants[target] = buffer.getvalue()
+    return variants, blurhash(current)
+
+
+def _base83(value, length):
+    return "".join(_BASE83[value // 83 ** (length - 1 - i) % 83] for i in range(length))
+
+
+def _linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    return int((value * 12.92 if value <= 0.0031308 else 1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def blurhash(image, x_components=4, y_components=3):
+    """
+    BlurHash (https://blurha.sh) of `image`: a ~30 characters string the clients decode into a blurred preview
+    of it, painted while the picture loads. Computed on a 32px thumbnail, the result hardly depends on the size.
+    """
+    small = image.convert("RGB")
+    small.thumbnail((32, 32), Image.BOX)
+    width, height = small.size
+    pixels = [tuple(_SRGB_TO_LINEAR[c] for c in pixel) for pixel in small.getdata()]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            r = g = b = 0.0
+            for y in range(height):
+                row = pixels[y * width:(y + 1) * width]
+                for x, (pr, pg, pb) in enumerate(row):
+                    basis = cos_x[i][x] * cos_y[j][y]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = (1 if i == j == 0 else 2) / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    quantised_max = max(0, min(82, int(max(abs(c) for f in ac for c in f) * 166 - 0.5))) if ac else 0
+    max_value = (quantised_max + 1) / 166
+    result += _base83(quantised_max, 1)
+    result += _base83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+    for f in ac:
+        r, g, b = (max(0, min(18, math.floor(math.copysign(abs(c / max_value) ** 0.5, c) * 9 + 9.5))) for c in f)
+        result += _base83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def main(argv):
+    import resource
+
+    path, out_dir, memory_limit, quality, *widths = argv
+    widths = [int(w) for w in widths]
+    # The subprocess shares the container's memory with the worker: past the limit, its allocations fail
+    # (MemoryError, exit 1) instead of the container running out of memory. RLIMIT_DATA counts what the process
+    # allocates (the pixels included), not the interpreter and libraries mapped from the page cache, shared with
+    # the worker that loaded them already
+    limit = int(memory_limit) * 2**20
+    resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+    with open_for_width(path, max(widths)) as image:
+        variants, placeholder = encode_variants(image, widths, int(quality))
+    for width, data in variants.items():
+        with open(os.path.join(out_dir, f"{width}.webp"), "wb") as file:
+            file.write(data)
+
+    # Peak resident memory, without the mapped files (the interpreter and libraries, shared)
+    with open("/proc/self/status") as status:
+        values = {key: int(value.split()[0]) for key, value in (line.split(":", 1) for line in status)
+                  if key in ("VmHWM", "RssFile")}
+    peak = values["VmHWM"] - values["RssFile"]
+    print(json.dumps({"placeholder": placeholder, "peak_kib": peak}))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,51 @@
+from django.conf import settings
+from rest_framework import serializers
+
+
+class BoundedImageField(serializers.ImageField):
+    """
+    ImageField checking the upload from its headers before Pillow goes any further: size in bytes
+    (UPLOAD_MAX_BYTES), format (IMAGE_UPLOAD_FORMATS), declared pixels (IMAGE_MAX_PIXELS) and memory its variants
+    take to render (IMAGE_DECODE_MEMORY_MB, see `fitting_widths`). A decompression bomb is refused from its
+    declared size, no pixel is decoded during the request.
+    """
+    default_error_messages = {
+        "too_large": "Image is larger than {max_size} MiB.",
+        "format": "Image format {format} is not supported, use one of: {formats}.",
+        "too_many_pixels": "Image is {width}x{height}, at most {max_pixels} megapixels are accepted for {format} images.",
+        "too_big_to_decode": "Image is {width}x{height}, too big to be processed as {format}: use a smaller image or a JPEG.",
+        "decompression_bomb": "Image has too many pixels.",
+    }
+
+    def to_internal_value(self, data):
+        from PIL import Image
+        from .image_variants import fitting_widths
+
+        file = serializers.FileField.to_internal_value(self, data)
+        if file.size > settings.UPLOAD_MAX_BYTES:
+            self.fail("too_large", max_size=settings.UPLOAD_MAX_BYTES // 2**20)
+
+        # Uploads are on disk (BoundedUploadHandler), Pillow reads the headers from the file itself
+        source = file.temporary_file_path() if hasattr(file, "temporary_file_path") else file
+        try:
+            with Image.open(source) as image:
+                image_format, (width, height) = image.format, image.size
+                fits = False
+                if image_format in settings.IMAGE_UPLOAD_FORMATS and width * height <= settings.IMAGE_MAX_PIXELS:
+                    fits = bool(fitting_widths(image, sorted(settings.IMAGE_VARIANT_WIDTHS, reverse=True))[0])
+        except Image.DecompressionBombError:
+            self.fail("decompression_bomb")
+        except Exception:
+            self.fail("invalid_image")
+        finally:
+            file.seek(0)
+
+        if image_format not in settings.IMAGE_UPLOAD_FORMATS:
+            self.fail("format", format=image_format, formats=", ".join(settings.IMAGE_UPLOAD_FORMATS))
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            self.fail("too_many_pixels", width=width, height=height, max_pixels=settings.IMAGE_MAX_PIXELS // 10**6, format=image_format)
+        if not fits:
+            self.fail("too_big_to_decode", width=width, height=height, format=image_format)
+
+        # Then the usual checks (Image.verify: structure and checksums, still without decoding the pixels)
+        return super().to_internal_value(data)
@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+# One worker: at most one image decoded at a time, whatever the upload rate. Created with the module rather than
+# on the first upload, so two concurrent first uploads can't each create one; the thread only starts on the first
+# submit, none is forked from the preloading master
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-variants")
+
+
+def variant_name(name, width):
+    return f"{os.path.splitext(name)[0]}_{width}.webp"
+
+
+def fitting_widths(image, widths):
+    """
+    The `widths` (largest first) the variants of the opened `image` can be rendered at within IMAGE_DECODE_MEMORY_MB,
+    and whether that's done in a subprocess: (widths, in_subprocess). A JPEG is decoded smaller for smaller variants,
+    its largest ones are skipped when only they don't fit. ([], False) when none fits. From the headers only.
+    """
+    from . import image_decode
+
+    budget = settings.IMAGE_DECODE_MEMORY_MB * 2**20
+    for i, width in enumerate(widths):
+        decoded_width, decoded_height = image_decode.decoded_size(image, width)
+        in_subprocess = decoded_width * decoded_height > settings.IMAGE_DECODE_INPROCESS_PIXELS
+        needed = image_decode.decode_cost(image, width) + (image_decode.SUBPROCESS_BASELINE if in_subprocess else 0)
+        if needed <= budget:
+            return widths[i:], in_subprocess
+    return [], False
+
+
+def _encode_in_subprocess(name, widths, quality):
+    """
+    Decodes `name` in a child process whose allocations are limited to IMAGE_DECODE_MEMORY_MB: an image that takes
+    more than estimated fails there (no variants) instead of the container running out of memory.
+    """
+    from . import image_decode
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        command = [
+            sys.executable, "-I", image_decode.__file__, default_storage.path(name), out_dir,
+            str(settings.IMAGE_DECODE_MEMORY_MB), str(quality), *map(str, widths),
+        ]
+        try:
+            result = subprocess.run(command, check=True, capture_output=True, timeout=settings.IMAGE_DECODE_TIMEOUT)
+        except subprocess.CalledProcessError as exc:
+            raise OSError(f"Decoding subprocess failed: {exc.stderr.decode(errors='replace')[-500:]}") from exc
+        except subprocess.TimeoutExpired as exc:
+            raise OSError("Decoding subprocess timed out.") from exc
+        output = json.loads(result.stdout)
+        logger.debug("Variants of %s rendered in a subprocess, peak memory %d KiB.", name, output["peak_kib"])
+
+        variants = {}
+        for file_name in os.listdir(out_dir):
+            with open(os.path.join(out_dir, file_name), "rb") as file:
+                variants[int(file_name.split(".")[0])] = file.read()
+        return variants, output["placeholder"]
+
+
+def render_image(name, widths=None, quality=None):
+    """
+    Renders the WebP variants of the stored image `name` (see `image_decode.encode_variants`) and stores them.
+    Returns them with the displayed size and BlurHash placeholder of the image, as the `<field>_*` values of its row:
+    {"variants": {width: name}, "width": ..., "height": ..., "placeholder": ...}.
+    Only the variants that fit in memory are rendered (`fitting_widths`), in a memory-limited subprocess when the
+    image needs more than IMAGE_DECODE_INPROCESS_PIXELS decoded.
+    Returns {} when the file isn't a readable image or is too big to decode.
+    """
+    from PIL import Image
+    from . import image_decode
+
+    widths = sorted(set(widths or settings.IMAGE_VARIANT_WIDTHS), reverse=True)
+    quality = quality or settings.IMAGE_VARIANT_QUALITY
+
+    try:
+        with default_storage.open(name, "rb") as file, Image.open(file) as image:
+            width, height = image_decode.upright_size(image)
+            widths, in_subprocess = fitting_widths(image, widths)
+            if not widths:
+                raise OSError(f"{width}x{height} {image.format} image too big to decode in {settings.IMAGE_DECODE_MEMORY_MB} MiB.")
+            image_decode.draft_for_width(image, widths[0])
+            encoded = None if in_subprocess else image_decode.encode_variants(image, widths, quality)
+        if encoded is None:
+            encoded = _encode_in_subprocess(name, widths, quality)
+    except (OSError, Image.DecompressionBombError):
+        logger.warning("Could not render the variants of %s.", name, exc_info=True)
+        return {}
+
+    variants, placeholder = encoded
+    return {
+        "variants": {
+            str(w): default_storage.save(variant_name(name, w), ContentFile(data))
+            for w, data in sorted(variants.items(), reverse=True)
+        },
+        "width": width,
+        "height": height,
+        "placeholder": placeholder,
+    }
+
+
+def delete_image_variants(variants):
+    for name in (variants or {}).values():
+        default_storage.delete(name)
+
+
+def variant_urls(variants):
+    """
+    srcset-style map of the variants for the payloads: {"320w": url, ...}, smallest first.
+    """
+    return {f"{width}w": default_storage.url(name) for width, name in sorted((variants or {}).items(), key=lambda v: int(v[0]))}
+
+
+def store_image_variants(model, pk, field, name, replaces=None):
+    """
+    Renders `name` (see `render_image`) and saves the variants, size and placeholder in the `<field>_*` columns of the
+    row, unless the image was replaced or removed meanwhile (then the variants are deleted right away and {} is
+    returned). `replaces` are variants the row had before, deleted once the new ones are saved.
+    A failed rendering is counted in `<field>_render_failures` and returns {}.
+    """
+    rendered = {}
+    try:
+        rendered = render_image(name)
+    finally:
+        if not rendered:
+            failures = f"{field}_render_failures"
+            model.objects.filter(pk=pk, **{field: name}).update(**{failures: F(failures) + 1})
+    if not rendered:
+        return {}
+    values = {f"{field}_{key}": value for key, value in rendered.items()}
+    if not model.objects.filter(pk=pk, **{field: name}).update(**values):
+        delete_image_variants(rendered["variants"])
+        return {}
+    delete_image_variants(replaces)
+    return rendered
+
+
+def image_payload(instance, field):
+    """
+    The `field` image of `instance` in the payloads: url, srcset of the variants, displayed size and BlurHash
+    placeholder (the last three empty until the image has been rendered in the background).
+    """
+    image = getattr(instance, field)
+    return {
+        field: image.url if image else None,
+        f"{field}_srcset": variant_urls(getattr(instance, f"{field}_variants")),
+        f"{field}_width": getattr(instance, f"{field}_width"),
+        f"{field}_height": getattr(instance, f"{field}_height"),
+        f"{field}_placeholder": getattr(instance, f"{field}_placeholder") or None,
+    }
+
+
+def _store_in_background(model, pk, field, name):
+    try:
+        store_image_variants(model, pk, field, name)
+    except Exception:
+        logger.exception("Image variants of %s failed.", name)
+    finally:
+        connection.close()  # the worker thread's own connection
+
+
+def schedule_image_variants(instance, field):
+    """
+    Queues the rendering of the variants of `instance.<field>`, off the request path. Images whose rendering
+    was lost (worker restarted) are picked up by the `render_image_variants` command.
+    """
+    name = getattr(instance, field).name
+    if not name:
+        return
+    _executor.submit(_store_in_background, type(instance), instance.pk, field, name)
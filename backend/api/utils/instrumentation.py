@@ -0,0 +1,159 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from .metrics import observe_llm_call
+
+_current_timings = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """
+    Per-request performance counters, filled by the instrumentation hooks and emitted by `ServerTimingMiddleware`.
+    Only plain counters are kept so it's cheap enough to stay on in production.
+    """
+    __slots__ = (
+        "start", "sql_count", "sql_time", "llm_count", "llm_time",
+        "prompt_tokens", "completion_tokens", "spans",
+    )
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.llm_count = 0
+        self.llm_time = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.spans = {}
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def add_span(self, name, duration):
+        self.spans[name] = self.spans.get(name, 0.0) + duration
+
+    def server_timing_header(self, total):
+        """
+        Formats the counters as a `Server-Timing` header value (durations in milliseconds).
+        """
+        metrics = [
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"',
+        ]
+
+        if self.llm_count:
+            metrics.append(
+                f'llm;dur={self.llm_time * 1000:.1f};'
+                f'desc="{self.llm_count} calls, {self.prompt_tokens}+{self.completion_tokens} tokens"'
+            )
+
+        for name, duration in self.spans.items():
+            metrics.append(f"{name};dur={duration * 1000:.1f}")
+
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def to_dict(self, total):
+        """
+        Returns the counters as a flat dict, used for the structured log line.
+        """
+        data = {
+            "total_ms": round(total * 1000, 1),
+            "db_queries": self.sql_count,
+            "db_ms": round(self.sql_time * 1000, 1),
+            "llm_calls": self.llm_count,
+            "llm_ms": round(self.llm_time * 1000, 1),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+        for name, duration in self.spans.items():
+            data[f"{name}_ms"] = round(duration * 1000, 1)
+
+        return data
+
+
+def start_request_timings():
+    """
+    Starts collecting timings for the current request, returns the timings and the token to reset them.
+    """
+    timings = RequestTimings()
+    return timings, _current_timings.set(timings)
+
+
+def resume_request_timings(timings):
+    """
+    Collects into the `timings` of a request again, e.g. while its streamed body is produced after the view returned.
+    Returns the token to reset them.
+    """
+    return _current_timings.set(timings)
+
+
+def stop_request_timings(token):
+    _current_timings.reset(token)
+
+
+def current_request_timings():
+    """
+    Returns the timings of the request being served, or None outside of a request (commands, shell...).
+    """
+    return _current_timings.get()
+
+
+def sql_execute_wrapper(execute, sql, params, many, context):
+    """
+    Database execute wrapper counting queries and their time for the current request.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.sql_count += 1
+        timings.sql_time += time.perf_counter() - start
+
+
+def install_sql_execute_wrapper(sender, connection, **kwargs):
+    """
+    `connection_created` receiver: installs the SQL timer on every new DB connection (any thread, sync or async).
+    """
+    if sql_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_execute_wrapper)
+
+
+def record_llm_call(name, duration, usage=None, outcome="success"):
+    """
+    Records an LLM call on the current request and in the metrics.
+    `usage` is the completion usage returned by the provider, if any.
+    """
+    observe_llm_call(name, duration, usage, outcome)
+
+    timings = _current_timings.get()
+    if timings is None:
+        return
+
+    timings.llm_count += 1
+    timings.llm_time += duration
+
+    if usage is not None:
+        timings.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+        timings.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+
+@contextmanager
+def timed_span(name):
+    """
+    Adds the time spent in the block to the `name` span of the current request.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_span(name, time.perf_counter() - start)
@@ -0,0 +1,414 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextvars import ContextVar
+from functools import lru_cache
+from django.conf import settings
+from .instrumentation import record_llm_call
+from .llm_limiter import LLMQueueRejected, PRIORITY_INTERACTIVE, get_llm_limiter
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+_request_deadline = ContextVar("llm_request_deadline", default=None)
+
+
+class LLMUnavailable(Exception):
+    """
+    Raised when an LLM call can't be completed: circuit breaker open, request budget exhausted or all attempts failed.
+    Callers are expected to fall back to a local behaviour instead of failing the request.
+    """
+
+
+def set_request_deadline(budget):
+    """
+    Starts the time budget of the current request, LLM calls made while serving it never outlive it.
+    Returns the token to reset it.
+    """
+    return _request_deadline.set(time.monotonic() + budget)
+
+
+def current_request_deadline():
+    """
+    The deadline (`time.monotonic()` value) of the request being served, or None outside of a request.
+    """
+    return _request_deadline.get()
+
+
+def resume_request_deadline(deadline):
+    """
+    Puts back a deadline taken with `current_request_deadline`, e.g. while the streamed body of the request is produced.
+    Returns the token to reset it.
+    """
+    return _request_deadline.set(deadline)
+
+
+def reset_request_deadline(token):
+    _request_deadline.reset(token)
+
+
+class CircuitBreaker:
+    """
+    Stops calling the LLM after `failure_threshold` consecutive failures, for `reset_timeout` seconds.
+    Then a single probe call is let through (half open): success closes the breaker, failure opens it again.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self):
+        return self._state
+
+    def allow(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._transition(self.HALF_OPEN)
+
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self._state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self._state != self.OPEN:
+                    self._transition(self.OPEN)
+
+    def release_probe(self):
+        """
+        Gives back the half open probe of a call that was abandoned (client gone) before it succeeded or failed.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _transition(self, state):
+        logger.warning("LLM circuit breaker %s -> %s", self._state, state)
+        self._state = state
+        registry.inc("llm_circuit_breaker_transitions_total", {"state": state})
+
+
+class LLMGateway:
+    """
+    Single entry point for LLM completions, shared by every caller in the process.
+
+    - calls wait for one of the LLM_MAX_CONCURRENCY slots shared by every worker, by priority
+    - each attempt gets a timeout derived from what's left of the request budget
+    - retryable errors (timeouts, connection errors, 429, 5xx) are retried a bounded number of times with jittered backoff
+    - optionally, a second identical request is sent if the first one is slow, and the first answer wins
+    - repeated failures open a circuit breaker, so callers fail fast and use their local fallback
+    """
+    def __init__(self):
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.LLM_BREAKER_RESET_TIMEOUT,
+        )
+        # Hedged requests; threads only start when the first one is sent
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="llm-hedge")
+
+    def complete(self, name, priority=PRIORITY_INTERACTIVE, **params):
+        """
+        Runs `chat.completions.create(**params)` and returns the response, or raises LLMUnavailable.
+        `priority` orders the callers waiting for a concurrency slot (interactive before batch).
+        """
+        try:
+            with get_llm_limiter().slot(priority, timeout=self._queue_timeout(name)):
+                return self._complete(name, priority, **params)
+        except LLMQueueRejected as exc:
+            raise LLMUnavailable(f"LLM call '{name}' rejected: {exc}") from exc
+
+    async def acomplete(self, name, priority=PRIORITY_INTERACTIVE, **params):
+        """
+        Async version of `complete`.
+        """
+        try:
+            async with get_llm_limiter().aslot(priority, timeout=self._queue_timeout(name)):
+                try:
+                    return await self._acomplete(name, priority, **params)
+                except asyncio.CancelledError:
+                    # Client disconnected, don't leave a half open probe hanging
+                    self.breaker.release_probe()
+                    raise
+        except LLMQueueRejected as exc:
+            raise LLMUnavailable(f"LLM call '{name}' rejected: {exc}") from exc
+
+    async def astream(self, name, priority=PRIORITY_INTERACTIVE, **params):
+        """
+        Runs a streamed completion, yielding the content deltas as they arrive.
+        Raises LLMUnavailable, possibly after some deltas were yielded: the caller has to finish on its own.
+        There are no retries nor hedging, a partial answer can't be replayed.
+        """
+        from .openai_utils import get_async_client
+
+        try:
+            async with get_llm_limiter().aslot(priority, timeout=self._queue_timeout(name)):
+                self._check_breaker(name)
+                timeout = self._attempt_timeout(name)
+                start = time.perf_counter()
+                usage = None
+                settled = False
+
+                try:
+                    stream = await get_async_client().chat.completions.create(
+                        timeout=timeout, stream=True, stream_options={"include_usage": True}, **params
+                    )
+                    async with stream:
+                        async for chunk in stream:
+                            if chunk.usage is not None:
+                                usage = chunk.usage
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                yield chunk.choices[0].delta.content
+                    settled = True
+                except Exception as exc:
+                    settled = True
+                    self._record_failure(name, exc, time.perf_counter() - start)
+                    self.breaker.record_failure()
+                    raise LLMUnavailable(f"LLM stream '{name}' failed: {exc}") from exc
+                finally:
+                    # Consumer went away mid-stream: neither a success nor a failure
+                    if not settled:
+                        self.breaker.release_probe()
+
+                record_llm_call(name, time.perf_counter() - start, usage)
+                self.breaker.record_success()
+        except LLMQueueRejected as exc:
+            raise LLMUnavailable(f"LLM call '{name}' rejected: {exc}") from exc
+
+    def _complete(self, name, priority, **params):
+        from .openai_utils import get_client
+
+        self._check_breaker(name)
+        attempts = 1 + settings.LLM_MAX_RETRIES
+
+        for attempt in range(attempts):
+            timeout = self._attempt_timeout(name)
+            start = time.perf_counter()
+
+            try:
+                response = self._hedged(
+                    lambda: get_client().chat.completions.create(timeout=timeout, **params), name, priority, timeout
+                )
+            except Exception as exc:
+                self._record_failure(name, exc, time.perf_counter() - start)
+
+                if attempt + 1 == attempts or not self._is_retryable(exc):
+                    self.breaker.record_failure()
+                    raise LLMUnavailable(f"LLM call '{name}' failed: {exc}") from exc
+
+                time.sleep(self._backoff(attempt))
+                continue
+
+            record_llm_call(name, time.perf_counter() - start, response.usage)
+            self.breaker.record_success()
+            return response
+
+    async def _acomplete(self, name, priority, **params):
+        from .openai_utils import get_async_client
+
+        self._check_breaker(name)
+        attempts = 1 + settings.LLM_MAX_RETRIES
+
+        for attempt in range(attempts):
+            timeout = self._attempt_timeout(name)
+            start = time.perf_counter()
+
+            try:
+                response = await self._ahedged(
+                    lambda: get_async_client().chat.completions.create(timeout=timeout, **params), name, priority, timeout
+                )
+            except Exception as exc:
+                self._record_failure(name, exc, time.perf_counter() - start)
+
+                if attempt + 1 == attempts or not self._is_retryable(exc):
+                    self.breaker.record_failure()
+                    raise LLMUnavailable(f"LLM call '{name}' failed: {exc}") from exc
+
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            record_llm_call(name, time.perf_counter() - start, response.usage)
+            self.breaker.record_success()
+            return response
+
+    def _check_breaker(self, name):
+        if not self.breaker.allow():
+            registry.inc("llm_calls_total", {"call": name, "outcome": "rejected"})
+            raise LLMUnavailable(f"LLM call '{name}' rejected: circuit breaker is {self.breaker.state}.")
+
+    def _queue_timeout(self, name):
+        """
+        How long the call may wait for a concurrency slot: whatever leaves room for a minimal attempt.
+        """
+        deadline = _request_deadline.get()
+        if deadline is None:
+            return None
+
+        remaining = deadline - time.monotonic() - settings.LLM_DEADLINE_RESERVE - settings.LLM_MIN_CALL_TIMEOUT
+        return max(0.0, remaining)
+
+    def _attempt_timeout(self, name):
+        """
+        Timeout for the next attempt: the per-call timeout, capped by what's left of the request budget.
+        """
+        timeout = settings.LLM_CALL_TIMEOUT
+        deadline = _request_deadline.get()
+
+        if deadline is not None:
+            remaining = deadline - time.monotonic() - settings.LLM_DEADLINE_RESERVE
+            if remaining < settings.LLM_MIN_CALL_TIMEOUT:
+                registry.inc("llm_calls_total", {"call": name, "outcome": "deadline_exceeded"})
+                raise LLMUnavailable(f"LLM call '{name}' skipped: request budget exhausted.")
+            timeout = min(timeout, remaining)
+
+        return timeout
+
+    def _backoff(self, attempt):
+        """
+        Full jitter exponential backoff, never sleeping past the request deadline.
+        """
+        delay = random.uniform(0, settings.LLM_RETRY_BACKOFF * (2 ** attempt))
+        deadline = _request_deadline.get()
+        if deadline is not None:
+            delay = max(0.0, min(delay, deadline - time.monotonic() - settings.LLM_DEADLINE_RESERVE))
+        return delay
+
+    def _hedged(self, call, name, priority, timeout):
+        """
+        Runs `call`, sending a second identical request if the first one hasn't answered after LLM_HEDGE_AFTER seconds.
+
+        A blocking request can't be interrupted, so the one that loses keeps running after the caller is answered.
+        The second request takes a slot of its own for that reason, held until both requests are over:
+        the LLM calls in flight never exceed LLM_MAX_CONCURRENCY, and no slot free means no hedging.
+        """
+        hedge_after = settings.LLM_HEDGE_AFTER
+        if not hedge_after or hedge_after >= timeout:
+            return call()
+
+        futures = {self._executor.submit(call)}
+        done, _ = wait(futures, timeout=hedge_after)
+
+        if not done:
+            release = get_llm_limiter().try_slot(priority)
+            if release is not None:
+                registry.inc("llm_hedged_requests_total", {"call": name})
+                futures.add(self._executor.submit(call))
+                _release_when_done(futures, release)
+
+        # First successful answer wins, an error only counts if every request failed
+        error = None
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if futures:
+                        registry.inc("llm_hedge_losers_total", {"call": name, "outcome": "left_running"})
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _ahedged(self, call, name, priority, timeout):
+        """
+        Async version of `_hedged`, the request that loses is cancelled (its connection closed).
+        """
+        hedge_after = settings.LLM_HEDGE_AFTER
+        if not hedge_after or hedge_after >= timeout:
+            return await call()
+
+        tasks = {asyncio.ensure_future(call())}
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+
+        if not done:
+            release = get_llm_limiter().try_slot(priority)
+            if release is not None:
+                registry.inc("llm_hedged_requests_total", {"call": name})
+                tasks.add(asyncio.ensure_future(call()))
+                _release_when_done(tasks, release)
+
+        error = None
+        try:
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+                registry.inc("llm_hedge_losers_total", {"call": name, "outcome": "cancelled"})
+
+    def _record_failure(self, name, exc, duration):
+        import openai
+
+        timed_out = isinstance(exc, openai.APITimeoutError)
+        record_llm_call(name, duration, outcome="timeout" if timed_out else "failure")
+        if not timed_out:
+            logger.warning("LLM call '%s' failed: %s", name, exc)
+
+    def _is_retryable(self, exc):
+        import openai
+
+        if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+            return True
+        return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+def _release_when_done(futures, release):
+    """
+    Calls `release` once every future (or task) of `futures` is done, whichever thread finishes last.
+    """
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            release()
+
+    for future in futures:
+        future.add_done_callback(done)
+
+
+@lru_cache(maxsize=None)
+def get_llm_gateway():
+    """
+    Returns the process-wide LLM gateway (and so the process-wide circuit breaker).
+    """
+    return LLMGateway()
+
+
+def record_llm_fallback(name):
+    """
+    Records that a caller served its local fallback because the LLM was unavailable.
+    """
+    registry.inc("llm_fallbacks_total", {"call": name})
@@ -0,0 +1,195 @@
+import asyncio
+import fcntl
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache, partial
+from django.conf import settings
+from .metrics import registry
+
+# Lower value is served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+QUEUE_WAIT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10)
+
+_POLL_INTERVAL = 0.02
+
+
+class LLMQueueRejected(Exception):
+    """
+    Raised when a caller can't get an LLM slot: the wait queue is full or the wait timed out.
+    """
+    def __init__(self, reason):
+        super().__init__(f"LLM concurrency limit reached ({reason}).")
+        self.reason = reason
+
+
+class LLMConcurrencyLimiter:
+    """
+    Caps the LLM calls in flight across every process of the container.
+
+    Slots are `LLM_MAX_CONCURRENCY` files in `LLM_LIMITER_DIR` held with an exclusive flock,
+    so a crashed worker releases its slot automatically and no DB connection is needed.
+    Waiters drop a ticket file named by (priority, arrival time) and only the first one in that order
+    may take a free slot, so interactive requests overtake batch moderation and the queue stays FIFO otherwise.
+    """
+    def __init__(self, directory, max_concurrency, queue_size, queue_timeout):
+        self.directory = directory
+        self.queue_dir = os.path.join(directory, "queue")
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        os.makedirs(self.queue_dir, exist_ok=True)
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_INTERACTIVE, timeout=None):
+        """
+        Holds a slot for the duration of the block, waiting at most `timeout` seconds (default LLM_QUEUE_TIMEOUT).
+        """
+        fd = self._try_acquire_now(priority)
+        if fd is None:
+            ticket = self._enqueue(priority)
+            start = time.perf_counter()
+            deadline = time.monotonic() + min(self.queue_timeout, timeout if timeout is not None else self.queue_timeout)
+            try:
+                while fd is None:
+                    if time.monotonic() >= deadline:
+                        self._reject(priority, "timeout")
+                    time.sleep(_POLL_INTERVAL)
+                    fd = self._try_acquire_queued(ticket)
+            finally:
+                self._dequeue(ticket)
+            self._observe_wait(priority, time.perf_counter() - start)
+
+        try:
+            yield
+        finally:
+            os.close(fd)
+
+    @asynccontextmanager
+    async def aslot(self, priority=PRIORITY_INTERACTIVE, timeout=None):
+        """
+        Async version of `slot`, waits without blocking the event loop.
+        """
+        fd = self._try_acquire_now(priority)
+        if fd is None:
+            ticket = self._enqueue(priority)
+            start = time.perf_counter()
+            deadline = time.monotonic() + min(self.queue_timeout, timeout if timeout is not None else self.queue_timeout)
+            try:
+                while fd is None:
+                    if time.monotonic() >= deadline:
+                        self._reject(priority, "timeout")
+                    await asyncio.sleep(_POLL_INTERVAL)
+                    fd = self._try_acquire_queued(ticket)
+            finally:
+                self._dequeue(ticket)
+            self._observe_wait(priority, time.perf_counter() - start)
+
+        try:
+            yield
+        finally:
+            os.close(fd)
+
+    def try_slot(self, priority=PRIORITY_INTERACTIVE):
+        """
+        Takes a free slot without waiting, for a request that may outlive the caller's `slot` block.
+        Returns a function releasing it (callable from any thread), or None if no slot is free.
+        """
+        fd = self._try_acquire_now(priority)
+        if fd is None:
+            return None
+        return partial(os.close, fd)
+
+    def queue_length(self):
+        return len(self._waiting())
+
+    def _try_acquire_now(self, priority):
+        # Nobody waiting ahead of us: skip the queue entirely
+        waiting = self._waiting()
+        if waiting and waiting[0] < self._ticket_prefix(priority):
+            return None
+
+        fd = self._grab_free_slot()
+        if fd is not None:
+            self._observe_wait(priority, 0.0)
+        return fd
+
+    def _try_acquire_queued(self, ticket):
+        waiting = self._waiting()
+        name = os.path.basename(ticket)
+        # Only the head of the queue may take a slot, so a batch waiter never overtakes an interactive one
+        if waiting and waiting[0] != name:
+            return None
+        return self._grab_free_slot()
+
+    def _grab_free_slot(self):
+        for index in range(self.max_concurrency):
+            fd = os.open(os.path.join(self.directory, f"slot-{index}"), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            return fd
+        return None
+
+    def _enqueue(self, priority):
+        if len(self._waiting()) >= self.queue_size:
+            self._reject(priority, "queue_full")
+
+        ticket = os.path.join(self.queue_dir, f"{self._ticket_prefix(priority)}-{uuid.uuid4().hex[:8]}")
+        with open(ticket, "x"):
+            pass
+        return ticket
+
+    def _dequeue(self, ticket):
+        try:
+            os.unlink(ticket)
+        except FileNotFoundError:
+            pass
+
+    def _ticket_prefix(self, priority):
+        return f"{priority}-{time.time_ns():020d}"
+
+    def _waiting(self):
+        """
+        Sorted ticket names, tickets left behind by a killed process are dropped once older than the queue timeout.
+        """
+        tickets = []
+        stale_before = time.time() - self.queue_timeout - 1
+        with os.scandir(self.queue_dir) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime < stale_before:
+                        os.unlink(entry.path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                tickets.append(entry.name)
+        tickets.sort()
+        return tickets
+
+    def _observe_wait(self, priority, duration):
+        registry.observe("llm_queue_wait_seconds", {"priority": PRIORITY_NAMES[priority]}, duration, QUEUE_WAIT_BUCKETS)
+
+    def _reject(self, priority, reason):
+        registry.inc("llm_queue_rejections_total", {"priority": PRIORITY_NAMES[priority], "reason": reason})
+        raise LLMQueueRejected(reason)
+
+
+@lru_cache(maxsize=None)
+def get_llm_limiter():
+    """
+    Returns the process-wide LLM concurrency limiter.
+    """
+    return LLMConcurrencyLimiter(
+        directory=settings.LLM_LIMITER_DIR,
+        max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        queue_size=settings.LLM_QUEUE_SIZE,
+        queue_timeout=settings.LLM_QUEUE_TIMEOUT,
+    )
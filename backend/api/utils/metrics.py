@@ -0,0 +1,230 @@
+import atexit
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import closing, contextmanager
+
+logger = logging.getLogger(__name__)
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+PROMPT_TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+# Metric families exposed on /api/metrics: name -> (type, help)
+METRIC_FAMILIES = {
+    "http_request_duration_seconds": ("histogram", "Request latency by route name."),
+    "http_requests_total": ("counter", "Requests by route name and status code."),
+    "db_queries_total": ("counter", "SQL queries executed by route name."),
+    "db_query_duration_seconds_total": ("counter", "Time spent in SQL queries by route name."),
+    "llm_call_duration_seconds": ("histogram", "LLM call latency by call type."),
+    "llm_calls_total": ("counter", "LLM calls by call type and outcome (success, failure, timeout, rejected, deadline_exceeded)."),
+    "llm_tokens_total": ("counter", "LLM tokens by call type and kind (prompt/completion)."),
+    "llm_prompt_tokens_estimated": ("histogram", "Estimated prompt size of each LLM call, measured before sending it."),
+    "llm_hedged_requests_total": ("counter", "Second requests sent because the first LLM request was slow."),
+    "llm_hedge_losers_total": ("counter", "Hedged LLM requests still in flight when the other one answered, by outcome (cancelled, left_running)."),
+    "llm_fallbacks_total": ("counter", "Requests served by the local fallback because the LLM was unavailable."),
+    "llm_circuit_breaker_transitions_total": ("counter", "LLM circuit breaker state changes, by new state."),
+    "llm_queue_wait_seconds": ("histogram", "Time spent waiting for an LLM concurrency slot, by priority."),
+    "llm_queue_rejections_total": ("counter", "LLM calls refused by the concurrency limiter, by priority and reason (queue_full, timeout)."),
+    "cache_requests_total": ("counter", "Cache lookups by cache name and result (hit/miss)."),
+}
+
+
+def _format_labels(labels):
+    return ",".join(f'{key}="{str(value)}"' for key, value in sorted(labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Prometheus-style counters and histograms aggregated across processes.
+
+    Each process accumulates deltas in memory and periodically adds them to a shared SQLite file,
+    so totals survive gunicorn worker restarts and every worker sees the same numbers.
+    No external service is needed.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(float)
+        self._last_flush = time.monotonic()
+
+    def inc(self, name, labels, value=1.0):
+        key = (name, _format_labels(labels))
+        with self._lock:
+            self._pending[key] += value
+        self.maybe_flush()
+
+    def observe(self, name, labels, value, buckets):
+        base = _format_labels(labels)
+        prefix = f"{base}," if base else ""
+
+        with self._lock:
+            # Every bucket is written, even with 0, so histogram_quantile() always sees the full set
+            for bound in buckets:
+                self._pending[(f"{name}_bucket", f'{prefix}le="{bound}"')] += 1 if value <= bound else 0
+            self._pending[(f"{name}_bucket", f'{prefix}le="+Inf"')] += 1
+            self._pending[(f"{name}_sum", base)] += value
+            self._pending[(f"{name}_count", base)] += 1
+
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        from django.conf import settings
+
+        if time.monotonic() - self._last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """
+        Adds the pending deltas of this process to the shared store.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+            self._last_flush = time.monotonic()
+
+        if not pending:
+            return
+
+        try:
+            with self._store() as db:
+                db.executemany(
+                    "INSERT INTO samples (name, labels, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value",
+                    [(name, labels, value) for (name, labels), value in pending.items()],
+                )
+        except sqlite3.Error:
+            logger.warning("Could not flush metrics, keeping them for the next flush.", exc_info=True)
+            with self._lock:
+                for key, value in pending.items():
+                    self._pending[key] += value
+
+    def collect(self):
+        """
+        Returns all (name, labels, value) samples of every process.
+        """
+        self.flush()
+        with self._store() as db:
+            return db.execute("SELECT name, labels, value FROM samples ORDER BY name, labels").fetchall()
+
+    @contextmanager
+    def _store(self):
+        """
+        Opens the shared SQLite store in a transaction, committed when the block exits.
+        """
+        from django.conf import settings
+
+        with closing(sqlite3.connect(settings.METRICS_DB_PATH, timeout=5)) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=OFF")
+            with db:
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS samples ("
+                    "name TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL, PRIMARY KEY (name, labels))"
+                )
+                yield db
+
+
+registry = MetricsRegistry()
+atexit.register(registry.flush)
+
+
+def observe_request(route, method, status, duration, timings):
+    """
+    Records a served request, `timings` are the RequestTimings collected by ServerTimingMiddleware.
+    """
+    route = route or "unknown"
+    registry.observe("http_request_duration_seconds", {"route": route, "method": method}, duration, REQUEST_BUCKETS)
+    registry.inc("http_requests_total", {"route": route, "method": method, "status": status})
+
+    if timings.sql_count:
+        registry.inc("db_queries_total", {"route": route}, timings.sql_count)
+        registry.inc("db_query_duration_seconds_total", {"route": route}, timings.sql_time)
+
+
+def observe_llm_call(name, duration, usage=None, outcome="success"):
+    """
+    Records an LLM call, its outcome (success, failure, timeout) and its token usage.
+    """
+    registry.observe("llm_call_duration_seconds", {"call": name}, duration, LLM_BUCKETS)
+    registry.inc("llm_calls_total", {"call": name, "outcome": outcome})
+
+    if usage is not None:
+        registry.inc("llm_tokens_total", {"call": name, "kind": "prompt"}, getattr(usage, "prompt_tokens", 0) or 0)
+        registry.inc("llm_tokens_total", {"call": name, "kind": "completion"}, getattr(usage, "completion_tokens", 0) or 0)
+
+
+def observe_prompt_tokens(name, tokens):
+    """
+    Records the estimated size of a prompt about to be sent.
+    """
+    registry.observe("llm_prompt_tokens_estimated", {"call": name}, tokens, PROMPT_TOKEN_BUCKETS)
+
+
+def record_cache_access(cache, hit):
+    """
+    Records a cache lookup, the hit ratio is derived from these counters.
+    """
+    registry.inc("cache_requests_total", {"cache": cache, "result": "hit" if hit else "miss"})
+
+
+def _family_of(sample_name):
+    if sample_name in METRIC_FAMILIES:
+        return sample_name
+
+    for suffix in ("_bucket", "_sum", "_count"):
+        if sample_name.endswith(suffix) and sample_name[:-len(suffix)] in METRIC_FAMILIES:
+            return sample_name[:-len(suffix)]
+
+    return sample_name
+
+
+def _sample_sort_key(sample):
+    """
+    Keeps each histogram's buckets together and ordered by their numeric upper bound.
+    """
+    name, labels, _ = sample
+    base, _, le = labels.partition('le="')
+    bound = math.inf if le.startswith("+Inf") else float(le.rstrip('"')) if le else 0.0
+    suffix_order = 0 if name.endswith("_bucket") else 1 if name.endswith("_sum") else 2
+    return (base.rstrip(","), suffix_order, bound)
+
+
+def render_prometheus():
+    """
+    Renders every sample in the Prometheus text exposition format.
+    """
+    families = defaultdict(list)
+    cache_counts = defaultdict(lambda: {"hit": 0.0, "miss": 0.0})
+
+    for name, labels, value in registry.collect():
+        families[_family_of(name)].append((name, labels, value))
+
+        if name == "cache_requests_total":
+            parts = dict(part.split("=", 1) for part in labels.split(","))
+            cache_counts[parts["cache"]][parts["result"].strip('"')] += value
+
+    lines = []
+    for family in sorted(families):
+        metric_type, help_text = METRIC_FAMILIES.get(family, ("untyped", ""))
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {metric_type}")
+
+        for name, labels, value in sorted(families[family], key=_sample_sort_key):
+            lines.append(f"{name}{{{labels}}} {_format_value(value)}" if labels else f"{name} {_format_value(value)}")
+
+    if cache_counts:
+        lines.append("# HELP cache_hit_ratio Cache hits over lookups since the metrics store was created.")
+        lines.append("# TYPE cache_hit_ratio gauge")
+        for cache, counts in sorted(cache_counts.items()):
+            total = counts["hit"] + counts["miss"]
+            lines.append(f"cache_hit_ratio{{cache={cache}}} {_format_value(counts['hit'] / total if total else 0.0)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
@@ -1,5 +1,15 @@
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
+from django.utils import timezone
 from rest_framework import serializers
+from .instrumentation import timed_span
+from .llm_gateway import LLMUnavailable, record_llm_fallback
+from .embeddings import load_embedding
+from .preferences import load_preference_vector, describe_preferences, event_features, preference_score
+from .ranking import order_events_locally, plan_incremental_ranking, pick_anchors, merge_ranked_ids
+from .single_flight import SingleFlight
+from .trending import trending_event_ids, atrending_event_ids
+from .image_variants import image_payload
 
 
 class PasswordValidationMixin:
@@ -224,8 +234,8 @@ class EventValidationMixin:
     """
     Helpers to find and validate events.
     """
-    def validate_find_event(self, attrs):
-        from ..models import Event
+    def validate_find_event(self, attrs, include_archived=False):
+        from ..models import ArchivedEvent, Event
 
         organizer = attrs["organizer"]
         event_id = self.context.get("event_id")
@@ -233,7 +243,9 @@ class EventValidationMixin:
         try:
             event = Event.objects.get(id=event_id, organizer=organizer)
         except Event.DoesNotExist:
-            raise serializers.ValidationError("Event not found for this organizer.")
+            event = ArchivedEvent.objects.filter(id=event_id, organizer=organizer).first() if include_archived else None
+            if event is None:
+                raise serializers.ValidationError("Event not found for this organizer.")
         
         attrs["event"] = event
         return attrs
@@ -268,16 +280,33 @@ class GetCategoriesMixin:
 
 class GetEventsMixin:
     def get_events_for_organizer(self, organizer_id):
-        from ..models import Event
+        from ..models import ArchivedEvent, Event
         events = Event.objects.filter(organizer_id=organizer_id).order_by("-created_at")
-        return [self._event_to_dict(e, include_moderation=True) for e in events]
+        archived = ArchivedEvent.objects.filter(organizer_id=organizer_id).order_by("-created_at")
+        # past events moved to the archive are still part of the organizer's history, after the live ones
+        return [self._event_to_dict(e, include_moderation=True) for e in events] + [self._archived_event_to_dict(e) for e in archived]
 
-    def get_public_events(self):
+    def get_public_events(self, category_ids=None):
         from ..models import Event
-        events = Event.objects.filter(approved=True).order_by("date")
+        events = Event.objects.filter(approved=True, date__gte=timezone.now()).order_by("date")
+        if category_ids:
+            events = events.filter(category_ids__overlap=category_ids)  # GIN index, no join
         # no moderation notes for public
         return [self._event_to_dict(e, include_moderation=False) for e in events]
 
+    def get_similar_events(self, event_id, limit):
+        """
+        Precomputed most similar approved upcoming events (see `api.utils.event_neighbors`), as public dicts.
+        """
+        from ..models import EventNeighbor
+
+        neighbors = (
+            EventNeighbor.objects.filter(event_id=event_id, neighbor__approved=True, neighbor__date__gte=timezone.now())
+            .select_related("neighbor")
+            .order_by("-score")[:limit]
+        )
+        return [self._event_to_dict(n.neighbor, include_moderation=False) for n in neighbors]
+
     def _event_to_dict(self, event, include_moderation=False):
         data = {
             "id": event.id,
@@ -286,14 +315,22 @@ class GetEventsMixin:
             "description": event.description,
             "price": float(event.price),
             "date": event.date,
-            "categories": [c.id for c in event.category.all()],
+            "categories": event.category_ids,
             "approved": event.approved,
-            "picture": event.picture.url if event.picture else None,
+            **image_payload(event, "picture"),
         }
 
         if include_moderation:
             data["moderation_notes"] = event.moderation_notes
+            data["moderation_pending"] = event.moderation_pending
+
+        return data
 
+    def _archived_event_to_dict(self, event):
+        data = self._event_to_dict(event)
+        data["moderation_notes"] = event.moderation_notes
+        data["moderation_pending"] = False
+        data["archived"] = True
         return data
 
 
@@ -381,70 +418,383 @@ class GetParticipantsMixin:
         return [self.get_participant_public(b) for b in self.get_participants_queryset()]
     
 
+_feed_single_flight = SingleFlight("recommendation_feed")
+
+
 class RecommendationMixin(GetEventsMixin):
-    def _build_user_profile_text(self, participant):
-        """ 
-        Build a textual profile of the participant for LLM input.
+    def _build_user_profile(self, participant):
         """
+        Build the participant profile used for ranking: preferred categories, budget, the preference vector and taste
+        embedding learned from the swipes (and what the vector says in words), the latest COLIKE_RECENT_LIKES liked
+        event ids for the co-like scores and the trending ranks for tie breaks.
+        """
+        from ..models import Category
+
+        categories = list(participant.categories.values_list("id", "name"))
+        all_categories = list(Category.objects.values_list("id", "name"))
+        liked_ids = list(self._recent_liked_ids(participant))
+        return self._user_profile(participant, categories, all_categories, liked_ids, trending_event_ids())
+
+    def _recent_liked_ids(self, participant):
+        # Read backwards on the (participant, liked, created_at) index, however many swipes the participant has
         from ..models import Swipe
 
-        categories = ", ".join(participant.categories.values_list("name", flat=True))
-        liked_swipes = (
-            Swipe.objects.filter(participant=participant, liked=True).select_related("event")
-        )
-        liked_titles = ", ".join(s.event.title for s in liked_swipes[:10])
+        liked = Swipe.objects.filter(participant=participant, liked=True).order_by("-created_at")
+        return liked.values_list("event_id", flat=True)[:settings.COLIKE_RECENT_LIKES]
+
+    def _user_profile(self, participant, categories, all_categories, liked_ids, trending_ids):
+        preferences = load_preference_vector(participant.preference_vector)
+        return {
+            "category_ids": [category_id for category_id, _ in categories],
+            "categories": [name for _, name in categories],
+            "budget": participant.budget,
+            "preferences": preferences,
+            "taste": participant.taste_embedding,
+            "leaning": describe_preferences(preferences, all_categories),
+            "liked_ids": liked_ids,
+            "trending": {event_id: rank for rank, event_id in enumerate(trending_ids)},
+        }
 
-        text =  (
-            f"User prefers categories: {categories or 'none specified'}.\n"
-            f"Budget available: {participant.budget}.\n"
-            f"Previously liked events: {liked_titles or 'none yet'}."
-        )
-    
-        return text
+    def _events_payload(self, candidates):
+        """
+        Candidate events as sent to the ranking prompt builder (which truncates the descriptions).
+        """
+        return [
+            {
+                "id": e.id,
+                "title": e.title,
+                "description": e.description,
+                "price": e.price,
+                "date": e.date,
+                "categories": [c.name for c in e.category.all()],
+            }
+            for e in candidates
+        ]
+
+    def _order_locally(self, candidates, user_profile):
+        """
+        Local order of the candidates: affinity with the preference vector, text similarity with the taste embedding
+        and co-like scores from the participant's likes, then preferred categories, then trending.
+        """
+        from .colike import colike_scores
+        from .vector_search import cosine_scores, embedding_matrix
+
+        preferences = user_profile["preferences"]
+        scores = colike_scores(user_profile["liked_ids"], [e.id for e in candidates])
+        taste = load_embedding(user_profile["taste"])
+        similarities = cosine_scores(taste, embedding_matrix(e.embedding for e in candidates)) if taste else None
+
+        for i, e in enumerate(candidates):
+            features = event_features(e.category_ids, e.price, e.title)
+            score = scores.get(e.id, 0.0) + preference_score(preferences, features)
+            if similarities is not None:
+                score += float(similarities[i])
+            scores[e.id] = score
+        return order_events_locally(candidates, user_profile["category_ids"], scores, user_profile["trending"])
+
+    def _order_by_ranking(self, candidates, ranked_ids):
+        id_to_event = {e.id: e for e in candidates}
+        ranked_events = [id_to_event[eid] for eid in ranked_ids if eid in id_to_event]
+        ranked = set(ranked_ids)
+        # events the LLM left out (or that didn't fit the prompt) keep the local order
+        ranked_events.extend(e for e in candidates if e.id not in ranked)
+
+        with timed_span("serialize"):
+            return [self._event_to_dict(e) for e in ranked_events]
 
     def _get_candidate_events(self, participant):
         """
-        Fetch events that match participant preferences and budget, excluding swiped events.
+        Fetch upcoming events that match participant preferences and budget, excluding swiped events.
+        The filtering runs on the in-memory event catalog, only the matching events are read from the database.
         """
+        from ..models import Swipe
+        from .event_catalog import get_event_catalog
+
+        category_ids = list(participant.categories.values_list("id", flat=True))
+        swiped_ids = Swipe.objects.filter(participant=participant).values_list("event_id", flat=True)
+        catalog = get_event_catalog()
+        ids = catalog.candidate_ids(participant.budget, category_ids, swiped_ids)
+        return list(self._events_by_id(ids, category_ids, catalog))
+
+    def _events_by_id(self, ids, category_ids, catalog):
+        from ..models import Event
+
+        # approved checked again: the catalog may be a moment behind
+        events = Event.objects.filter(id__in=ids.tolist(), approved=True)
+        if not catalog.exact_categories:
+            events = events.filter(category_ids__overlap=category_ids)
+        # category names for the ranking prompt
+        return events.prefetch_related("category")
+
+    def get_recommendations(self, participant):
+        """
+        Get a list of recommended events for the participant, ranked by relevance using an LLM.
+        Falls back to a local ranking when the LLM is unavailable.
+        Concurrent requests of the same participant (two devices, retries) share a single computation.
+        """
+        return _feed_single_flight.do(participant.id, lambda: self._compute_recommendations(participant))
+
+    def _compute_recommendations(self, participant):
+        from ..models import RankedFeed
+
+        now = timezone.now()
+        candidates = self._get_candidate_events(participant)
+        if not candidates:
+            return self._trending_feed(participant)
+
+        user_profile = self._build_user_profile(participant)
+        # Local order first: if the prompt budget runs short, the least promising events are the ones left out
+        candidates = self._order_locally(candidates, user_profile)
+
+        feed = RankedFeed.objects.filter(participant=participant).first()
+        plan = self._plan_ranking(feed, candidates, now)
+
+        if plan is None:
+            ranked_ids = self._rank_all(user_profile, candidates)
+            if ranked_ids is not None:
+                self._save_ranked_feed(participant, ranked_ids, now, full_ranked_at=now)
+        else:
+            ranked_ids = self._place_new_events(participant, user_profile, candidates, feed, plan, now)
+
+        return self._order_by_ranking(candidates, ranked_ids or [e.id for e in candidates])
+
+    def _trending_candidates(self, participant, trending_ids):
         from ..models import Event, Swipe
 
         swiped_ids = Swipe.objects.filter(participant=participant).values_list("event_id", flat=True)
-        events = (
-            Event.objects.filter(approved=True)
+        return (
+            Event.objects.filter(id__in=trending_ids, approved=True, date__gte=timezone.now())
             .exclude(id__in=swiped_ids)
             .filter(price__lte=participant.budget)
-            .filter(category__in=participant.categories.all())
-            .distinct()
         )
-        return list(events)
 
-    def get_recommendations(self, participant):
+    def _trending_feed(self, participant):
         """
-        Get a list of recommended events for the participant, ranked by relevance using an LLM.
+        Feed of a participant with nothing to rank from (no preferred categories yet, or every matching event
+        swiped): the trending events they haven't swiped and can afford, most trending first. No LLM involved.
+        """
+        trending_ids = trending_event_ids()
+        candidates = list(self._trending_candidates(participant, trending_ids))
+        return self._order_by_ranking(candidates, trending_ids)
+
+    def _plan_ranking(self, feed, candidates, now):
+        return plan_incremental_ranking(
+            feed, candidates, now,
+            max_new=settings.RANKED_FEED_MAX_NEW_EVENTS,
+            max_age=settings.RANKED_FEED_MAX_AGE,
+        )
+
+    def _rank_all(self, user_profile, candidates):
+        """
+        Ranks every candidate with the LLM, returns None if it's unavailable (the local order is used, and not stored).
         """
         from .openai_utils import rank_events_with_llm
 
-        candidates = self._get_candidate_events(participant)
+        try:
+            ranked_ids = rank_events_with_llm(user_profile, self._events_payload(candidates))
+        except LLMUnavailable:
+            record_llm_fallback("rank")
+            return None
+
+        return self._complete_ranking(candidates, ranked_ids)
+
+    def _place_new_events(self, participant, user_profile, candidates, feed, plan, now):
+        """
+        Places the new or changed events into the stored ranking: a small ranking of them among a few anchors
+        of the stored order (locally if the LLM is unavailable), merged into it. Returns the merged ranked ids.
+        """
+        from .openai_utils import rank_events_with_llm
+
+        kept_ids, to_place = plan
+        if not to_place:
+            # Only swiped / removed events to drop, no ranking needed
+            if kept_ids != feed.event_ids:
+                self._save_ranked_feed(participant, kept_ids, feed.built_at, full_ranked_at=feed.full_ranked_at)
+            return kept_ids
+
+        subset = self._placement_subset(user_profile, candidates, kept_ids, to_place)
+
+        try:
+            mini_ranking = rank_events_with_llm(user_profile, self._events_payload(subset))
+        except LLMUnavailable:
+            record_llm_fallback("rank")
+            mini_ranking = [e.id for e in subset]
+
+        ranked_ids = merge_ranked_ids(kept_ids, [e.id for e in to_place], mini_ranking)
+        self._save_ranked_feed(participant, ranked_ids, now, full_ranked_at=feed.full_ranked_at)
+        return ranked_ids
+
+    def _placement_subset(self, user_profile, candidates, kept_ids, to_place):
+        anchor_ids = set(pick_anchors(kept_ids, settings.RANKED_FEED_ANCHORS))
+        anchors = [e for e in candidates if e.id in anchor_ids]
+        return self._order_locally(anchors + to_place, user_profile)
+
+    def _complete_ranking(self, candidates, ranked_ids):
+        """
+        The LLM ranked ids that are candidates, followed by the candidates it left out in their local order.
+        """
+        candidate_ids = {e.id for e in candidates}
+        ranked = list(dict.fromkeys(eid for eid in ranked_ids if eid in candidate_ids))
+        seen = set(ranked)
+        return ranked + [e.id for e in candidates if e.id not in seen]
+
+    def _save_ranked_feed(self, participant, ranked_ids, built_at, full_ranked_at):
+        from ..models import RankedFeed
+
+        RankedFeed.objects.update_or_create(
+            participant=participant,
+            defaults={"event_ids": ranked_ids, "built_at": built_at, "full_ranked_at": full_ranked_at},
+        )
+
+    async def _abuild_user_profile(self, participant):
+        """
+        Async version of `_build_user_profile`.
+        """
+        from ..models import Category
+
+        categories = [c async for c in participant.categories.values_list("id", "name")]
+        all_categories = [c async for c in Category.objects.values_list("id", "name")]
+        liked_ids = [event_id async for event_id in self._recent_liked_ids(participant)]
+        return self._user_profile(participant, categories, all_categories, liked_ids, await atrending_event_ids())
+
+    async def _aget_candidate_events(self, participant):
+        """
+        Async version of `_get_candidate_events`, categories are prefetched so no query runs while serializing.
+        """
+        from ..models import Swipe
+        from .event_catalog import aget_event_catalog
+
+        category_ids = [c async for c in participant.categories.values_list("id", flat=True)]
+        swiped_ids = [e async for e in Swipe.objects.filter(participant=participant).values_list("event_id", flat=True)]
+        catalog = await aget_event_catalog()
+        ids = catalog.candidate_ids(participant.budget, category_ids, swiped_ids)
+        return [e async for e in self._events_by_id(ids, category_ids, catalog)]
+
+    async def aget_recommendations(self, participant):
+        """
+        Async version of `get_recommendations`, awaits the LLM instead of blocking the worker.
+        """
+        return await _feed_single_flight.ado(participant.id, lambda: self._acompute_recommendations(participant))
+
+    async def _acompute_recommendations(self, participant):
+        from ..models import RankedFeed
+
+        now = timezone.now()
+        candidates = await self._aget_candidate_events(participant)
         if not candidates:
-            return []
+            return await self._atrending_feed(participant)
 
-        events_payload = [
-            {
-                "id": e.id,
-                "title": e.title,
-                "description": e.description[:300],
-                "price": float(e.price),
-                "categories": list(e.category.values_list("name", flat=True)),
-            }
-            for e in candidates
-        ]
+        user_profile = await self._abuild_user_profile(participant)
+        candidates = self._order_locally(candidates, user_profile)
+
+        feed = await RankedFeed.objects.filter(participant=participant).afirst()
+        plan = self._plan_ranking(feed, candidates, now)
+
+        if plan is None:
+            ranked_ids = await self._arank_all(user_profile, candidates)
+            if ranked_ids is not None:
+                await self._asave_ranked_feed(participant, ranked_ids, now, full_ranked_at=now)
+        else:
+            ranked_ids = await self._aplace_new_events(participant, user_profile, candidates, feed, plan, now)
+
+        return self._order_by_ranking(candidates, ranked_ids or [e.id for e in candidates])
+
+    async def _atrending_feed(self, participant):
+        """
+        Async version of `_trending_feed`.
+        """
+        trending_ids = await atrending_event_ids()
+        candidates = [e async for e in self._trending_candidates(participant, trending_ids)]
+        return self._order_by_ranking(candidates, trending_ids)
+
+    async def _arank_all(self, user_profile, candidates):
+        """
+        Async version of `_rank_all`.
+        """
+        from .openai_utils import arank_events_with_llm
+
+        try:
+            ranked_ids = await arank_events_with_llm(user_profile, self._events_payload(candidates))
+        except LLMUnavailable:
+            record_llm_fallback("rank")
+            return None
+
+        return self._complete_ranking(candidates, ranked_ids)
+
+    async def _aplace_new_events(self, participant, user_profile, candidates, feed, plan, now):
+        """
+        Async version of `_place_new_events`.
+        """
+        from .openai_utils import arank_events_with_llm
+
+        kept_ids, to_place = plan
+        if not to_place:
+            # Only swiped / removed events to drop, no ranking needed
+            if kept_ids != feed.event_ids:
+                await self._asave_ranked_feed(participant, kept_ids, feed.built_at, full_ranked_at=feed.full_ranked_at)
+            return kept_ids
+
+        subset = self._placement_subset(user_profile, candidates, kept_ids, to_place)
+
+        try:
+            mini_ranking = await arank_events_with_llm(user_profile, self._events_payload(subset))
+        except LLMUnavailable:
+            record_llm_fallback("rank")
+            mini_ranking = [e.id for e in subset]
+
+        ranked_ids = merge_ranked_ids(kept_ids, [e.id for e in to_place], mini_ranking)
+        await self._asave_ranked_feed(participant, ranked_ids, now, full_ranked_at=feed.full_ranked_at)
+        return ranked_ids
+
+    async def _asave_ranked_feed(self, participant, ranked_ids, built_at, full_ranked_at):
+        from ..models import RankedFeed
+
+        await RankedFeed.objects.aupdate_or_create(
+            participant=participant,
+            defaults={"event_ids": ranked_ids, "built_at": built_at, "full_ranked_at": full_ranked_at},
+        )
+
+    async def astream_recommendations(self, participant):
+        """
+        Yields the feed events one at a time: in the LLM order as its ranked ids stream in,
+        then the events it left out (or all of them if the LLM fails) in the local order.
+        A stored ranking that only needs a few new events placed is sent right away instead.
+        """
+        from ..models import RankedFeed
+        from .openai_utils import astream_ranked_event_ids
 
-        user_profile = self._build_user_profile_text(participant)
-        ranked_ids = rank_events_with_llm(user_profile, events_payload)
+        now = timezone.now()
+        candidates = await self._aget_candidate_events(participant)
+        if not candidates:
+            for event in await self._atrending_feed(participant):
+                yield event
+            return
 
+        user_profile = await self._abuild_user_profile(participant)
+        candidates = self._order_locally(candidates, user_profile)
         id_to_event = {e.id: e for e in candidates}
-        ranked_events = [id_to_event[eid] for eid in ranked_ids if eid in id_to_event]
-        remaining = [e for e in candidates if e.id not in ranked_ids]
-        ranked_events.extend(remaining)
 
-        return [self._event_to_dict(e) for e in ranked_events]
\ No newline at end of file
+        feed = await RankedFeed.objects.filter(participant=participant).afirst()
+        plan = self._plan_ranking(feed, candidates, now)
+        if plan is not None:
+            ranked_ids = await self._aplace_new_events(participant, user_profile, candidates, feed, plan, now)
+            for event_id in ranked_ids:
+                yield self._event_to_dict(id_to_event[event_id])
+            return
+
+        sent = []
+        sent_ids = set()
+        try:
+            async for event_id in astream_ranked_event_ids(user_profile, self._events_payload(candidates)):
+                if event_id in id_to_event and event_id not in sent_ids:
+                    sent.append(event_id)
+                    sent_ids.add(event_id)
+                    yield self._event_to_dict(id_to_event[event_id])
+        except LLMUnavailable:
+            record_llm_fallback("rank")
+        else:
+            await self._asave_ranked_feed(participant, self._complete_ranking(candidates, sent), now, full_ranked_at=now)
+
+        for event in candidates:
+            if event.id not in sent_ids:
+                yield self._event_to_dict(event)
\ No newline at end of file
@@ -1,50 +1,98 @@
 import json
+import logging
+import re
+from functools import lru_cache
 from typing import List, Dict
-from openai import OpenAI
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from .llm_gateway import LLMUnavailable, get_llm_gateway, record_llm_fallback
+from .llm_limiter import PRIORITY_INTERACTIVE
+from .metrics import observe_prompt_tokens
+from .prompt_builder import build_ranking_messages
 import os
 
-client = OpenAI(
-    api_key=os.environ["OPENROUTER_API_KEY"],
-    base_url="https://openrouter.ai/api/v1",
-)
+logger = logging.getLogger(__name__)
 
-def rank_events_with_llm(user_profile: str, events: List[Dict]) -> List[int]:
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+RANKING_MODEL = "gpt-4.1-nano"
+MODERATION_MODEL = "gpt-4.1-mini"
+
+
+def _get_api_key() -> str:
     """
-    Uses an LLM to rank events by relevance.
-    :param user_profile: text describing the participant (preferences, liked events, etc.)
-    :param events: list of dicts, each with at least id, title, description, price, categories
-    :return: list of event_ids ordered from most to least relevant
+    Reads the OpenRouter key when a client is first needed, so a missing key only breaks LLM calls.
     """
-    if not events:
-        return []
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        raise ImproperlyConfigured("OPENROUTER_API_KEY is not set.")
+    return api_key
 
-    system_prompt = (
-        "You are a recommendation engine for events. "
-        "Given a user profile and a list of events, you must return ONLY JSON with "
-        "a single key 'ranked_event_ids', an array of event IDs ordered from most "
-        "to least relevant for this user."
-    )
 
-    user_prompt = (
-        "USER PROFILE:\n"
-        f"{user_profile}\n\n"
-        "EVENTS (as JSON list):\n"
-        f"{json.dumps(events, ensure_ascii=False)}\n\n"
-        "Return JSON like:\n"
-        "{\"ranked_event_ids\": [1, 5, 2, ...]}\n"
+@lru_cache(maxsize=None)
+def get_client():
+    """
+    Returns the process-wide sync LLM client, built on first use.
+    The `openai` package is heavy to import, so processes that never call the LLM never load it.
+    """
+    from openai import OpenAI
+
+    # Retries are handled by the LLM gateway, within the request budget
+    return OpenAI(api_key=_get_api_key(), base_url=OPENROUTER_BASE_URL, max_retries=0)
+
+
+@lru_cache(maxsize=None)
+def get_async_client():
+    """
+    Returns the process-wide async LLM client, used by the async views so many LLM calls can be in flight on a single worker.
+    """
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=_get_api_key(), base_url=OPENROUTER_BASE_URL, max_retries=0)
+
+
+def warm_llm_imports():
+    """
+    Imports the `openai` package without building any client (no sockets, no API key needed).
+    Called by the gunicorn master before forking, so recycled workers inherit it instead of importing it again.
+    """
+    import openai  # noqa: F401
+
+
+def _create_completion(name: str, model: str, messages: List[Dict], priority: int = PRIORITY_INTERACTIVE) -> str:
+    """
+    Runs a JSON chat completion through the LLM gateway (concurrency limit, deadline, retries, circuit breaker).
+    Raises LLMUnavailable if no answer could be obtained.
+    """
+    response = get_llm_gateway().complete(
+        name,
+        priority=priority,
+        model=model,
+        temperature=0,
+        response_format={"type": "json_object"},
+        messages=messages,
     )
+    return response.choices[0].message.content
+
 
-    response = client.chat.completions.create(
-        model="gpt-4.1-nano",  
+async def _acreate_completion(name: str, model: str, messages: List[Dict], priority: int = PRIORITY_INTERACTIVE) -> str:
+    """
+    Async version of `_create_completion`.
+    """
+    response = await get_llm_gateway().acomplete(
+        name,
+        priority=priority,
+        model=model,
         temperature=0,
         response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
+        messages=messages,
     )
+    return response.choices[0].message.content
+
 
-    content = response.choices[0].message.content
+def _parse_ranking(content: str, events: List[Dict]) -> List[int]:
+    """
+    Parses the LLM ranking answer, falling back to the original order if it's malformed.
+    """
     try:
         data = json.loads(content)
         ranked_ids = data.get("ranked_event_ids", [])
@@ -53,10 +101,46 @@ def rank_events_with_llm(user_profile: str, events: List[Dict]) -> List[int]:
         return [e["id"] for e in events]
 
 
-def moderate_event_content(title: str, description: str) -> Dict[str, str]:
+class RankedIdsStreamParser:
     """
-    Uses an LLM to decide whether an event is allowed.
-    Returns dict: {"approved": bool, "reason": str}
+    Extracts the ids of a `{"ranked_event_ids": [...]}` answer while it's still being streamed.
+    An id is only returned once the `,` or `]` after it arrived, so it's never a truncated number.
+    """
+    _ID = re.compile(r'\s*"?(\d+)"?\s*([,\]])')
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = None
+        self.done = False
+
+    def feed(self, text: str) -> List[int]:
+        self._buffer += text
+        if self.done:
+            return []
+
+        if self._pos is None:
+            key = self._buffer.find("ranked_event_ids")
+            bracket = self._buffer.find("[", key) if key >= 0 else -1
+            if bracket < 0:
+                return []
+            self._pos = bracket + 1
+
+        ids = []
+        while True:
+            match = self._ID.match(self._buffer, self._pos)
+            if match is None:
+                break
+            ids.append(int(match.group(1)))
+            self._pos = match.end()
+            if match.group(2) == "]":
+                self.done = True
+                break
+        return ids
+
+
+def _moderation_messages(title: str, description: str) -> List[Dict]:
+    """
+    Builds the chat messages used to moderate an event.
     """
     system_prompt = (
         "You are a strict content moderator for an events platform. "
@@ -76,18 +160,24 @@ def moderate_event_content(title: str, description: str) -> Dict[str, str]:
         f"DESCRIPTION: {description}\n"
     )
 
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",          # or your chosen model
-        temperature=0,
-        response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def _pending_moderation() -> Dict[str, str]:
+    """
+    Moderation result used when the LLM is unavailable: the event waits for `moderate_pending_events`.
+    """
+    record_llm_fallback("moderate")
+    return {"approved": False, "pending": True, "reason": "Automatic moderation unavailable; pending review."}
 
-    content = response.choices[0].message.content
 
+def _parse_moderation(content: str) -> Dict[str, str]:
+    """
+    Parses the LLM moderation answer.
+    """
     try:
         data = json.loads(content)
         approved = bool(data.get("approved", False))
@@ -95,4 +185,103 @@ def moderate_event_content(title: str, description: str) -> Dict[str, str]:
         return {"approved": approved, "reason": reason}
     except Exception:
         # Fail-safe: if parsing fails, mark as not approved with generic reason
-        return {"approved": False, "reason": "Automatic moderation failed; requires manual review."}
\ No newline at end of file
+        return {"approved": False, "reason": "Automatic moderation failed; requires manual review."}
+
+
+def _ranking_messages(user_profile: Dict, events: List[Dict]) -> List[Dict]:
+    """
+    Builds the ranking prompt within LLM_RANKING_TOKEN_BUDGET and records its estimated size.
+    Returns an empty list if not even one event fits the budget, callers keep the given order without calling the LLM.
+    """
+    messages, stats = build_ranking_messages(user_profile, events, settings.LLM_RANKING_TOKEN_BUDGET)
+    if not messages:
+        logger.warning("Ranking prompt over budget without any event, LLM_RANKING_TOKEN_BUDGET is too small.")
+        return messages
+
+    observe_prompt_tokens("rank", stats["prompt_tokens"])
+    if stats["events_dropped"]:
+        logger.info("Ranking prompt over budget, %s of %s events left out.", stats["events_dropped"], len(events))
+    return messages
+
+
+def rank_events_with_llm(user_profile: Dict, events: List[Dict]) -> List[int]:
+    """
+    Uses an LLM to rank events by relevance.
+    :param user_profile: dict describing the participant: categories (names), budget, leaning (what the swipes say)
+    :param events: list of dicts, each with id, title, description, price, date, categories (names), most promising first
+    :return: list of event_ids ordered from most to least relevant
+    :raises LLMUnavailable: if the LLM can't be reached in time, callers should rank locally
+    """
+    if not events:
+        return []
+
+    messages = _ranking_messages(user_profile, events)
+    if not messages:
+        return [e["id"] for e in events]
+
+    content = _create_completion("rank", RANKING_MODEL, messages)
+    return _parse_ranking(content, events)
+
+
+async def arank_events_with_llm(user_profile: Dict, events: List[Dict]) -> List[int]:
+    """
+    Async version of `rank_events_with_llm`, doesn't block the event loop while waiting on the LLM.
+    """
+    if not events:
+        return []
+
+    messages = _ranking_messages(user_profile, events)
+    if not messages:
+        return [e["id"] for e in events]
+
+    content = await _acreate_completion("rank", RANKING_MODEL, messages)
+    return _parse_ranking(content, events)
+
+
+async def astream_ranked_event_ids(user_profile: Dict, events: List[Dict]):
+    """
+    Streaming version of `arank_events_with_llm`: yields the ranked event ids as the LLM writes them,
+    none if no event fits the prompt budget.
+    :raises LLMUnavailable: possibly after some ids were yielded, callers should finish with the local order
+    """
+    messages = _ranking_messages(user_profile, events) if events else []
+    if not messages:
+        return
+
+    parser = RankedIdsStreamParser()
+    deltas = get_llm_gateway().astream(
+        "rank",
+        model=RANKING_MODEL,
+        temperature=0,
+        response_format={"type": "json_object"},
+        messages=messages,
+    )
+    async for delta in deltas:
+        for event_id in parser.feed(delta):
+            yield event_id
+
+
+def moderate_event_content(title: str, description: str, priority: int = PRIORITY_INTERACTIVE) -> Dict[str, str]:
+    """
+    Uses an LLM to decide whether an event is allowed.
+    Returns dict: {"approved": bool, "reason": str}, with "pending": True if the LLM is unavailable.
+    Batch callers pass PRIORITY_BATCH so they queue behind interactive requests.
+    """
+    try:
+        content = _create_completion("moderate", MODERATION_MODEL, _moderation_messages(title, description), priority)
+    except LLMUnavailable:
+        return _pending_moderation()
+
+    return _parse_moderation(content)
+
+
+async def amoderate_event_content(title: str, description: str, priority: int = PRIORITY_INTERACTIVE) -> Dict[str, str]:
+    """
+    Async version of `moderate_event_content`.
+    """
+    try:
+        content = await _acreate_completion("moderate", MODERATION_MODEL, _moderation_messages(title, description), priority)
+    except LLMUnavailable:
+        return _pending_moderation()
+
+    return _parse_moderation(content)
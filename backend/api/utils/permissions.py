@@ -40,4 +40,18 @@ class IsOrganizerRole(BasePermission):
             request.user 
             and request.user.is_authenticated
             and request.user.role == Roles.ORGANIZER.value
-        )
\ No newline at end of file
+        )
+
+
+class IsAdminRoleOrLocalhost(IsAdminRole):
+    """
+    Allows access to users with the ADMIN role, or to unproxied requests coming from localhost (e.g. a local Prometheus).
+    """
+    LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+    def has_permission(self, request, view):
+        is_local = (
+            request.META.get('REMOTE_ADDR') in self.LOCAL_ADDRESSES
+            and 'HTTP_X_FORWARDED_FOR' not in request.META
+        )
+        return is_local or super().has_permission(request, view)
\ No newline at end of file
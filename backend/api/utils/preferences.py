@@ -0,0 +1,141 @@
+import re
+import zlib
+from array import array
+from django.conf import settings
+from .embeddings import EMBEDDING_SIZE, load_embedding
+
+# Vector layout: hashed category ids, price bands, hashed title words
+CATEGORY_SLOTS = 32
+TEXT_SLOTS = 64
+# Upper bounds of the price bands, the first one is "free" and prices above the last go in an extra band
+PRICE_BAND_LIMITS = (0, 10, 25, 50, 100)
+PRICE_BAND_LABELS = ("free", "up to 10", "10-25", "25-50", "50-100", "over 100")
+
+_PRICE_OFFSET = CATEGORY_SLOTS
+_TEXT_OFFSET = _PRICE_OFFSET + len(PRICE_BAND_LABELS)
+PREFERENCE_VECTOR_SIZE = _TEXT_OFFSET + TEXT_SLOTS
+
+_WORD = re.compile(r"\w{3,}")
+
+
+def _category_slot(category_id):
+    return category_id % CATEGORY_SLOTS
+
+
+def price_band(price):
+    """
+    Index of the price band `price` falls in.
+    """
+    for band, limit in enumerate(PRICE_BAND_LIMITS):
+        if price <= limit:
+            return band
+    return len(PRICE_BAND_LIMITS)
+
+
+def event_features(category_ids, price, title):
+    """
+    Sparse feature vector of an event, as slot -> weight.
+    Each group (categories, price, title words) weighs 1 in total, so no group wins just by having more entries.
+    """
+    features = {}
+    for category_id in category_ids:
+        slot = _category_slot(category_id)
+        features[slot] = features.get(slot, 0.0) + 1.0 / len(category_ids)
+
+    features[_PRICE_OFFSET + price_band(price)] = 1.0
+
+    # crc32 rather than hash(): the slots must be the same in every process
+    words = _WORD.findall(title.lower())
+    for word in words:
+        slot = _TEXT_OFFSET + zlib.crc32(word.encode()) % TEXT_SLOTS
+        features[slot] = features.get(slot, 0.0) + 1.0 / len(words)
+
+    return features
+
+
+def load_preference_vector(blob):
+    """
+    The float32 preference vector stored in `blob`, zeros when there's none yet (or it has an old layout).
+    """
+    vector = array("f")
+    if blob and len(blob) == PREFERENCE_VECTOR_SIZE * vector.itemsize:
+        vector.frombytes(bytes(blob))
+        return vector
+    return array("f", bytes(PREFERENCE_VECTOR_SIZE * vector.itemsize))
+
+
+def update_preference_vector(blob, features, liked):
+    """
+    Folds one swipe into the preference vector: decayed running average of the swiped events' features,
+    counted positively for a like and negatively (PREFERENCE_DISLIKE_WEIGHT) for a dislike.
+    Constant time whatever the number of swipes. Returns the new blob.
+    """
+    return _decayed_update(load_preference_vector(blob), features.items(), liked).tobytes()
+
+
+def update_taste_embedding(blob, embedding, liked):
+    """
+    Same running average over the swiped events' text embeddings: where the participant's taste sits in the
+    embedding space. Returns the new blob.
+    """
+    vector = load_embedding(blob) or array("f", bytes(EMBEDDING_SIZE * 4))
+    return _decayed_update(vector, enumerate(embedding), liked).tobytes()
+
+
+def _decayed_update(vector, features, liked):
+    decay = settings.PREFERENCE_DECAY
+    target = 1.0 if liked else -settings.PREFERENCE_DISLIKE_WEIGHT
+
+    for i in range(len(vector)):
+        vector[i] *= 1.0 - decay
+    for slot, weight in features:
+        vector[slot] += decay * target * weight
+    return vector
+
+
+def preference_score(vector, features):
+    """
+    Affinity of an event with the preference vector, positive when it looks like what the participant liked.
+    """
+    return sum(vector[slot] * weight for slot, weight in features.items())
+
+
+def describe_preferences(vector, categories, max_categories=5):
+    """
+    What the preference vector says in words, for the ranking prompt.
+    :param categories: (id, name) of every category
+    :return: {"categories": [names the participant leans to, strongest first], "price": band label or None}
+    """
+    leaning = sorted(
+        ((vector[_category_slot(category_id)], name) for category_id, name in categories),
+        key=lambda item: -item[0],
+    )
+    bands = [vector[_PRICE_OFFSET + band] for band in range(len(PRICE_BAND_LABELS))]
+    best_band = max(range(len(bands)), key=bands.__getitem__)
+
+    return {
+        "categories": [name for weight, name in leaning if weight > 0][:max_categories],
+        "price": PRICE_BAND_LABELS[best_band] if bands[best_band] > 0 else None,
+    }
+
+
+def record_swipe_preference(participant_id, event, liked):
+    """
+    Updates the participant's preference vector and taste embedding with a swipe on `event`.
+    The row is locked for the read-modify-write, so concurrent swipes of the same participant aren't lost.
+    Must run inside a transaction.
+    """
+    from ..models import Participant
+
+    features = event_features(event.category_ids, event.price, event.title)
+    participant = (
+        Participant.objects.select_for_update(of=("self",))
+        .only("id", "preference_vector", "taste_embedding")
+        .get(pk=participant_id)
+    )
+    updates = {"preference_vector": update_preference_vector(participant.preference_vector, features, liked)}
+
+    embedding = load_embedding(event.embedding)
+    if embedding is not None:
+        updates["taste_embedding"] = update_taste_embedding(participant.taste_embedding, embedding, liked)
+    Participant.objects.filter(pk=participant_id).update(**updates)
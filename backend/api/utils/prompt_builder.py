@@ -0,0 +1,148 @@
+import math
+import re
+from string import ascii_uppercase
+from typing import Dict, List, Tuple
+
+# Longest description summary sent per event, even when the budget would allow more
+DESCRIPTION_MAX_CHARS = 160
+# Below this a summary says nothing useful, send none
+DESCRIPTION_MIN_CHARS = 24
+TITLE_MAX_CHARS = 60
+
+_SENTENCE_END = re.compile(r"[.!?](?=\s|$)")
+
+RANKING_SYSTEM_PROMPT = (
+    "You rank events for a user of an event app. "
+    "Reply with JSON only: {\"ranked_event_ids\": [ids, most relevant first]}."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token), good enough to stay within a budget without a tokenizer.
+    """
+    return math.ceil(len(text) / 4)
+
+
+def truncate_at_sentence(text: str, max_chars: int) -> str:
+    """
+    Shortens `text` to at most `max_chars`, cutting after the last full sentence that fits,
+    or at the last word boundary (with an ellipsis) if not even the first sentence fits.
+    """
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+
+    window = text[:max_chars]
+    ends = [m.end() for m in _SENTENCE_END.finditer(window)]
+    if ends:
+        return window[:ends[-1]]
+
+    cut = window[:max_chars - 1].rsplit(" ", 1)[0]
+    return cut.rstrip(",;:") + "…"
+
+
+def category_codes(names: List[str]) -> Dict[str, str]:
+    """
+    Short codes (A, B, ..., Z, AA, AB...) for the given category names, in order of first appearance.
+    """
+    codes = {}
+    for name in names:
+        if name in codes:
+            continue
+        index = len(codes)
+        code = ""
+        while True:
+            code = ascii_uppercase[index % 26] + code
+            index = index // 26 - 1
+            if index < 0:
+                break
+        codes[name] = code
+    return codes
+
+
+def _clean(text: str) -> str:
+    # The table is pipe separated, one event per line
+    return " ".join(text.replace("|", "/").split())
+
+
+def build_ranking_messages(profile: Dict, events: List[Dict], token_budget: int) -> Tuple[List[Dict], Dict]:
+    """
+    Builds the ranking prompt within `token_budget` (estimated) tokens.
+
+    :param profile: {"categories": [names], "budget": number, "leaning": {"categories": [names], "price": band or None}},
+        the leaning being what the participant's swipes say (see `describe_preferences`)
+    :param events: dicts with id, title, description, price, date and categories (names),
+        most promising first: when the budget is short, the last events are left out
+    :return: (messages, stats) where stats has the estimated prompt_tokens, the included and dropped event counts.
+        messages is empty if not even one event fits: there's nothing to ask the LLM
+
+    Categories are sent once as short codes, events as one `id|price|date|categories|title|summary` line each.
+    Only the categories of the user and of the events that fit get a code, an event's new codes count in its cost.
+    Events first get in without summary, then the budget left is shared between their summaries.
+    """
+    leaning = profile["leaning"]
+    codes = category_codes(list(profile["categories"]) + leaning["categories"])
+    legend_entries = [f"{code}={_clean(name)}" for name, code in codes.items()]
+
+    swipes = ",".join(codes[name] for name in leaning["categories"])
+    if leaning["price"]:
+        swipes = f"{swipes or 'any'}, mostly {leaning['price']}"
+    user_line = (
+        f"User: likes {','.join(codes[name] for name in profile['categories']) or 'any'}; "
+        f"budget {float(profile['budget']):g}; swipes lean to: {swipes or 'no swipes yet'}"
+    )
+    table_header = "Events (id|price|date|categories|title|summary):"
+
+    fixed = "\n".join([RANKING_SYSTEM_PROMPT, "Categories: " + ", ".join(legend_entries), user_line, table_header])
+    available = token_budget - estimate_tokens(fixed)
+
+    # As many events as fit without summary, in order
+    included = []
+    used = 0
+    for event in events:
+        new_names = [name for name in dict.fromkeys(event["categories"]) if name not in codes]
+        new_codes = category_codes(list(codes) + new_names)
+        new_entries = [f"{new_codes[name]}={_clean(name)}" for name in new_names]
+
+        row = [
+            str(event["id"]),
+            f"{float(event['price']):g}",
+            event["date"].strftime("%Y-%m-%d") if event.get("date") else "",
+            ",".join(new_codes[name] for name in event["categories"]),
+            _clean(event["title"])[:TITLE_MAX_CHARS],
+        ]
+        cost = estimate_tokens("|".join(row) + "|\n")
+        if new_entries:
+            separator = ", " if legend_entries else ""
+            cost += estimate_tokens(separator + ", ".join(new_entries))
+        if used + cost > available:
+            break
+
+        included.append(row)
+        used += cost
+        codes = new_codes
+        legend_entries += new_entries
+
+    stats = {
+        "events_included": len(included),
+        "events_dropped": len(events) - len(included),
+    }
+    if not included:
+        return [], {"prompt_tokens": 0, **stats}
+
+    # The rest of the budget goes to the summaries, evenly
+    summary_chars = min(DESCRIPTION_MAX_CHARS, (available - used) * 4 // len(included))
+    for row, event in zip(included, events):
+        summary = truncate_at_sentence(_clean(event["description"]), summary_chars) if summary_chars >= DESCRIPTION_MIN_CHARS else ""
+        row.append(summary)
+
+    legend = "Categories: " + ", ".join(legend_entries)
+    user_prompt = "\n".join([legend, user_line, table_header] + ["|".join(row) for row in included])
+    messages = [
+        {"role": "system", "content": RANKING_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
+
+    stats["prompt_tokens"] = estimate_tokens(RANKING_SYSTEM_PROMPT) + estimate_tokens(user_prompt)
+    return messages, stats
@@ -0,0 +1,91 @@
+def order_events_locally(candidates, preferred_category_ids, scores=None, trending=None):
+    """
+    Orders candidate events without the LLM: highest score first (e.g. affinity with the participant's swipes plus
+    co-like scores), then most matching preferred categories, then the most trending (`trending`: event id -> rank
+    in the trending list), then the soonest, then the cheapest.
+    """
+    preferred = set(preferred_category_ids)
+    scores = scores or {}
+    trending = trending or {}
+    not_trending = len(trending)
+
+    def sort_key(event):
+        matches = sum(1 for category_id in event.category_ids if category_id in preferred)
+        return (-scores.get(event.id, 0.0), -matches, trending.get(event.id, not_trending), event.date, event.price, event.id)
+
+    return sorted(candidates, key=sort_key)
+
+
+def rank_events_locally(candidates, preferred_category_ids, scores=None, trending=None):
+    """
+    Same order as `order_events_locally`, as event ids like `rank_events_with_llm` returns.
+    """
+    return [event.id for event in order_events_locally(candidates, preferred_category_ids, scores, trending)]
+
+
+def plan_incremental_ranking(feed, candidates, now, max_new, max_age):
+    """
+    Compares the candidates with a stored RankedFeed.
+    Returns (kept_ids, to_place): the stored ids still candidates, in their stored order (swiped, deleted or
+    no longer matching events just drop out), and the events new or changed since the feed was built.
+    Returns None when everything has to be ranked again: no feed, feed too old, or too many events to place.
+    """
+    if feed is None or (now - feed.full_ranked_at).total_seconds() > max_age:
+        return None
+
+    by_id = {e.id: e for e in candidates}
+    changed = {e.id for e in candidates if e.updated_at > feed.built_at}
+    kept_ids = [eid for eid in feed.event_ids if eid in by_id and eid not in changed]
+
+    kept = set(kept_ids)
+    to_place = [e for e in candidates if e.id not in kept]
+    if not kept_ids or len(to_place) > max_new:
+        return None
+
+    return kept_ids, to_place
+
+
+def pick_anchors(ranked_ids, count):
+    """
+    Evenly spaced ids of a ranked list (first and last included), the reference points new events are placed against.
+    """
+    if len(ranked_ids) <= count:
+        return list(ranked_ids)
+    if count <= 1:
+        return list(ranked_ids[:max(count, 0)])  # no spacing with a single anchor: the top one
+
+    step = (len(ranked_ids) - 1) / (count - 1)
+    return [ranked_ids[round(i * step)] for i in range(count)]
+
+
+def merge_ranked_ids(ranked_ids, new_ids, mini_ranking):
+    """
+    Inserts `new_ids` into `ranked_ids` without touching their order.
+    `mini_ranking` ranks some anchors of `ranked_ids` together with the new ids: each new id goes right before
+    the anchor that follows it there, new ids after the last anchor (or missing from it) go at the end.
+    """
+    new = set(new_ids)
+    before_anchor = {}
+    pending = []
+    seen = set()
+
+    for eid in mini_ranking:
+        if eid in new:
+            if eid not in seen:
+                seen.add(eid)
+                pending.append(eid)
+        elif pending:
+            before_anchor.setdefault(eid, []).extend(pending)
+            pending = []
+
+    merged = []
+    for eid in ranked_ids:
+        merged.extend(before_anchor.pop(eid, []))
+        merged.append(eid)
+
+    # anchors the mini ranking made up (not in ranked_ids) don't lose their new events
+    for eids in before_anchor.values():
+        merged.extend(eids)
+    merged.extend(pending)
+    merged.extend(eid for eid in new_ids if eid not in seen)
+    return merged
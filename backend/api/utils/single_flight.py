@@ -0,0 +1,144 @@
+import asyncio
+import fcntl
+import logging
+import os
+import time
+from django.conf import settings
+from django.core.cache import caches
+from .metrics import record_cache_access
+
+logger = logging.getLogger(__name__)
+
+_POLL_INTERVAL = 0.05
+
+
+class SingleFlight:
+    """
+    Coalesces identical computations running at the same time, across every worker process.
+
+    The first caller for a key takes an exclusive flock on `<SINGLE_FLIGHT_LOCK_DIR>/<name>-<key>.lock` and computes,
+    callers arriving meanwhile wait for the result it publishes in the shared cache instead of computing it again.
+    Results are only shared with requests that overlapped the computation, they're not a long lived cache.
+    The lock file is removed by whoever releases it, so the directory only holds the keys being computed.
+    """
+    def __init__(self, name, result_ttl=30):
+        self.name = name
+        self.result_ttl = result_ttl
+
+    def do(self, key, compute):
+        """
+        Returns `compute()`, or the result of the identical call already running elsewhere.
+        """
+        arrived_at = time.time()
+        fd = self._try_lock(key)
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+
+        while True:
+            result = self._shared_result(key, arrived_at)
+            if fd is not None:
+                # Holding the lock, unless the leader published and released it since we arrived
+                if result is None:
+                    break
+                self._unlock(key, fd)
+
+            if result is not None:
+                record_cache_access(self.name, hit=True)
+                return result["value"]
+
+            if time.monotonic() >= deadline:
+                logger.warning("Single flight '%s' wait timed out for key %s, computing it.", self.name, key)
+                record_cache_access(self.name, hit=False)
+                return compute()
+
+            time.sleep(_POLL_INTERVAL)
+            # Lock free without a fresh result means the leader failed, take over
+            fd = self._try_lock(key)
+
+        record_cache_access(self.name, hit=False)
+        try:
+            value = compute()
+            self._publish(key, value)
+            return value
+        finally:
+            self._unlock(key, fd)
+
+    async def ado(self, key, compute):
+        """
+        Async version of `do`, `compute` is a coroutine function.
+        """
+        arrived_at = time.time()
+        fd = self._try_lock(key)
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+
+        while True:
+            result = await self._ashared_result(key, arrived_at)
+            if fd is not None:
+                if result is None:
+                    break
+                self._unlock(key, fd)
+
+            if result is not None:
+                record_cache_access(self.name, hit=True)
+                return result["value"]
+
+            if time.monotonic() >= deadline:
+                logger.warning("Single flight '%s' wait timed out for key %s, computing it.", self.name, key)
+                record_cache_access(self.name, hit=False)
+                return await compute()
+
+            await asyncio.sleep(_POLL_INTERVAL)
+            fd = self._try_lock(key)
+
+        record_cache_access(self.name, hit=False)
+        try:
+            value = await compute()
+            await caches["single_flight"].aset(self._cache_key(key), {"finished_at": time.time(), "value": value}, self.result_ttl)
+            return value
+        finally:
+            self._unlock(key, fd)
+
+    def _lock_path(self, key):
+        return os.path.join(settings.SINGLE_FLIGHT_LOCK_DIR, f"{self.name}-{key}.lock")
+
+    def _try_lock(self, key):
+        os.makedirs(settings.SINGLE_FLIGHT_LOCK_DIR, exist_ok=True)
+        path = self._lock_path(key)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # The holder we waited for may have removed the file in the meantime: a lock on it protects nothing,
+            # the next attempt opens (or creates) the current one
+            if os.fstat(fd).st_ino != os.stat(path).st_ino:
+                raise BlockingIOError
+        except (BlockingIOError, FileNotFoundError):
+            os.close(fd)
+            return None
+        return fd
+
+    def _unlock(self, key, fd):
+        # Removed while still locked, so nobody can lock this file again once it's gone
+        try:
+            os.unlink(self._lock_path(key))
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+    def _cache_key(self, key):
+        return f"single-flight:{self.name}:{key}"
+
+    def _shared_result(self, key, arrived_at):
+        # Only a result finished after we arrived is as fresh as computing it ourselves
+        result = caches["single_flight"].get(self._cache_key(key))
+        if result is not None and result["finished_at"] >= arrived_at:
+            return result
+        return None
+
+    async def _ashared_result(self, key, arrived_at):
+        result = await caches["single_flight"].aget(self._cache_key(key))
+        if result is not None and result["finished_at"] >= arrived_at:
+            return result
+        return None
+
+    def _publish(self, key, value):
+        # Published before the lock is released, so waiters never see the lock free without the result
+        caches["single_flight"].set(self._cache_key(key), {"finished_at": time.time(), "value": value}, self.result_ttl)
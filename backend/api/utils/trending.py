@@ -0,0 +1,94 @@
+import math
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F, Value
+from django.db.models.functions import Exp, Greatest
+from django.utils import timezone
+from .single_flight import SingleFlight
+
+_TRENDING_CACHE_KEY = "trending:upcoming"
+# exp() below this is 0 for our purposes, and Postgres raises on underflow instead of returning 0
+_MIN_EXPONENT = -50.0
+
+_trending_single_flight = SingleFlight("trending")
+
+
+def _decay_rate():
+    return math.log(2) / settings.POPULARITY_HALF_LIFE
+
+
+def decayed_popularity(popularity, popularity_at, now):
+    """
+    Value at `now` (unix time) of a popularity counter last updated at `popularity_at`.
+    """
+    return popularity * math.exp(max(_decay_rate() * (popularity_at - now), _MIN_EXPONENT))
+
+
+def record_like_popularity(event_id, now=None):
+    """
+    Counts a like in the event's popularity: the counter is decayed to now and incremented in a single UPDATE,
+    so concurrent likes on a hot event neither lock nor lose each other. `Event.updated_at` isn't touched.
+    """
+    from ..models import Event
+
+    now = now or time.time()
+    decay = Exp(Greatest((F("popularity_at") - Value(now)) * Value(_decay_rate()), Value(_MIN_EXPONENT)))
+    Event.objects.filter(pk=event_id).update(popularity=F("popularity") * decay + Value(1.0), popularity_at=Value(now))
+
+
+def _popularity_rows():
+    from ..models import Event
+
+    return (
+        Event.objects.filter(approved=True, date__gte=timezone.now(), popularity__gt=0)
+        .values_list("id", "popularity", "popularity_at")
+    )
+
+
+def _publish_trending(rows, now):
+    ranked = sorted(rows, key=lambda row: (-decayed_popularity(row[1], row[2], now), row[0]))
+    event_ids = [event_id for event_id, _, _ in ranked[:settings.TRENDING_SIZE]]
+    caches["shared"].set(_TRENDING_CACHE_KEY, {"built_at": now, "event_ids": event_ids}, None)
+    return event_ids
+
+
+def build_trending():
+    """
+    Recomputes the global trending list: the TRENDING_SIZE approved upcoming events with the highest decayed
+    popularity, most popular first. Published in the shared cache for every worker.
+    """
+    now = time.time()
+    return _publish_trending(list(_popularity_rows()), now)
+
+
+async def abuild_trending():
+    """
+    Async version of `build_trending`.
+    """
+    now = time.time()
+    return _publish_trending([row async for row in _popularity_rows()], now)
+
+
+def _fresh(entry):
+    return entry is not None and time.time() - entry["built_at"] < settings.TRENDING_REFRESH
+
+
+def trending_event_ids():
+    """
+    The trending list, rebuilt (once for every worker waiting on it) when older than TRENDING_REFRESH seconds.
+    """
+    entry = caches["shared"].get(_TRENDING_CACHE_KEY)
+    if _fresh(entry):
+        return entry["event_ids"]
+    return _trending_single_flight.do("upcoming", build_trending)
+
+
+async def atrending_event_ids():
+    """
+    Async version of `trending_event_ids`.
+    """
+    entry = await caches["shared"].aget(_TRENDING_CACHE_KEY)
+    if _fresh(entry):
+        return entry["event_ids"]
+    return await _trending_single_flight.ado("upcoming", abuild_trending)
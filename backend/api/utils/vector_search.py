@@ -0,0 +1,48 @@
+# Not re-exported by `api.utils`, like the co-like model: numpy is only loaded by the processes that search
+import numpy as np
+from .embeddings import EMBEDDING_SIZE
+
+
+def embedding_matrix(blobs):
+    """
+    Stacks float32 embedding blobs into an (n, EMBEDDING_SIZE) matrix, missing ones are zero rows (similar to nothing).
+    """
+    zero = bytes(EMBEDDING_SIZE * 4)
+    data = b"".join(bytes(blob) if blob and len(blob) == len(zero) else zero for blob in blobs)
+    return np.frombuffer(data, dtype=np.float32).reshape(-1, EMBEDDING_SIZE)
+
+
+def cosine_scores(query, matrix):
+    """
+    Cosine similarity of every row of `matrix` (normalized embeddings) with `query` (any norm).
+    """
+    query = np.asarray(query, dtype=np.float32)
+    norm = np.linalg.norm(query)
+    if not norm or not len(matrix):
+        return np.zeros(len(matrix), dtype=np.float32)
+    return matrix @ (query / norm)
+
+
+def top_k(scores, k):
+    """
+    Indices of the k highest scores, highest first, without sorting everything.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best], kind="stable")]
+
+
+def cosine_top_k(query, matrix, k, exclude=None):
+    """
+    The k rows of `matrix` most similar to `query`, as (row indices, cosine similarities).
+    :param exclude: row index left out, e.g. the query's own row
+    """
+    scores = cosine_scores(query, matrix)
+    if exclude is not None:
+        scores = scores.copy()
+        scores[exclude] = -np.inf
+        k = min(k, len(scores) - 1)
+    best = top_k(scores, k)
+    return best, scores[best]
@@ -3,4 +3,5 @@ from .openapi import *
 from .image import *
 from .participant import *
 from .organizer import *
-from .public import *
\ No newline at end of file
+from .public import *
+from .metrics import *
\ No newline at end of file
@@ -0,0 +1,14 @@
+from drf_spectacular.utils import extend_schema
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from ..utils import IsAdminRoleOrLocalhost, render_prometheus
+
+
+@extend_schema(exclude=True)
+@api_view(["GET"])
+@permission_classes([IsAdminRoleOrLocalhost])
+def get_metrics(request):
+    """
+    Admin or localhost only: Request, DB, LLM and cache metrics of all workers in Prometheus text format.
+    """
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -3,7 +3,8 @@ from rest_framework.decorators import api_view, permission_classes, parser_class
 from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework import status
-from ..utils import IsOrganizerRole
+from asgiref.sync import sync_to_async
+from ..utils import IsOrganizerRole, async_api_view, json_response
 from ..serializers import (
     GetOrganizerProfileSerializer,
     DeleteOrganizerProfileSerializer,
@@ -50,6 +51,12 @@ def manage_organizer_profile(request):
     
 
 
+def _created_message(event):
+    if event.approved:
+        return "Event created and moderated successfully."
+    return "Event created, moderation is pending."
+
+
 @extend_schema(
     methods=['GET'],
     responses={200: GetOrganizerEventsSerializer},
@@ -78,8 +85,8 @@ def manage_organizer_events(request):
     elif request.method == "POST":
         serializer = CreateOrganizerEventSerializer(data=request.data, context={"organizer": request.user})
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response({"detail": "Event created and moderated successfully."}, status=status.HTTP_201_CREATED)
+        event = serializer.save()
+        return Response({"detail": _created_message(event)}, status=status.HTTP_201_CREATED)
 
 @extend_schema(
     methods=['GET'],
@@ -122,4 +129,16 @@ def manage_organizer_event(request, event_id):
         serializer = DeleteOrganizerEventSerializer(data={}, context={"organizer": request.user, "event_id": event_id})
         serializer.is_valid(raise_exception=True)
         serializer.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@async_api_view(["POST"], permission_classes=[IsOrganizerRole], parser_classes=[JSONParser, MultiPartParser])
+async def create_organizer_event_async(request):
+    """
+    Organizer only: Async version of the event creation, meant to be served by an ASGI worker.
+    While the LLM moderates the event, the worker keeps serving other requests.
+    """
+    serializer = CreateOrganizerEventSerializer(data=request.data, context={"organizer": request.user})
+    await sync_to_async(serializer.is_valid)(raise_exception=True)
+    event = await serializer.asave()
+    return json_response({"detail": _created_message(event)}, status.HTTP_201_CREATED)
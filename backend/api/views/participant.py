@@ -1,9 +1,10 @@
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework import status
-from ..utils import IsParticipantRole
+from asgiref.sync import sync_to_async
+from ..utils import IsParticipantRole, async_api_view, json_response, ndjson_response
 
 
 from ..serializers.participant import (
@@ -120,6 +121,7 @@ def get_swipe_history(request):
 
 
 @extend_schema(
+    parameters=[OpenApiParameter("stream", bool, description="Stream the events as NDJSON while the LLM ranks them.")],
     responses={200: GetRecommendationFeedSerializer},
     description="Participant only: Get personalized event feed."
 )
@@ -129,9 +131,36 @@ def get_swipe_history(request):
 def get_recommendation_feed(request):
     """
     Participant only: Get personalized event feed (AI-ranked).
+    With `?stream=1` the events are sent one per line (NDJSON) as soon as they're ranked.
     """
     serializer = GetRecommendationFeedSerializer(
         data={}, context={"participant": request.user}
     )
     serializer.is_valid(raise_exception=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+
+    if _wants_stream(request):
+        return ndjson_response(serializer.stream_events())
+
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@async_api_view(["GET"], permission_classes=[IsParticipantRole])
+async def get_recommendation_feed_async(request):
+    """
+    Participant only: Async version of the personalized event feed, meant to be served by an ASGI worker.
+    While the LLM ranks the events, the worker keeps serving other requests.
+    """
+    serializer = GetRecommendationFeedSerializer(
+        data={}, context={"participant": request.user}
+    )
+    await sync_to_async(serializer.is_valid)(raise_exception=True)
+
+    if _wants_stream(request):
+        return ndjson_response(serializer.stream_events())
+
+    data = await serializer.ato_representation(serializer.validated_data)
+    return json_response(data, status.HTTP_200_OK)
+
+
+def _wants_stream(request):
+    return request.query_params.get("stream", "").lower() in ("1", "true", "yes")
@@ -8,6 +8,7 @@ from ..serializers import(
     GetCategoriesSerializer,
     GetEventSerializer,
     GetEventsSerializer,
+    GetSimilarEventsSerializer,
 )
 
 @api_view(["GET"])
@@ -27,9 +28,9 @@ def get_categories(request):
 @parser_classes([JSONParser])
 def get_events(request):
     """
-    Public: List all approved events.
+    Public: List all approved events, `?category_ids=1&category_ids=2` keeps those in any of the categories.
     """
-    serializer = GetEventsSerializer(data={})
+    serializer = GetEventsSerializer(data=request.query_params)
     serializer.is_valid(raise_exception=True)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -44,3 +45,15 @@ def get_event_detail(request, event_id):
     serializer = GetEventSerializer(data={}, context={"event_id": event_id})
     serializer.is_valid(raise_exception=True)
     return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+@parser_classes([JSONParser])
+def get_similar_events(request, event_id):
+    """
+    Public: Get the approved upcoming events most similar to a specific approved event.
+    """
+    serializer = GetSimilarEventsSerializer(data={}, context={"event_id": event_id})
+    serializer.is_valid(raise_exception=True)
+    return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
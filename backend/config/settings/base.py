@@ -57,6 +57,7 @@ SIMPLE_JWT = {
 
 # Setting up django's hooks
 MIDDLEWARE = [
+    'api.backends.middleware.ServerTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -67,6 +68,115 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Structured per-request performance lines from ServerTimingMiddleware go to stdout
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'performance': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'plain',
+        },
+    },
+    'loggers': {
+        'api.performance': {
+            'handlers': ['performance'],
+            'level': os.getenv('PERFORMANCE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Shared store aggregating the /api/metrics counters of every worker process
+METRICS_DB_PATH = os.getenv('METRICS_DB_PATH', '/tmp/macerhappen-metrics.sqlite3')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+
+# LLM calls: whole request budget (seconds), per-call timeout, retries, hedging and circuit breaker
+REQUEST_TIME_BUDGET = float(os.getenv('REQUEST_TIME_BUDGET', '20'))
+LLM_CALL_TIMEOUT = float(os.getenv('LLM_CALL_TIMEOUT', '12'))
+LLM_DEADLINE_RESERVE = float(os.getenv('LLM_DEADLINE_RESERVE', '1'))  # kept to serve the fallback
+LLM_MIN_CALL_TIMEOUT = float(os.getenv('LLM_MIN_CALL_TIMEOUT', '0.5'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '1'))
+LLM_RETRY_BACKOFF = float(os.getenv('LLM_RETRY_BACKOFF', '0.5'))
+LLM_HEDGE_AFTER = float(os.getenv('LLM_HEDGE_AFTER', '0')) or None  # 0 disables hedging
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', '5'))
+LLM_BREAKER_RESET_TIMEOUT = float(os.getenv('LLM_BREAKER_RESET_TIMEOUT', '30'))
+LLM_RANKING_TOKEN_BUDGET = int(os.getenv('LLM_RANKING_TOKEN_BUDGET', '1500'))  # estimated prompt tokens per ranking call
+
+# Stored feed rankings: new events are placed into them, everything is ranked again past the age (seconds) or count
+RANKED_FEED_MAX_AGE = int(os.getenv('RANKED_FEED_MAX_AGE', '86400'))
+RANKED_FEED_MAX_NEW_EVENTS = int(os.getenv('RANKED_FEED_MAX_NEW_EVENTS', '20'))
+RANKED_FEED_ANCHORS = int(os.getenv('RANKED_FEED_ANCHORS', '8'))
+
+# Preference vectors: weight of the latest swipe in the running average, and of a dislike against a like
+PREFERENCE_DECAY = float(os.getenv('PREFERENCE_DECAY', '0.1'))
+PREFERENCE_DISLIKE_WEIGHT = float(os.getenv('PREFERENCE_DISLIKE_WEIGHT', '0.5'))
+
+# Similar events kept per event in the precomputed neighbor table
+SIMILAR_EVENTS_COUNT = int(os.getenv('SIMILAR_EVENTS_COUNT', '10'))
+
+# Event popularity: half-life (seconds) of a like, size and refresh interval (seconds) of the trending list
+POPULARITY_HALF_LIFE = float(os.getenv('POPULARITY_HALF_LIFE', '259200'))
+TRENDING_SIZE = int(os.getenv('TRENDING_SIZE', '100'))
+TRENDING_REFRESH = int(os.getenv('TRENDING_REFRESH', '300'))
+
+# Per-process event catalog: full reload interval (seconds), changes in between are applied incrementally
+EVENT_CATALOG_RELOAD = int(os.getenv('EVENT_CATALOG_RELOAD', '600'))
+
+# Uploaded images: widths (px) of the WebP renditions served to the clients, and their quality
+IMAGE_VARIANT_WIDTHS = [int(w) for w in os.getenv('IMAGE_VARIANT_WIDTHS', '320,640,1280').split(',')]
+IMAGE_VARIANT_QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', '75'))
+# Failed renderings of an image after which `render_image_variants` stops retrying it
+IMAGE_RENDER_MAX_FAILURES = int(os.getenv('IMAGE_RENDER_MAX_FAILURES', '3'))
+
+# Uploads: max size (bytes) of a file, image formats accepted and max pixels (width x height) of an image
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', str(10 * 2**20)))
+IMAGE_UPLOAD_FORMATS = os.getenv('IMAGE_UPLOAD_FORMATS', 'JPEG,PNG,WEBP').split(',')
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', str(50 * 10**6)))
+
+# Memory (MiB) of the backend container (mem_limit in docker-compose.prod.yml) and resident memory of its worker.
+# Decoding an image, in the worker or in a subprocess (sharing the container's memory), gets what's left: the images
+# whose decoding needs more are refused at upload, the largest variants of a JPEG are skipped when only they don't fit
+CONTAINER_MEMORY_MB = int(os.getenv('CONTAINER_MEMORY_MB', '100'))
+WORKER_MEMORY_MB = int(os.getenv('WORKER_MEMORY_MB', '64'))
+IMAGE_DECODE_MEMORY_MB = CONTAINER_MEMORY_MB - WORKER_MEMORY_MB
+
+# Images needing more pixels than this decoded are rendered in a subprocess, with a timeout (s)
+IMAGE_DECODE_INPROCESS_PIXELS = int(os.getenv('IMAGE_DECODE_INPROCESS_PIXELS', str(2 * 10**6)))
+IMAGE_DECODE_TIMEOUT = float(os.getenv('IMAGE_DECODE_TIMEOUT', '30'))
+
+# LLM calls in flight across all workers, and the bounded queue (size, max wait in seconds) in front of them
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '4'))
+LLM_QUEUE_SIZE = int(os.getenv('LLM_QUEUE_SIZE', '32'))
+LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', '5'))
+LLM_LIMITER_DIR = os.getenv('LLM_LIMITER_DIR', '/tmp/macerhappen-llm-limiter')
+
+# Caches shared by every worker process of the container, used by name, everything else keeps the per-process default:
+# - 'shared': a few long lived keys (events version, trending list), far below its culling threshold
+# - 'single_flight': the short lived single-flight results, one per key computed, culled when they pile up
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_DIR', '/tmp/macerhappen-cache'),
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+    'single_flight': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('SINGLE_FLIGHT_CACHE_DIR', '/tmp/macerhappen-single-flight-cache'),
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+}
+
+# Coalescing of identical concurrent computations (e.g. the feed of one participant on two devices)
+SINGLE_FLIGHT_LOCK_DIR = os.getenv('SINGLE_FLIGHT_LOCK_DIR', '/tmp/macerhappen-single-flight')
+SINGLE_FLIGHT_WAIT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_WAIT_TIMEOUT', '20'))
+
 # Root url config path
 ROOT_URLCONF = 'config.urls'
 
@@ -122,6 +232,20 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/app/media'
 
+# Uploaded files always go to a temporary file on disk, never in memory, and are cut at UPLOAD_MAX_BYTES
+FILE_UPLOAD_HANDLERS = ['api.backends.uploads.BoundedUploadHandler']
+
+# Uploads are named by content hash (deduplicated, immutable), see `api.backends.storage`
+STORAGES = {
+    'default': {'BACKEND': 'api.backends.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Models built offline from the DB (co-like matrix...), read by the workers
+DATA_ROOT = os.getenv('DATA_ROOT', '/app/data')
+# Most recent likes of a participant the feed scores the co-likes from
+COLIKE_RECENT_LIKES = int(os.getenv('COLIKE_RECENT_LIKES', '200'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -0,0 +1,53 @@
+"""
+Gunicorn settings for production.
+
+The app is loaded once in the master (`preload_app`) and workers are forked from it, so a worker
+restarted by `max_requests` starts serving immediately instead of importing Django, DRF and openai again.
+Before forking, the preloaded objects are moved to the permanent GC generation with `gc.freeze()`:
+the collector then never touches them in the workers, so their memory pages stay shared (copy-on-write)
+instead of being copied into every worker.
+"""
+import gc
+
+bind = "0.0.0.0:8000"
+workers = 1
+worker_class = "uvicorn_worker.UvicornWorker"
+max_requests = 100
+max_requests_jitter = 10
+preload_app = True
+
+# No collections while the app is being imported, the objects created now will be frozen anyway.
+# Executed again when the master reloads its configuration (SIGHUP), `on_reload` turns it back on.
+gc.disable()
+
+
+def _freeze_preloaded():
+    gc.collect()
+    gc.freeze()
+    # The master keeps running (and reloading) for the life of the container, it needs its collector back
+    gc.enable()
+
+
+def when_ready(server):
+    """
+    Runs in the master after the app has been preloaded, right before the first workers are forked.
+    """
+    from django.urls import get_resolver
+    from api.utils import warm_llm_imports
+
+    # Views, serializers and DRF are otherwise imported by each worker on its first request
+    get_resolver().url_patterns
+    warm_llm_imports()
+
+    _freeze_preloaded()
+
+
+def on_reload(server):
+    """
+    Runs in the master after a SIGHUP reloaded the configuration and the app, before the new workers are forked.
+    """
+    _freeze_preloaded()
+
+
+def post_fork(server, worker):
+    gc.enable()
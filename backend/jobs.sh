@@ -0,0 +1,33 @@
+#!/bin/sh
+
+# Periodic maintenance jobs, run one after the other by the `jobs` service of docker-compose.prod.yml
+# (one Django process at a time, so the service fits the same memory limit as the backend).
+# A failed job is logged and retried on the next round, it doesn't stop the others.
+
+JOBS_INTERVAL="${JOBS_INTERVAL:-900}"  # seconds between two rounds
+DAILY_JOBS_HOUR="${DAILY_JOBS_HOUR:-4}"  # hour (container time) the daily jobs run at
+
+run() {
+    echo "$(date -Iseconds) manage.py $*"
+    python manage.py "$@" || echo "$(date -Iseconds) manage.py $1 failed with status $?"
+}
+
+last_daily=""
+while true; do
+    run moderate_pending_events
+    run purge_deleted_accounts
+    run archive_past_events
+    run refresh_event_neighbors
+    run build_colike_model
+    run render_image_variants
+
+    today="$(date +%F)"
+    if [ "$(date +%H)" -ge "$DAILY_JOBS_HOUR" ] && [ "$last_daily" != "$today" ]; then
+        # Drops the likes of deleted swipes, which the incremental updates keep
+        run build_colike_model --full
+        run collect_orphan_media --quarantine --purge-quarantine 30
+        last_daily="$today"
+    fi
+
+    sleep "$JOBS_INTERVAL"
+done